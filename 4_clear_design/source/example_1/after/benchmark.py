@@ -0,0 +1,219 @@
+"""
+Нагрузочный прогон DataFiller без кластера.
+
+В PATH подкладываются фиктивные "hadoop" и "hive" (скрипты Python) с
+настраиваемой задержкой и вероятностью ошибки, статусы принимает
+локальный фиктивный сервер Vita. DataFiller.execute запускается для
+заданного количества партиций, по каждому прогону выводится общее
+время и время шагов (RunMetrics).
+
+Запуск из пакета команд:
+    python -m <пакет>.benchmark --partitions 1 10 100 1000 --output bench.json
+"""
+import argparse
+import ast
+import json
+import logging
+import os
+import random
+import stat
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+from .data_filler import DataFiller
+
+logger = logging.getLogger()
+
+# порт зашит в VitaPublisher
+VITA_PORT = 8002
+
+# "-S" (без site) заметно ускоряет запуск фиктивных команд, иначе
+# на малом числе ядер время старта интерпретатора искажает замеры
+FAKE_HADOOP = '''#!{python} -S
+import os, random, sys, time
+args = sys.argv[1:]
+time.sleep(float(os.environ.get('BENCH_HADOOP_LATENCY', '0')))
+if args[:2] == ['fs', '-du']:
+    size = os.environ.get('BENCH_PARTITION_BYTES', '0')
+    print(f'{{size}}  {{size}}  {{args[-1]}}')
+    sys.exit(0)
+if args[:2] in (['fs', '-ls'], ['fs', '-checksum']):
+    # целевые партиции ещё не существуют
+    sys.exit(0)
+if random.random() < float(os.environ.get('BENCH_HADOOP_FAILURE_RATE', '0')):
+    print('hadoop: simulated failure: ' + ' '.join(args), file=sys.stderr)
+    sys.exit(1)
+'''
+
+FAKE_HIVE = '''#!{python} -S
+import os, random, sys, time
+args = sys.argv[1:]
+script = args[args.index('-e') + 1] if '-e' in args else ''
+latency = float(os.environ.get('BENCH_HIVE_LATENCY', '0'))
+failure_rate = float(os.environ.get('BENCH_HIVE_FAILURE_RATE', '0'))
+# запуск сессии Hive дороже отдельного запроса
+time.sleep(latency)
+for statement in (s.strip() for s in script.split(';')):
+    if not statement:
+        continue
+    if '-v' in args:
+        print(statement, flush=True)
+    time.sleep(latency / 10)
+    if random.random() < failure_rate:
+        print('FAILED: simulated failure: ' + statement, file=sys.stderr)
+        sys.exit(1)
+'''
+
+
+class FakeVitaHandler(BaseHTTPRequestHandler):
+
+    latency = 0.0
+    failure_rate = 0.0
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            self._reply(500, b'{"error": "simulated failure"}')
+            return
+        self._reply(200, b'{"status": "ok"}')
+
+    def _reply(self, code: int, body: bytes) -> None:
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _install_fake_binaries(bin_dir: str) -> None:
+    for name, template in (('hadoop', FAKE_HADOOP), ('hive', FAKE_HIVE)):
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as script:
+            script.write(template.format(python=sys.executable))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def _partition_values(count: int) -> str:
+    start = date(2000, 1, 1)
+    end = start + timedelta(days=count - 1)
+    return f'{start.isoformat()}..{end.isoformat()}'
+
+
+def run_case(partitions: int, settings: dict) -> dict:
+    data_filler = DataFiller()
+    data_filler.source_partition = '/benchmark/table/dt=1999-12-31'
+    data_filler.target_partition_values = _partition_values(partitions)
+    data_filler.table_name = 'benchmark.table'
+    data_filler.dlk_ds_code = 'benchmark'
+    data_filler.host_api = '127.0.0.1'
+    for name, value in settings.items():
+        setattr(data_filler, name, value)
+
+    start = time.monotonic()
+    error = None
+    try:
+        data_filler.execute()
+    except Exception as err:
+        error = str(err)
+    summary = data_filler._metrics.summary()
+    return {
+        'partitions': partitions,
+        'status': 'failed' if error else 'success',
+        'error': error,
+        'seconds': round(time.monotonic() - start, 3),
+        'stages': {name: item['seconds']
+                   for name, item in summary['stages'].items()},
+        'processes': summary['processes'],
+    }
+
+
+def _print_results(results: List[dict]) -> None:
+    stages = ['plan', 'copy', 'metadata', 'statistics', 'status', 'rollback']
+    header = ['partitions', 'status', 'seconds', 'processes'] + stages
+    print(' '.join(f'{name:>10}' for name in header))
+    for result in results:
+        row = [result['partitions'], result['status'], result['seconds'],
+               result['processes']]
+        row += [result['stages'].get(stage, '-') for stage in stages]
+        print(' '.join(f'{value:>10}' for value in row))
+
+
+def _parse_setting(value: str) -> Any:
+    # числа, True/False/None и т.п. - как литералы Python, иначе строка
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def main(argv: List[str] = None) -> List[dict]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--partitions', type=int, nargs='+',
+                        default=[1, 10, 100, 1000])
+    parser.add_argument('--hadoop-latency', type=float, default=0.05)
+    parser.add_argument('--hive-latency', type=float, default=0.5)
+    parser.add_argument('--vita-latency', type=float, default=0.01)
+    parser.add_argument('--hadoop-failure-rate', type=float, default=0.0)
+    parser.add_argument('--hive-failure-rate', type=float, default=0.0)
+    parser.add_argument('--vita-failure-rate', type=float, default=0.0)
+    parser.add_argument('--partition-bytes', type=int, default=1024 ** 2)
+    parser.add_argument('--setting', action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='параметр DataFiller, например copy_workers=8')
+    parser.add_argument('--output', help='файл JSON с результатами')
+    args = parser.parse_args(argv)
+
+    settings = {}
+    for setting in args.setting:
+        name, value = setting.split('=', 1)
+        settings[name] = _parse_setting(value)
+
+    FakeVitaHandler.latency = args.vita_latency
+    FakeVitaHandler.failure_rate = args.vita_failure_rate
+    server = ThreadingHTTPServer(('127.0.0.1', VITA_PORT), FakeVitaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    environ = dict(os.environ)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as bin_dir:
+            _install_fake_binaries(bin_dir)
+            os.environ.update({
+                'PATH': bin_dir + os.pathsep + environ.get('PATH', ''),
+                'BENCH_HADOOP_LATENCY': str(args.hadoop_latency),
+                'BENCH_HIVE_LATENCY': str(args.hive_latency),
+                'BENCH_HADOOP_FAILURE_RATE': str(args.hadoop_failure_rate),
+                'BENCH_HIVE_FAILURE_RATE': str(args.hive_failure_rate),
+                'BENCH_PARTITION_BYTES': str(args.partition_bytes),
+            })
+            for partitions in args.partitions:
+                logger.info(f'Benchmark: {partitions} partitions')
+                results.append(run_case(partitions, settings))
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+        server.shutdown()
+        server.server_close()
+
+    _print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'arguments': vars(args), 'results': results},
+                      output_file, indent=2, ensure_ascii=False)
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,224 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from .base import HDFSCommand
+from .data_filler import DataFiller
+from .vita import VitaPublisher
+
+logger = logging.getLogger()
+
+
+class RateLimiter:
+    """
+    Не больше per_minute событий в минуту, равномерно: acquire ждёт,
+    пока с предыдущего события не пройдёт 60 / per_minute секунд.
+    per_minute=None - без ограничения.
+    """
+
+    def __init__(self, per_minute: float = None) -> None:
+        self.interval = 60 / per_minute if per_minute else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BulkDataFiller(HDFSCommand):
+    """
+    Выполнение множества заданий DataFiller в одном процессе по манифесту.
+
+    Манифест (JSON или YAML):
+        settings:             # общие параметры DataFiller для всех заданий
+          hdfs_backend: subprocess
+          max_processes: 20
+        max_parallel_jobs: 4  # количество одновременно выполняемых заданий
+        table_concurrency: 1  # количество одновременных заданий по одной таблице
+        max_jobs_per_minute: 30  # общий лимит запуска заданий (по умолчанию нет)
+        jobs:                 # параметры DataFiller каждого задания
+          - source_partition: /data/schema/table/dt=2023-01-01
+            target_partition_values: 2023-01-02..2023-01-31
+            table_name: schema.table
+            dlk_ds_code: ...
+            host_api: ...
+
+    Все задания используют общие запускатель команд (общий лимит процессов
+    max_processes), бэкенды HDFS и Hive и отправщики статусов Vita (общий
+    лимит vita_workers на хост). Параметры бэкендов HDFS и Hive можно
+    переопределить в задании: на каждую различающуюся конфигурацию
+    создаётся один общий бэкенд. Параметры общих ресурсов (SHARED_SETTINGS)
+    задаются только в settings. По завершении формируется общий отчёт,
+    который записывается в report_path (если задан).
+    """
+
+    # параметры общих бэкендов: задания с одинаковыми значениями
+    # используют один бэкенд
+    HDFS_SETTINGS = ('hdfs_backend', 'webhdfs_url', 'webhdfs_user')
+    HIVE_SETTINGS = ('hive_backend', 'hive_host', 'hive_port', 'hive_user')
+    # параметры общих для всех заданий ресурсов
+    SHARED_SETTINGS = ('max_processes', 'command_timeout',
+                       'vita_workers', 'vita_batch_size')
+
+    manifest_path: str = None  # путь к манифесту (.json, .yaml, .yml)
+
+    # Необязательные параметры
+    report_path: str = None  # путь к JSON-отчёту по всем заданиям
+
+    def _load_manifest(self) -> dict:
+        path = Path(self.manifest_path)
+        with open(path) as manifest_file:
+            if path.suffix in ('.yaml', '.yml'):
+                import yaml  # необязательная зависимость
+                return yaml.safe_load(manifest_file)
+            return json.load(manifest_file)
+
+    def _check_job(self, number: int, job: dict) -> None:
+        shared = sorted(set(job) & set(self.SHARED_SETTINGS))
+        if shared:
+            raise AttributeError(f'Job {number}: {", ".join(shared)} can only '
+                                 f'be set in manifest settings.')
+
+    def _get_backends(self, template: DataFiller, backends: Dict[tuple, DataFiller],
+                      data_filler: DataFiller, names: tuple) -> DataFiller:
+        """
+        DataFiller, владеющий бэкендом для значений параметров names
+        задания: шаблон, если они совпадают с settings, иначе отдельный
+        (один на каждую конфигурацию) с общим запускателем команд.
+        """
+        key = (names, tuple(getattr(data_filler, name) for name in names))
+        if key == (names, tuple(getattr(template, name) for name in names)):
+            return template
+        if key not in backends:
+            owner = DataFiller()
+            for name in (*names, 'copy_workers'):
+                setattr(owner, name, getattr(template, name))
+            for name in names:
+                setattr(owner, name, getattr(data_filler, name))
+            owner._runner = template._get_runner()
+            backends[key] = owner
+        return backends[key]
+
+    def _create_job(self, template: DataFiller, settings: dict,
+                    job: dict, publishers: dict,
+                    backends: Dict[tuple, DataFiller]) -> DataFiller:
+        data_filler = DataFiller()
+        for name, value in {**settings, **job}.items():
+            setattr(data_filler, name, value)
+        # общие для всех заданий ресурсы
+        data_filler._shared_backends = True
+        data_filler._runner = template._get_runner()
+        data_filler._hdfs = self._get_backends(
+            template, backends, data_filler, self.HDFS_SETTINGS
+        )._get_hdfs()
+        data_filler._hive = self._get_backends(
+            template, backends, data_filler, self.HIVE_SETTINGS
+        )._get_hive()
+        host_api = data_filler.host_api
+        if host_api not in publishers:
+            publishers[host_api] = VitaPublisher(
+                host_api, int(template.vita_workers or 1),
+                int(template.vita_batch_size or 1)
+            )
+        # словарь общий: статусы из очереди vita_outbox_path других хостов
+        # отправляются их отправщиками
+        data_filler._vita_publishers = publishers
+        return data_filler
+
+    def _run_job(self, number: int, data_filler: DataFiller,
+                 table_locks: dict, rate_limiter: RateLimiter) -> dict:
+        report = {
+            'job': number,
+            'table_name': data_filler.table_name,
+            'source_partition': data_filler.source_partition,
+            'target_partition_values': data_filler.target_partition_values,
+        }
+        with table_locks[data_filler.table_name]:
+            rate_limiter.acquire()
+            start = time.monotonic()
+            logger.info(f'Job {number} started: {data_filler.table_name}')
+            try:
+                data_filler.execute()
+                report['status'] = 'success'
+            except Exception as err:
+                logger.error(f'Job {number} failed: {err}')
+                report['status'] = 'failed'
+                report['error'] = str(err)
+        report['duration'] = round(time.monotonic() - start, 3)
+        # команды выполняются общими бэкендами, поэтому в метриках задания
+        # учитываются только шаги и объём скопированных данных
+        if data_filler._metrics is not None:
+            summary = data_filler._metrics.summary()
+            report['stages'] = summary['stages']
+            report['bytes_copied'] = summary['bytes_copied']
+        return report
+
+    def _write_report(self, reports: List[dict], duration: float) -> None:
+        failed = [report for report in reports if report['status'] != 'success']
+        logger.info(f'Bulk run finished in {duration:.3f}s: '
+                    f'{len(reports) - len(failed)} succeeded, {len(failed)} failed')
+        for report in failed:
+            logger.info(f'Failed job {report["job"]} ({report["table_name"]}): '
+                        f'{report["error"]}')
+        if self.report_path:
+            with open(self.report_path, 'w') as report_file:
+                json.dump({'duration': round(duration, 3), 'jobs': reports},
+                          report_file, indent=2, ensure_ascii=False)
+
+    def execute(self) -> None:
+        logger.info('Bulk application started')
+        if not self.manifest_path:
+            raise AttributeError('Please pass on the argument: "manifest_path".')
+        manifest = self._load_manifest()
+        settings = manifest.get('settings', {})
+        jobs = manifest['jobs']
+        table_concurrency = int(manifest.get('table_concurrency', 1))
+        max_parallel_jobs = int(manifest.get('max_parallel_jobs', 1))
+        rate_limiter = RateLimiter(manifest.get('max_jobs_per_minute'))
+        for number, job in enumerate(jobs, 1):
+            self._check_job(number, job)
+
+        template = DataFiller()
+        for name, value in settings.items():
+            setattr(template, name, value)
+        publishers = {}
+        backends = {}
+        table_locks = {}
+        data_fillers = []
+        start = time.monotonic()
+        try:
+            for job in jobs:
+                data_filler = self._create_job(template, settings, job,
+                                               publishers, backends)
+                table_locks.setdefault(data_filler.table_name,
+                                       threading.BoundedSemaphore(table_concurrency))
+                data_fillers.append(data_filler)
+
+            with ThreadPoolExecutor(max_workers=max_parallel_jobs) as executor:
+                reports = list(executor.map(
+                    lambda args: self._run_job(*args, table_locks, rate_limiter),
+                    enumerate(data_fillers, 1)
+                ))
+        finally:
+            for publisher in publishers.values():
+                publisher.close()
+            for owner in backends.values():
+                # общий запускатель команд закрывается вместе с шаблоном
+                owner._runner = None
+                owner._close_backends()
+            template._close_backends()
+        self._write_report(reports, time.monotonic() - start)
+
+        failed = [report for report in reports if report['status'] != 'success']
+        if failed:
+            raise Exception(f'{len(failed)} of {len(reports)} jobs failed')
+        logger.info('Bulk application finished')
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+from collections import deque
+from typing import Any, List, Tuple
+
+logger = logging.getLogger()
+
+
+class AsyncCommandRunner:
+    """
+    Запуск внешних команд на asyncio в отдельном потоке с event loop.
+
+    - одновременно выполняется не больше max_processes команд;
+    - stdout и stderr читаются построчно и пишутся в лог (уровень DEBUG);
+    - stdout сохраняется целиком (его разбирают вызывающие методы),
+      от stderr хранятся только последние tail_lines строк;
+    - команда, не завершившаяся за timeout секунд, принудительно
+      завершается вместе с дочерними процессами.
+
+    Методы run_sync и run_many можно вызывать из любых потоков.
+    """
+
+    STREAM_LIMIT = 8 * 1024 * 1024  # максимальная длина строки вывода
+
+    def __init__(self, max_processes: int = 10, timeout: float = None,
+                 tail_lines: int = 100) -> None:
+        self.timeout = timeout
+        self.tail_lines = tail_lines
+        self._semaphore = asyncio.Semaphore(max(1, max_processes))
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name='command-runner', daemon=True)
+        self._thread.start()
+
+    async def _read_stream(self, stream: asyncio.StreamReader, name: str,
+                           lines: Any) -> None:
+        async for line in stream:
+            logger.debug(f'[{name}] {line.decode(errors="replace").rstrip()}')
+            lines.append(line)
+
+    async def run(self, command: Any, is_shell: bool = False,
+                  timeout: float = None) -> dict:
+        timeout = timeout or self.timeout
+        async with self._semaphore:
+            if is_shell:
+                process = await asyncio.create_subprocess_shell(
+                    command, stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, limit=self.STREAM_LIMIT,
+                    start_new_session=True
+                )
+            else:
+                process = await asyncio.create_subprocess_exec(
+                    *[str(arg) for arg in command],
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE, limit=self.STREAM_LIMIT,
+                    start_new_session=True
+                )
+            stdout, stderr_tail = [], deque(maxlen=self.tail_lines)
+            try:
+                await asyncio.wait_for(asyncio.gather(
+                    self._read_stream(process.stdout, 'stdout', stdout),
+                    self._read_stream(process.stderr, 'stderr', stderr_tail),
+                    process.wait()
+                ), timeout)
+            except asyncio.TimeoutError:
+                # завершаем всю группу процессов (shell и его дочерние процессы)
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+                stderr_tail.append(
+                    f'Command timed out after {timeout}s: {command}'.encode()
+                )
+            return {
+                'stdout': b''.join(stdout),
+                'stderr': b''.join(stderr_tail),
+                'returncode': process.returncode
+            }
+
+    def run_sync(self, command: Any, is_shell: bool = False,
+                 timeout: float = None) -> dict:
+        future = asyncio.run_coroutine_threadsafe(
+            self.run(command, is_shell, timeout), self._loop
+        )
+        return future.result()
+
+    def run_many(self, commands: List[Tuple[Any, bool]]) -> List[dict]:
+        """
+        Одновременный запуск команд [(команда, is_shell)] с ограничением
+        max_processes. Результаты возвращаются в порядке команд.
+        """
+        async def run_all() -> List[dict]:
+            return await asyncio.gather(*[self.run(command, is_shell)
+                                          for command, is_shell in commands])
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self._loop).result()
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -1,14 +1,25 @@
 import logging
+import posixpath
 import re
-import subprocess
+import threading
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from functools import partial
 from pathlib import Path
-from typing import Any, List
-
-import requests
+from typing import Any, Callable, Dict, List, Tuple
 
 from .base import HDFSCommand
+from .command_runner import AsyncCommandRunner
+from .hdfs_backend import AbsHDFSBackend, SubprocessHDFSBackend, WebHDFSBackend
+from .hive_backend import AbsHiveBackend, CliHiveBackend, HiveServer2Backend
+from .journal import StepJournal
+from .listing_cache import ListingCache
+from .metrics import RunMetrics
+from .partition_values import iter_partition_values
+from .statistics_queue import StatisticsQueue
+from .vita import VitaPublisher
+from .vita_outbox import VitaOutbox, VitaOutboxFlusher
 
 logger = logging.getLogger()
 
@@ -16,31 +27,37 @@ logger = logging.getLogger()
 class AbsDataFiller(ABC):
 
     source_partition: str = None  # путь к партиции
-    target_partition_values: str = None  # значения партиций ('YYYY-MM-DD YYYY-MM-DD')
+    # значения партиций ('YYYY-MM-DD YYYY-MM-DD' и/или диапазоны 'YYYY-MM-DD..YYYY-MM-DD[:1d]')
+    target_partition_values: str = None
     table_name: str = None  # наименование таблицы Hive (schema.table_name)
     dlk_ds_code: str = None
     host_api: str = None  # Хост API Vita
 
     # Команды:
-    # постусловие: откат копирования партиции (партиция удалена)
+    # постусловие: откат копирования партиции (партиция удалена;
+    #   при clone_mode='sync' существовавшая до запуска партиция остаётся)
     @abstractmethod
     def rollback_copy_partition(self, partitions: List[str]) -> None: ...
 
-    # постусловие: откат метаданных по протянутой партиции (метаданные удалены)
+    # постусловие: откат метаданных по протянутой партиции (метаданные удалены;
+    #   при clone_mode='sync' метаданные существовавшей партиции остаются)
     @abstractmethod
     def rollback_update_hive_metadata(self, partitions: List[str],
                                       table_name: str) -> None: ...
 
-    # предусловие: target_partition отсутствует
-    # постусловие: source_partition скопирована в target_partition
+    # предусловие: target_partition отсутствует (при clone_mode='sync'
+    #   может существовать)
+    # постусловие: source_partition скопирована в target_partition (при
+    #   clone_mode='sync' файлы target_partition совпадают с source_partition)
     @abstractmethod
     def copy_partition(self, source_partition: str,
                        target_partition: str) -> str: ...
 
-    # постусловие: добавлены метаданные по всем новым партициям
+    # постусловие: добавлены метаданные по всем новым партициям,
+    #   добавленные партиции - в registered_partitions (если задан)
     @abstractmethod
-    def update_hive_metadata(self, partitions: List[str],
-                             table_name: str) -> None: ...
+    def update_hive_metadata(self, partitions: List[str], table_name: str,
+                             registered_partitions: List[str] = None) -> None: ...
 
     # постусловие: обновлена статистика Hive
     @abstractmethod
@@ -68,155 +85,883 @@ class DataFiller(AbsDataFiller, HDFSCommand):
     В случае неуспешного выполнения одной из операций реализованы откаты:
         - _rollback_copy_partition() - удаление созданных партиций
         - _rollback_update_hive_metadata() - удаление метаданых Hive по новым партициям
+    Партиции удаляются пачками (один drop на пачку в Hive, один "rm" на все
+    пути в HDFS); ошибка по одной партиции не прерывает откат остальных.
+
+    Операции с HDFS выполняются через бэкенд (hdfs_backend.py), который
+    выбирается параметром hdfs_backend: 'subprocess' (hadoop fs) или 'webhdfs'.
+    Запросы в Hive - через бэкенд (hive_backend.py), который выбирается
+    параметром hive_backend: 'cli' (hive -e) или 'hiveserver2'.
+
+    При clone_mode='location' файлы не копируются: новые партиции
+    регистрируются в Hive с LOCATION, указывающим на source_partition.
+    Откат метаданных в этом режиме сначала переназначает LOCATION партиции
+    на её собственный (несуществующий) путь, поэтому удаление партиции
+    в Hive никогда не удаляет общие данные source_partition.
+
+    При clone_mode='sync' target_partition может уже существовать:
+    списки файлов и контрольные суммы source_partition и всех target
+    сравниваются пакетно, копируются только отсутствующие и изменённые
+    файлы, лишние файлы удаляются. Существовавшие до запуска партиции
+    при откате не удаляются.
+
+    При stage_mode='pipeline' каждая партиция проходит шаги копирования,
+    метаданных и статистики независимо от остальных (до copy_workers
+    партиций одновременно); с бэкендом 'hiveserver2' это не порождает
+    отдельный процесс Hive на каждый шаг. Статусы в Vita отправляются
+    после успешной обработки всех партиций, чтобы откат не удалил
+    партиции с уже отправленным статусом.
+
+    При заданном journal_path выполненные шаги по каждой партиции
+    записываются в журнал; при ошибке откат не выполняется, а запуск
+    с resume продолжает работу с невыполненных шагов.
+
+    При statistics_mode='deferred' статистика не обновляется во время
+    запуска: партиции добавляются в очередь statistics_queue_path, которую
+    обрабатывает команда HiveStatisticsWorker, а статус в Vita отправляется
+    сразу после добавления метаданных.
+
+    Время каждого шага, количество и время внешних команд, объём
+    скопированных данных записываются в RunMetrics (metrics.py); по
+    окончании запуска сводка сохраняется в metrics_json_path (JSON)
+    и/или metrics_prom_path (textfile для Prometheus node_exporter).
+
+    При заданном listing_cache_path листинги родительских директорий для
+    проверки существования партиций берутся из кэша (listing_cache.py)
+    не старше listing_cache_ttl секунд, но только для быстрого отказа:
+    если по кэшу партиция уже существует. Отсутствие партиций всегда
+    проверяется по актуальному листингу HDFS (её могли создать не через
+    DataFiller). Кэш директории сбрасывается перед записью в неё и после
+    окончания запуска.
+
+    При заданном vita_outbox_path статусы Vita не отправляются на шаге
+    "статус", а записываются в очередь (vita_outbox.py), которую во время
+    запуска отправляет фоновый поток, а по окончании запуска - последний
+    flush. Не отправленные статусы остаются в очереди и отправляются
+    следующими запусками или командой "vita_outbox drain".
 
     Абстрактный метод "execute" наследуется из родительского класса "HDFSCommand" -
     в нем необходимо реализовать всю логику команды.
     """
 
     source_partition: str = None  # путь к партиции
-    target_partition_values: str = None  # значения партиций ('YYYY-MM-DD YYYY-MM-DD')
+    # значения партиций ('YYYY-MM-DD YYYY-MM-DD' и/или диапазоны 'YYYY-MM-DD..YYYY-MM-DD[:1d]')
+    target_partition_values: str = None
     table_name: str = None  # наименование таблицы Hive (schema.table_name)
     dlk_ds_code: str = None
     host_api: str = None  # Хост API Vita
 
+    # Необязательные параметры (не проверяются в _check_valid_attributes)
+    _optional_attributes = ('copy_workers', 'hdfs_backend',
+                            'webhdfs_url', 'webhdfs_user',
+                            'hive_backend', 'hive_host', 'hive_port',
+                            'hive_user', 'vita_workers', 'vita_batch_size',
+                            'clone_mode', 'stage_mode', 'copy_strategy',
+                            'distcp_threshold_bytes', 'distcp_maps', 'dry_run',
+                            'journal_path', 'resume', 'max_processes',
+                            'command_timeout', 'hive_batch_size',
+                            'statistics_mode', 'statistics_queue_path',
+                            'metrics_json_path', 'metrics_prom_path',
+                            'listing_cache_path', 'listing_cache_ttl',
+                            'vita_outbox_path', 'vita_flush_interval')
+    copy_workers: int = 1  # количество одновременных копирований партиций
+    hdfs_backend: str = 'subprocess'  # 'subprocess' (hadoop fs) или 'webhdfs'
+    webhdfs_url: str = None  # адрес WebHDFS/HttpFS (http://host:port)
+    webhdfs_user: str = None  # пользователь для WebHDFS (user.name)
+    hive_backend: str = 'cli'  # 'cli' (hive -e) или 'hiveserver2'
+    hive_host: str = None  # хост HiveServer2
+    hive_port: int = 10000  # порт HiveServer2
+    hive_user: str = None  # пользователь HiveServer2
+    vita_workers: int = 1  # количество одновременных запросов в Vita
+    vita_batch_size: int = 1  # количество партиций в одном запросе в Vita
+    clone_mode: str = 'copy'  # 'copy' (hadoop fs -cp), 'location' (без копирования) или 'sync'
+    stage_mode: str = 'barrier'  # 'barrier' (шаг по всем партициям) или 'pipeline'
+    copy_strategy: str = 'cp'  # 'cp', 'distcp' или 'auto' (выбор по размеру)
+    distcp_threshold_bytes: int = 1024 ** 3  # с какого размера партиции 'auto' выбирает distcp
+    distcp_maps: int = 20  # количество мапперов в одной задаче distcp
+    dry_run: bool = False  # только вывести план копирования, ничего не выполняя
+    journal_path: str = None  # файл журнала шагов (при ошибке откат не выполняется)
+    resume: bool = False  # продолжить запуск по журналу journal_path
+    max_processes: int = 10  # количество одновременно запущенных команд (hadoop, hive)
+    command_timeout: int = None  # таймаут одной команды в секундах
+    hive_batch_size: int = 200  # количество партиций в одном ALTER TABLE ADD PARTITION
+    statistics_mode: str = 'sync'  # 'sync' или 'deferred' (через очередь statistics_queue_path)
+    statistics_queue_path: str = None  # файл SQLite очереди отложенной статистики
+    metrics_json_path: str = None  # файл JSON-сводки метрик запуска
+    metrics_prom_path: str = None  # файл метрик для textfile collector Prometheus
+    listing_cache_path: str = None  # файл SQLite кэша листингов HDFS
+    listing_cache_ttl: int = 300  # время жизни записи кэша листингов в секундах
+    vita_outbox_path: str = None  # файл SQLite очереди статусов Vita
+    vita_flush_interval: float = 1  # период фоновой отправки статусов в секундах
+
+    _shared_backends: bool = False  # бэкенды принадлежат BulkDataFiller и не закрываются
+    # бэкенды создаются по требованию, в том числе из потоков пула
+    _backends_lock = threading.Lock()
+    _runner: AsyncCommandRunner = None
+    _hdfs: AbsHDFSBackend = None
+    _hive: AbsHiveBackend = None
+    _vita_publishers: Dict[str, VitaPublisher] = None  # {host_api: отправщик}
+    _copy_plan: dict = None
+    _journal: StepJournal = None
+    _sync_plan: dict = None
+    _metrics: RunMetrics = None
+    _listing_cache: ListingCache = None
+    _vita_flusher: VitaOutboxFlusher = None
+
     def _get_partition_key_value(self, partition: str) -> List[str]:
         partititon_name = Path(partition).stem.split('=')
         return [partititon_name[0], partititon_name[1]]
 
+    def _get_runner(self) -> AsyncCommandRunner:
+        if self._runner is None:
+            self._runner = AsyncCommandRunner(
+                int(self.max_processes or 10),
+                float(self.command_timeout) if self.command_timeout else None
+            )
+        return self._runner
+
+    def _get_metrics(self) -> RunMetrics:
+        if self._metrics is None:
+            self._metrics = RunMetrics({'table': self.table_name})
+        return self._metrics
+
+    def _is_metrics_export(self) -> bool:
+        return bool(self.metrics_json_path or self.metrics_prom_path)
+
+    def _export_metrics(self, status: str) -> None:
+        metrics = self._get_metrics()
+        metrics.status = status
+        summary = metrics.summary()
+        logger.info(f'Run metrics: wall seconds: {summary["wall_seconds"]}, '
+                    f'processes: {summary["processes"]}, '
+                    f'bytes copied: {summary["bytes_copied"]}, '
+                    f'stages: {summary["stages"]}')
+        try:
+            if self.metrics_json_path:
+                metrics.write_json(self.metrics_json_path)
+            if self.metrics_prom_path:
+                metrics.write_prometheus(self.metrics_prom_path)
+        except OSError as err:
+            # ошибка записи метрик не должна менять результат запуска
+            logger.error(f'Failed to write run metrics: {err}')
+
     def _bash_execute(self, command: Any, is_shell=False) -> dict:
-        process = subprocess.Popen(
-            command,
-            shell=is_shell,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        stdout, stderr = process.communicate()
-        return {
-            'stdout': stdout,
-            'stderr': stderr,
-            'returncode': process.returncode
-        }
+        start = time.monotonic()
+        result = self._get_runner().run_sync(command, is_shell)
+        self._get_metrics().record_command(command, time.monotonic() - start,
+                                           result['returncode'])
+        return result
 
-    def _check_dir_not_exists(self, target_partitions: List[str]) -> None:
+    def _get_hdfs(self) -> AbsHDFSBackend:
+        with self._backends_lock:
+            if self._hdfs is None:
+                backend = self.hdfs_backend or 'subprocess'
+                if backend == 'subprocess':
+                    self._hdfs = SubprocessHDFSBackend(self._bash_execute)
+                elif backend == 'webhdfs':
+                    if not self.webhdfs_url:
+                        raise AttributeError(
+                            'Please pass on the argument: "webhdfs_url".'
+                        )
+                    self._hdfs = WebHDFSBackend(self.webhdfs_url,
+                                                self.webhdfs_user,
+                                                int(self.copy_workers or 1))
+                else:
+                    raise AttributeError(f'Unknown hdfs_backend: "{backend}".')
+            return self._hdfs
+
+    def _get_hive(self) -> AbsHiveBackend:
+        with self._backends_lock:
+            if self._hive is None:
+                backend = self.hive_backend or 'cli'
+                if backend == 'cli':
+                    self._hive = CliHiveBackend(self._bash_execute)
+                elif backend == 'hiveserver2':
+                    if not self.hive_host:
+                        raise AttributeError(
+                            'Please pass on the argument: "hive_host".'
+                        )
+                    from pyhive import hive  # необязательная зависимость
+                    connect = partial(hive.connect, host=self.hive_host,
+                                      port=int(self.hive_port or 10000),
+                                      username=self.hive_user)
+                    self._hive = HiveServer2Backend(connect,
+                                                    int(self.copy_workers or 1))
+                else:
+                    raise AttributeError(f'Unknown hive_backend: "{backend}".')
+            return self._hive
+
+    def _is_pipeline_mode(self) -> bool:
+        stage_mode = self.stage_mode or 'barrier'
+        if stage_mode not in ('barrier', 'pipeline'):
+            raise AttributeError(f'Unknown stage_mode: "{stage_mode}".')
+        return stage_mode == 'pipeline'
+
+    def _get_vita(self, host_api: str) -> VitaPublisher:
+        # отдельный отправщик на каждый хост: в очереди статусов
+        # (vita_outbox_path) могут быть статусы других запусков и хостов
+        with self._backends_lock:
+            if self._vita_publishers is None:
+                self._vita_publishers = {}
+            if host_api not in self._vita_publishers:
+                self._vita_publishers[host_api] = VitaPublisher(
+                    host_api, int(self.vita_workers or 1),
+                    int(self.vita_batch_size or 1)
+                )
+            return self._vita_publishers[host_api]
+
+    def _get_vita_outbox(self) -> VitaOutbox:
+        return VitaOutbox(self.vita_outbox_path) if self.vita_outbox_path else None
+
+    def _flush_vita_outbox(self) -> dict:
+        metrics = self._get_metrics()
+        with metrics.stage('vita_flush'):
+            result = self._get_vita_outbox().flush(self._get_vita)
+        metrics.add_retry(result['retried'])
+        return result
+
+    def _start_vita_flusher(self) -> None:
+        if self.vita_outbox_path and self._vita_flusher is None:
+            self._get_vita(self.host_api)
+            self._vita_flusher = VitaOutboxFlusher(
+                self._flush_vita_outbox, float(self.vita_flush_interval or 1)
+            )
+            self._vita_flusher.start()
+
+    def _stop_vita_flusher(self) -> None:
+        if self._vita_flusher is None:
+            return
+        try:
+            self._vita_flusher.stop()
+            depth = self._get_vita_outbox().depth()
+            self._get_metrics().set_gauge('vita_outbox_depth', depth)
+            if depth:
+                logger.warning(f'{depth} Vita statuses remain in outbox '
+                               f'{self.vita_outbox_path}')
+        except Exception as err:
+            # статусы остаются в очереди и будут отправлены позже
+            logger.error(f'Vita outbox flush failed: {err}')
+        self._vita_flusher = None
+
+    def _get_clone_mode(self) -> str:
+        clone_mode = self.clone_mode or 'copy'
+        if clone_mode not in ('copy', 'location', 'sync'):
+            raise AttributeError(f'Unknown clone_mode: "{clone_mode}".')
+        return clone_mode
+
+    def _is_location_mode(self) -> bool:
+        return self._get_clone_mode() == 'location'
+
+    def _is_sync_mode(self) -> bool:
+        return self._get_clone_mode() == 'sync'
+
+    def _is_deferred_statistics(self) -> bool:
+        statistics_mode = self.statistics_mode or 'sync'
+        if statistics_mode not in ('sync', 'deferred'):
+            raise AttributeError(f'Unknown statistics_mode: "{statistics_mode}".')
+        if statistics_mode == 'deferred' and not self.statistics_queue_path:
+            raise AttributeError(
+                'Please pass on the argument: "statistics_queue_path".'
+            )
+        return statistics_mode == 'deferred'
+
+    def _update_statistics(self, partitions: List[str]) -> None:
+        if not self._is_deferred_statistics():
+            self.update_hive_statistics(partitions, self.table_name)
+            return
+        parts = [tuple(self._get_partition_key_value(partition))
+                 for partition in partitions]
+        StatisticsQueue(self.statistics_queue_path).enqueue(self.table_name, parts)
+        logger.info(f'Statistics update is queued for the partitions: {partitions}')
+
+    def _execute_hive(self, statements: List[str]) -> None:
+        result = self._get_hive().execute(statements)
+        if result['error']:
+            raise Exception(result['error'])
+
+    def _get_listing_cache(self) -> ListingCache:
+        if self._listing_cache is None and self.listing_cache_path:
+            self._listing_cache = ListingCache(
+                self.listing_cache_path,
+                float(self.listing_cache_ttl if self.listing_cache_ttl is not None
+                      else 300)
+            )
+        return self._listing_cache
+
+    def _list_parent_dir(self, parent_dir: str) -> List[str]:
+        entries = self._get_hdfs().list_dir(parent_dir)
+        cache = self._get_listing_cache()
+        if cache is not None:
+            cache.put(Path(parent_dir).as_posix(), entries)
+        return entries
+
+    def _invalidate_listing_cache(self, partitions: List[str]) -> None:
+        cache = self._get_listing_cache()
+        if cache is not None:
+            cache.invalidate([Path(partition).parent.as_posix()
+                              for partition in partitions])
+
+    def _get_existing_partitions(self, target_partitions: List[str],
+                                 use_cache: bool = True) -> List[str]:
+        # один листинг на родительскую директорию вместо "-test -d" на
+        # каждую партицию
+        partitions_by_parent = {}
         for dir in target_partitions:
-            logger.info(f'Checking target partition: {dir}')
+            partitions_by_parent.setdefault(Path(dir).parent, []).append(dir)
+
+        def existing(entries: List[str], partitions: List[str]) -> List[str]:
+            existing_names = {Path(path).name for path in entries}
+            return [dir for dir in partitions if Path(dir).name in existing_names]
 
-            command = ['hadoop', 'fs', '-test', '-d', dir]
-            process = self._bash_execute(command)
-            if not process['returncode']:
-                raise Exception(f'Partition already exists: {dir}. ' +
-                                'Choose another target partition')
+        cache = self._get_listing_cache() if use_cache else None
+        existing_partitions = []
+        for parent_dir, partitions in partitions_by_parent.items():
+            logger.info(f'Checking {len(partitions)} target partitions '
+                        f'in: {parent_dir}')
+            # кэшу можно верить только в том, что партиция уже существует:
+            # отказ по устаревшему листингу безопасен, а запись в партицию,
+            # созданную после кэширования, - нет
+            entries = (cache.get(Path(parent_dir).as_posix())
+                       if cache is not None else None)
+            if entries is not None and existing(entries, partitions):
+                logger.info(f'Existing partitions are found in cached listing: '
+                            f'{parent_dir}')
+                existing_partitions.extend(existing(entries, partitions))
+                continue
+            existing_partitions.extend(
+                existing(self._list_parent_dir(parent_dir), partitions)
+            )
+        return existing_partitions
+
+    def _check_dir_not_exists(self, target_partitions: List[str]) -> None:
+        for dir in self._get_existing_partitions(target_partitions):
+            raise Exception(f'Partition already exists: {dir}. ' +
+                            'Choose another target partition')
+
+    def _plan_sync(self, source_partition: str,
+                   target_partitions: List[str]) -> dict:
+        """
+        Сравнение source_partition с уже существующими target_partitions.
+        Списки файлов всех партиций получаются одним запросом, контрольные
+        суммы файлов одинакового размера - ещё одним.
+        Возвращает {target: {'copy': [файлы], 'remove': [файлы]}}
+        (пути файлов относительно партиции) только для существующих target.
+        """
+        hdfs = self._get_hdfs()
+        existing = [Path(partition).as_posix() for partition
+                    in self._get_existing_partitions(target_partitions,
+                                                     use_cache=False)]
+        if not existing:
+            return {}
+        source_root = Path(source_partition).as_posix()
+        listings = hdfs.list_files([source_root] + existing)
+        source_files = listings[source_root]
+
+        to_compare = []
+        for target in existing:
+            target_files = listings[target]
+            to_compare.extend(
+                (target, name) for name, size in source_files.items()
+                if target_files.get(name) == size
+            )
+        paths = {f'{source_root}/{name}' for _, name in to_compare}
+        paths.update(f'{target}/{name}' for target, name in to_compare)
+        checksums = hdfs.checksums(sorted(paths))
+        equal_files = {(target, name) for target, name in to_compare
+                       if checksums.get(f'{target}/{name}') is not None
+                       and checksums.get(f'{target}/{name}')
+                       == checksums.get(f'{source_root}/{name}')}
+
+        sync_plan = {}
+        for target in existing:
+            to_copy = sorted(name for name in source_files
+                             if (target, name) not in equal_files)
+            sync_plan[target] = {
+                'copy': to_copy,
+                'copy_bytes': sum(source_files[name] for name in to_copy),
+                'remove': sorted(name for name in listings[target]
+                                 if name not in source_files),
+            }
+            logger.info(f'Sync plan for {target}: '
+                        f'copy {len(sync_plan[target]["copy"])} files, '
+                        f'remove {len(sync_plan[target]["remove"])} files')
+        return sync_plan
+
+    def _sync_partition(self, source_partition: str, target_partition: str,
+                        sync_plan: dict) -> None:
+        hdfs = self._get_hdfs()
+        source_root = Path(source_partition).as_posix()
+        files_by_dir = {}
+        for name in sync_plan['copy']:
+            files_by_dir.setdefault(posixpath.dirname(name), []).append(name)
+        for dir_name, names in files_by_dir.items():
+            target_dir = (posixpath.join(target_partition, dir_name)
+                          if dir_name else target_partition)
+            hdfs.copy_files([f'{source_root}/{name}' for name in names], target_dir)
+        for name in sync_plan['remove']:
+            hdfs.remove(f'{target_partition}/{name}')
+        self._get_metrics().add_bytes(sync_plan.get('copy_bytes', 0))
 
     def rollback_copy_partition(self, partitions: List[str]) -> None:
         logger.info('Rollback partition copying...')
 
+        to_remove = []
+        for partition in partitions:
+            if self._sync_plan and partition in self._sync_plan:
+                logger.info(f'Partition existed before sync, not deleted: {partition}')
+                continue
+            to_remove.append(partition)
+        if not to_remove:
+            return
+        errors = self._get_hdfs().remove_many(to_remove)
+        for partition in to_remove:
+            if partition in errors:
+                logger.error(f'Failed to delete: {partition}: {errors[partition]}')
+            else:
+                logger.info(f'Deleted: {partition}')
+        if errors:
+            raise Exception(f'Rollback partition copying failed for '
+                            f'{len(errors)}/{len(to_remove)} partitions: '
+                            f'{sorted(errors)}')
+
+    def _create_hive_statements_drop(self, partitions: List[str],
+                                     table_name: str) -> List[str]:
+        # partitions - только добавленные этим запуском (registered_partitions):
+        # SET LOCATION отсутствующей в Hive партиции прерывает всю сессию
+        statements, partition_specs = [], []
         for partition in partitions:
-            command = ['hadoop', 'fs', '-rm', '-R', partition]
-            process = self._bash_execute(command)
-            if process['returncode']:
-                raise Exception(process['stderr'])
-            logger.info(f'Deleted: {partition}')
+            key, value = self._get_partition_key_value(partition)
+            partition_spec = f'partition ({key}=\'{value}\')'
+            if self._is_location_mode():
+                # для managed-таблиц drop удаляет данные по LOCATION партиции,
+                # поэтому сначала уводим LOCATION с общей source_partition
+                statements.append(f'alter table {table_name} {partition_spec} '
+                                  f'set location \'{partition}\'')
+            partition_specs.append(partition_spec)
+        # одна команда drop на всю пачку партиций
+        statements.append(f'alter table {table_name} drop if exists '
+                          + ', '.join(partition_specs))
+        return statements
+
+    def _map_concurrently(self, func: Callable[[Any], Any],
+                          items: List[Any]) -> List[Any]:
+        # в отличие от _run_concurrently не прерывается на ошибке:
+        # func сама обрабатывает свои ошибки
+        workers = max(1, int(self.copy_workers or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
 
     def rollback_update_hive_metadata(self, partitions: List[str],
                                       table_name: str) -> None:
         logger.info('Rollback update Hive metadata...')
-        for partition in partitions:
-            key, value = self._get_partition_key_value(partition)
-            command = f'hive -e "alter table {table_name} '
-            command += f'drop if exists partition ({key}=\'{value}\');"'
-            process = self._bash_execute(command, is_shell=True)
-            if process['returncode']:
-                raise Exception(process['stderr'])
-            logger.info(f'Metadata droped for partition: {partition}')
+        if self._sync_plan:
+            # существовавшие до синхронизации партиции остаются в Hive
+            partitions = [partition for partition in partitions
+                          if partition not in self._sync_plan]
+        if not partitions:
+            return
+        if self._is_deferred_statistics():
+            # статистика по удаляемым партициям больше не нужна
+            StatisticsQueue(self.statistics_queue_path).cancel(
+                table_name,
+                [tuple(self._get_partition_key_value(p)) for p in partitions]
+            )
+        if self.vita_outbox_path:
+            # как и неотправленные статусы
+            self._get_vita_outbox().cancel(
+                self.host_api, self.dlk_ds_code,
+                [tuple(self._get_partition_key_value(p)) for p in partitions]
+            )
+        batch_size = max(1, int(self.hive_batch_size or 200))
+        batches = [partitions[i:i + batch_size]
+                   for i in range(0, len(partitions), batch_size)]
+
+        def drop(batch: List[str]) -> dict:
+            result = self._get_hive().execute(
+                self._create_hive_statements_drop(batch, table_name)
+            )
+            if not result['error']:
+                for partition in batch:
+                    logger.info(f'Metadata droped for partition: {partition}')
+                return {}
+            if len(batch) == 1:
+                logger.error(f'Failed to drop metadata for partition: '
+                             f'{batch[0]}: {result["error"]}')
+                return {batch[0]: result['error']}
+            # ошибка одной партиции не должна оставлять в Hive остальные:
+            # пачка повторяется по одной партиции
+            errors = {}
+            for partition_errors in self._map_concurrently(
+                    drop, [[partition] for partition in batch]):
+                errors.update(partition_errors)
+            return errors
+
+        errors = {}
+        for batch_errors in self._map_concurrently(drop, batches):
+            errors.update(batch_errors)
+        if errors:
+            raise Exception(f'Rollback update Hive metadata failed for '
+                            f'{len(errors)}/{len(partitions)} partitions: '
+                            f'{sorted(errors)}')
 
     def copy_partition(self, source_partition: str,
                        target_partition: str) -> str:
         logger.info(
             f'Start copying: {source_partition} -> {target_partition}'
         )
-        command = ['hadoop', 'fs', '-cp', '-f', source_partition, target_partition]
-        process = self._bash_execute(command)
-        if process['returncode']:
-            raise Exception(process['stderr'])
+        if self._sync_plan and target_partition.as_posix() in self._sync_plan:
+            self._sync_partition(source_partition, target_partition.as_posix(),
+                                 self._sync_plan[target_partition.as_posix()])
+        elif self._copy_plan and self._copy_plan['strategy'] == 'distcp':
+            self._get_hdfs().distcp(source_partition, target_partition,
+                                    self._copy_plan['maps'])
+        else:
+            self._get_hdfs().copy(source_partition, target_partition)
+        if (self._copy_plan and self._copy_plan['partition_bytes']
+                and target_partition.as_posix() not in (self._sync_plan or {})):
+            self._get_metrics().add_bytes(self._copy_plan['partition_bytes'])
         logger.info(f'Success copy: {source_partition} -> {target_partition}')
         return target_partition.as_posix()
 
-    def _create_hive_command_add_partition(self, partitions: List[str],
-                                           table_name: str) -> str:
-        command = f'hive -e "alter table {table_name} add '
-        add_partititon_commands = []
+    def _plan_copy(self, source_partition: str,
+                   target_partitions: List[str]) -> dict:
+        """
+        Выбор способа копирования для всего запуска:
+            - 'location' - без копирования (clone_mode='location');
+            - 'cp' - hadoop fs -cp, все байты идут через один клиент;
+            - 'distcp' - распределённое копирование задачей MapReduce.
+        При copy_strategy='auto' размер source_partition определяется
+        один раз (du) и сравнивается с distcp_threshold_bytes; он же
+        используется для подсчёта скопированных байт в метриках.
+        """
+        workers = max(1, int(self.copy_workers or 1))
+        maps = max(1, int(self.distcp_maps or 1))
+        strategy = self.copy_strategy or 'cp'
+        if strategy not in ('cp', 'distcp', 'auto'):
+            raise AttributeError(f'Unknown copy_strategy: "{strategy}".')
+        hdfs = self._get_hdfs()
+
+        partition_bytes = None
+        if self._is_location_mode():
+            strategy = 'location'
+            partition_bytes = 0
+        elif strategy == 'auto' or self.dry_run or self._is_metrics_export():
+            partition_bytes = hdfs.du(source_partition)
+        if strategy == 'auto':
+            threshold = int(self.distcp_threshold_bytes or 0)
+            strategy = ('distcp' if hdfs.supports_distcp
+                        and partition_bytes >= threshold else 'cp')
+        if strategy == 'distcp' and not hdfs.supports_distcp:
+            raise AttributeError(
+                f'copy_strategy "distcp" is not supported by '
+                f'hdfs_backend "{self.hdfs_backend}".'
+            )
+
+        parallelism = {'location': 0, 'cp': workers, 'distcp': workers * maps}
+        return {
+            'strategy': strategy,
+            'partitions': len(target_partitions),
+            'partition_bytes': partition_bytes,
+            'total_bytes': (partition_bytes * len(target_partitions)
+                            if partition_bytes is not None else None),
+            'parallelism': parallelism[strategy],
+            'maps': maps,
+        }
+
+    def _log_copy_plan(self, plan: dict) -> None:
+        logger.info(
+            f'Copy plan: strategy: {plan["strategy"]}, '
+            f'partitions: {plan["partitions"]}, '
+            f'bytes per partition: {plan["partition_bytes"]}, '
+            f'estimated bytes: {plan["total_bytes"]}, '
+            f'parallelism: {plan["parallelism"]}'
+        )
+
+    def _run_concurrently(self, func: Callable[[Any], None],
+                          items: List[Any]) -> None:
+        """
+        Выполнение func для каждого элемента items пулом из copy_workers
+        потоков. При первой ошибке новые задачи не запускаются, уже
+        запущенные дожидаются завершения, после чего ошибка пробрасывается.
+        """
+        workers = max(1, int(self.copy_workers or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in pending:
+                future.cancel()
+        errors = [future.exception() for future in futures
+                  if not future.cancelled() and future.exception()]
+        if errors:
+            raise errors[0]
+
+    def _copy_partitions(self, source_partition: str,
+                         target_partitions: List[str],
+                         created_partitions: List[str]) -> None:
+        """
+        Копирование source_partition во все target_partitions.
+        Успешно скопированные партиции добавляются в created_partitions
+        сразу по завершении копирования, поэтому при ошибке список
+        содержит ровно созданные партиции.
+        """
+        total = len(target_partitions)
+        logger.info(f'Copying {total} partitions, workers: {self.copy_workers}')
+
+        def copy(partition: str) -> None:
+            created_partition = self._copy_partition_journaled(source_partition,
+                                                               partition)
+            created_partitions.append(created_partition)
+            logger.info(f'Copied {len(created_partitions)}/{total}: '
+                        f'{created_partition}')
+
+        self._run_concurrently(copy, target_partitions)
+
+    def _copy_partition_journaled(self, source_partition: str,
+                                  target_partition: str) -> str:
+        # отметка "copy_started" позволяет при возобновлении найти
+        # и удалить частично скопированную партицию
+        self._journal.mark_done([target_partition.as_posix()], 'copy_started')
+        created_partition = self.copy_partition(source_partition, target_partition)
+        self._journal.mark_done([created_partition], 'copy')
+        return created_partition
+
+    def _restore_from_journal(self, target_partitions: List[str]
+                              ) -> Tuple[List[str], List[str]]:
+        """
+        Сверка журнала с HDFS перед возобновлением запуска:
+            - скопированная по журналу, но отсутствующая партиция
+              копируется заново;
+            - начатая, но не завершённая копия удаляется.
+        Возвращает партиции, которые ещё предстоит скопировать, и начатые
+        копии. При dry_run журнал и HDFS не изменяются, действия только
+        выводятся в лог.
+        """
+        journal = self._journal
+        # сверка с журналом выполняется только по актуальному листингу
+        existing_partitions = self._get_existing_partitions(target_partitions,
+                                                            use_cache=False)
+        partitions_to_copy, partially_copied = [], []
+        for partition in target_partitions:
+            key = partition.as_posix()
+            exists = partition in existing_partitions
+            copied = journal.is_done(key, 'copy')
+            if copied and not exists:
+                logger.warning(f'Partition from journal not found, copy again: {key}')
+                if not self.dry_run:
+                    journal.unmark(key, 'copy')
+                copied = False
+            elif (journal.is_done(key, 'copy_started') and not copied and exists
+                  and not self._is_sync_mode()):
+                # в режиме sync частичная копия будет досинхронизирована
+                partially_copied.append(partition)
+                if self.dry_run:
+                    logger.info(f'Dry run: partially copied partition '
+                                f'would be removed: {key}')
+                else:
+                    logger.info(f'Removing partially copied partition: {key}')
+                    self._invalidate_listing_cache([key])
+                    self._get_hdfs().remove(key)
+            if not copied:
+                partitions_to_copy.append(partition)
+        return partitions_to_copy, partially_copied
+
+    def _process_partitions_pipeline(self, target_partitions: List[str],
+                                     copied_partitions: List[str],
+                                     registered_partitions: List[str]) -> None:
+        """
+        Конвейерное выполнение: каждая партиция независимо проходит шаги
+        копирование -> метаданные -> статистика, поэтому шаги разных
+        партиций выполняются одновременно. Статус отправляется одним
+        шагом по всем партициям после их обработки: при ошибке любой
+        партиции откатываются все, и в Vita не должно остаться статусов
+        удалённых партиций.
+        Журнал отката ведётся по каждой партиции: copied_partitions -
+        скопированные, registered_partitions - добавленные в Hive.
+        Время шагов в метриках суммируется по всем партициям.
+        """
+        total = len(target_partitions)
+        finished_partitions = []
+
+        journal = self._journal
+        metrics = self._get_metrics()
+
+        def process(partition: str) -> None:
+            created_partition = partition.as_posix()
+            if (not self._is_location_mode()
+                    and not journal.is_done(created_partition, 'copy')):
+                with metrics.stage('copy'):
+                    created_partition = self._copy_partition_journaled(
+                        self.source_partition, partition
+                    )
+                copied_partitions.append(created_partition)
+            if not journal.is_done(created_partition, 'metadata'):
+                with metrics.stage('metadata'):
+                    self.update_hive_metadata([created_partition], self.table_name,
+                                              registered_partitions)
+                journal.mark_done([created_partition], 'metadata')
+            if not journal.is_done(created_partition, 'statistics'):
+                with metrics.stage('statistics'):
+                    self._update_statistics([created_partition])
+                journal.mark_done([created_partition], 'statistics')
+            finished_partitions.append(created_partition)
+            logger.info(f'Partition processed {len(finished_partitions)}/{total}: '
+                        f'{created_partition}')
+
+        self._run_concurrently(process, target_partitions)
+
+        # все партиции обработаны, статусы - в порядке target_partitions
+        partitions = journal.not_done([partition.as_posix()
+                                       for partition in target_partitions], 'status')
+        if partitions:
+            with metrics.stage('status'):
+                self.add_vita_status(partitions,
+                                     self.dlk_ds_code,
+                                     self.host_api)
+            journal.mark_done(partitions, 'status')
+
+    def _create_hive_statement_add_partition(self, partitions: List[str],
+                                             table_name: str) -> str:
+        statement = f'alter table {table_name} add '
+        if self._is_sync_mode():
+            statement += 'if not exists '
+        add_partititon_statements = []
         for partition in partitions:
             key, value = self._get_partition_key_value(partition)
-            add_partititon_commands.append(
-                f"partition ({key}=\'{value}\')"
-            )
-        add_partititons = (' ').join(add_partititon_commands)
-        command += add_partititons + ';"'
-        return command
+            add_partititon_statement = f"partition ({key}=\'{value}\')"
+            if self._is_location_mode():
+                add_partititon_statement += f" location \'{self.source_partition}\'"
+            add_partititon_statements.append(add_partititon_statement)
+        add_partititons = (' ').join(add_partititon_statements)
+        statement += add_partititons
+        return statement
 
-    def update_hive_metadata(self, partitions: List[str], table_name: str) -> None:
+    def update_hive_metadata(self, partitions: List[str], table_name: str,
+                             registered_partitions: List[str] = None) -> None:
+        """
+        Добавление партиций пачками по hive_batch_size, пачки выполняются
+        одновременно (ограничения на длину запроса и командной строки).
+        Партиции успешно выполненной пачки добавляются в registered_partitions
+        сразу по её завершении, поэтому при ошибке список содержит ровно
+        добавленные партиции: откат не должен удалять партиции, которые
+        уже были в Hive (ошибка AlreadyExists).
+        """
         logger.info('Starting to update Hive metadata...')
-        command = self._create_hive_command_add_partition(partitions, table_name)
-        process = self._bash_execute(command, is_shell=True)
-        if process['returncode']:
-            raise Exception(process['stderr'])
+        batch_size = max(1, int(self.hive_batch_size or 200))
+        batches = [partitions[i:i + batch_size]
+                   for i in range(0, len(partitions), batch_size)]
+
+        def add_partitions(batch: List[str]) -> None:
+            statement = self._create_hive_statement_add_partition(batch, table_name)
+            self._execute_hive([statement])
+            if registered_partitions is not None:
+                registered_partitions.extend(batch)
+            if len(batches) > 1:
+                logger.info(f'Metadata Hive updated for {len(batch)} partitions: '
+                            f'{batch[0]} .. {batch[-1]}')
+
+        self._run_concurrently(add_partitions, batches)
 
         logger.info(
             f'Metadata Hive successfully updated for the partitions: {partitions}'
         )
 
-    def update_hive_statistics(self, partitions: List[str], table_name: str) -> None:
-        logger.info('Starting to update Hive statistics...')
+    def _create_hive_statements_analyze(self, partitions: List[str],
+                                        table_name: str) -> List[str]:
+        statements = []
         for partition in partitions:
             key, value = self._get_partition_key_value(partition)
-            command = 'hive -e '
-            command += f'"analyze table {table_name} '
-            command += f'partition ({key}=\'{value}\') compute statistics;"'
-
-            process = self._bash_execute(command, is_shell=True)
-            if process['returncode']:
-                raise Exception(process['stderr'])
+            statements.append(
+                f'analyze table {table_name} '
+                f'partition ({key}=\'{value}\') compute statistics'
+            )
+        return statements
 
+    def update_hive_statistics(self, partitions: List[str], table_name: str) -> None:
+        logger.info('Starting to update Hive statistics...')
+        # все запросы выполняются в одной сессии Hive, по числу выполненных
+        # запросов определяем, на какой партиции произошла ошибка
+        statements = self._create_hive_statements_analyze(partitions, table_name)
+        result = self._get_hive().execute(statements)
+        for partition in partitions[:result['completed']]:
             logger.info(
                 f'Statistics successfully updated for the partition: {partition}'
             )
+        if result['error']:
+            if result['started'] > result['completed']:
+                failed_partition = partitions[result['completed']]
+                logger.error(
+                    f'Statistics update failed for the partition: {failed_partition}'
+                )
+            else:
+                # ошибка запуска сессии Hive, а не запроса по партиции
+                logger.error(
+                    f'Statistics update failed before any statement started '
+                    f'for the partitions: {partitions[result["completed"]:]}'
+                )
+            raise Exception(result['error'])
 
     def add_vita_status(self, partitions: List[str],
                         dlk_ds_code: str, host_api: str) -> None:
-        for partition in partitions:
-            key, value = self._get_partition_key_value(partition)
-            execution_date = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S+00:00")
-            json_data = {
-                "dlk_ds_code": dlk_ds_code,
-                "dlk_parts": [{"name": key, "value": value}],
-                "status": "F",
-                "execution_date": execution_date,
-            }
-            logger.info(f'Sending "F" status for {dlk_ds_code} ({key}={value})')
-            response = requests.post(
-                url=f'http://{host_api}:8002' + "/v2/add_status",
-                json=json_data,
-                headers={
-                    "accept": "application/json",
-                    "Content-Type": "application/json",
-                }
-            )
-            if response.status_code != 200:
-                raise Exception(f'Error: ({response.status_code}): {response.text}')
+        parts = [tuple(self._get_partition_key_value(partition))
+                 for partition in partitions]
+        if self.vita_outbox_path:
+            self._get_vita_outbox().enqueue(host_api, dlk_ds_code, parts)
+            logger.info(f'Vita statuses are queued for the partitions: {partitions}')
+            return
+        self._get_vita(host_api).publish(dlk_ds_code, parts)
 
-            logger.info(
-                f'Status "F" has been sent for {dlk_ds_code} ({key}={value})'
-            )
-            logger.info(
-                f'Response from Vita ({response.status_code}): {response.text}'
-            )
+    def _process_partitions_barrier(self, target_partitions: List[str],
+                                    rollbacks: dict) -> None:
+        """
+        Поэтапное выполнение: каждый шаг выполняется сразу по всем
+        партициям, следующий шаг начинается после завершения предыдущего.
+        """
+        journal = self._journal
+        metrics = self._get_metrics()
+        if self._is_location_mode():
+            created_partititons = [partition.as_posix()
+                                   for partition in target_partitions]
+        else:
+            created_partititons = [partition.as_posix()
+                                   for partition in target_partitions
+                                   if journal.is_done(partition.as_posix(), 'copy')]
+            rollbacks['rollback_copy_partition'] = created_partititons
+            with metrics.stage('copy'):
+                self._copy_partitions(self.source_partition,
+                                      [partition for partition in target_partitions
+                                       if not journal.is_done(partition.as_posix(), 'copy')],
+                                      created_partititons)
+        partitions = journal.not_done(created_partititons, 'metadata')
+        # откатываются только добавленные этим запуском партиции
+        registered_partitions = [partition for partition in created_partititons
+                                 if partition not in partitions]
+        rollbacks['rollback_update_hive_metadata'] = [registered_partitions,
+                                                      self.table_name]
+        if partitions:
+            with metrics.stage('metadata'):
+                self.update_hive_metadata(partitions, self.table_name,
+                                          registered_partitions)
+            journal.mark_done(partitions, 'metadata')
+        partitions = journal.not_done(created_partititons, 'statistics')
+        if partitions:
+            with metrics.stage('statistics'):
+                self._update_statistics(partitions)
+            journal.mark_done(partitions, 'statistics')
+        partitions = journal.not_done(created_partititons, 'status')
+        if partitions:
+            with metrics.stage('status'):
+                self.add_vita_status(partitions,
+                                     self.dlk_ds_code,
+                                     self.host_api)
+            journal.mark_done(partitions, 'status')
 
     def _check_valid_attributes(self) -> None:
         logger.info('Checking arguments...')
         cls_attrs = [a for a, v in DataFiller.__dict__.items()
                      if not re.match('<function.*?>', str(v))
                      and not (a.startswith('__') and a.endswith('__'))
-                     and not a.startswith('_')]
+                     and not a.startswith('_')
+                     and a not in self._optional_attributes]
         obj_attrs = {a: v for a, v in self.__dict__.items()
                      if not re.match('<function.*?>', str(v))
                      and not (a.startswith('__') and a.endswith('__'))}
@@ -234,6 +979,40 @@ class DataFiller(AbsDataFiller, HDFSCommand):
             paths.append(parent_dir / partition_name)
         return paths
 
+    def _rollback(self, rollbacks: dict) -> None:
+        """
+        Выполнение зарегистрированных откатов: сначала удаляются метаданные
+        Hive (партиции перестают быть видны), затем данные на HDFS.
+        Ошибка одного отката не прерывает остальные, все ошибки логируются.
+        """
+        rollback_errors = []
+        if 'rollback_update_hive_metadata' in rollbacks:
+            try:
+                self.rollback_update_hive_metadata(
+                    *rollbacks['rollback_update_hive_metadata']
+                )
+            except Exception as err:
+                rollback_errors.append(err)
+        if 'rollback_copy_partition' in rollbacks:
+            try:
+                self.rollback_copy_partition(rollbacks['rollback_copy_partition'])
+            except Exception as err:
+                rollback_errors.append(err)
+        for err in rollback_errors:
+            logger.error(f'Rollback is incomplete: {err}')
+
+    def _close_backends(self) -> None:
+        if self._hive is not None:
+            self._hive.close()
+            self._hive = None
+        if self._vita_publishers is not None:
+            for publisher in self._vita_publishers.values():
+                publisher.close()
+            self._vita_publishers = None
+        if self._runner is not None:
+            self._runner.close()
+            self._runner = None
+
     def execute(self) -> None:
         """
         Реализация метода из родительского класса HDFSCommand.
@@ -241,30 +1020,83 @@ class DataFiller(AbsDataFiller, HDFSCommand):
         """
         logger.info('Application started')
         rollbacks = {}
+        written_partitions = []
+        self._metrics = None
+        metrics = self._get_metrics()
+        status = 'failed'
         try:
             self._check_valid_attributes()
+            # запускатель команд создаётся до запуска потоков
+            self._get_runner()
             parent_dir = Path(self.source_partition).parent
-            new_partition_values = self.target_partition_values.split()
+            new_partition_values = iter_partition_values(self.target_partition_values)
             path_new_partitions = self._get_path_new_partitions(parent_dir,
                                                                 new_partition_values)
-            self._check_dir_not_exists(path_new_partitions)
-            created_partititons = []
-            for partition in path_new_partitions:
-                created_partition = self.copy_partition(self.source_partition,
-                                                        partition)
-                created_partititons.append(created_partition)
-                rollbacks['rollback_copy_partition'] = created_partititons
-            self.update_hive_metadata(created_partititons, self.table_name)
-            rollbacks['rollback_update_hive_metadata'] = [created_partititons, self.table_name]
-            self.update_hive_statistics(created_partititons, self.table_name)
-            self.add_vita_status(created_partititons,
-                                 self.dlk_ds_code,
-                                 self.host_api)
+            if self.resume and not self.journal_path:
+                raise AttributeError('Please pass on the argument: "journal_path".')
+            self._journal = StepJournal(
+                self.journal_path,
+                {'source_partition': str(self.source_partition),
+                 'table_name': self.table_name},
+                resume=bool(self.resume)
+            )
+            with metrics.stage('plan'):
+                partitions_to_copy, partially_copied = path_new_partitions, []
+                if self.resume and not self._is_location_mode():
+                    partitions_to_copy, partially_copied = self._restore_from_journal(
+                        path_new_partitions
+                    )
+                if self._is_sync_mode():
+                    self._sync_plan = self._plan_sync(self.source_partition,
+                                                      partitions_to_copy)
+                else:
+                    # начатые копии удалены (при dry_run - будут удалены)
+                    self._check_dir_not_exists([partition for partition
+                                                in partitions_to_copy
+                                                if partition not in partially_copied])
+                self._copy_plan = self._plan_copy(self.source_partition,
+                                                  partitions_to_copy)
+            self._log_copy_plan(self._copy_plan)
+            if self.dry_run:
+                logger.info('Dry run: nothing is executed')
+                status = 'dry_run'
+                return
+            if not self._is_location_mode():
+                # далее DataFiller пишет в родительские директории партиций
+                written_partitions = path_new_partitions
+                self._invalidate_listing_cache(written_partitions)
+            self._start_vita_flusher()
+            # бэкенды создаются до запуска потоков
+            self._get_hive()
+            self._get_vita(self.host_api)
+            if self._is_pipeline_mode():
+                copied_partitions, registered_partitions = [], []
+                rollbacks['rollback_copy_partition'] = copied_partitions
+                rollbacks['rollback_update_hive_metadata'] = [registered_partitions,
+                                                              self.table_name]
+                self._process_partitions_pipeline(path_new_partitions,
+                                                  copied_partitions,
+                                                  registered_partitions)
+            else:
+                self._process_partitions_barrier(path_new_partitions, rollbacks)
+            self._journal.clear()
+            status = 'success'
         except Exception as err:
-            for rollback_command, params in rollbacks.items():
-                if rollback_command == 'rollback_update_hive_metadata':
-                    self.rollback_update_hive_metadata(*params)
-                if rollback_command == 'rollback_copy_partition':
-                    self.rollback_copy_partition(params)
+            if self.journal_path:
+                logger.error(f'Run failed, completed steps are kept in journal '
+                             f'{self.journal_path}, rerun with resume to continue')
+                raise err
+            if self._vita_flusher is not None:
+                # статусы откатываемых партиций не должны уйти в Vita
+                self._vita_flusher.stop(flush=False)
+            with metrics.stage('rollback'):
+                self._rollback(rollbacks)
             raise err
+        finally:
+            # листинг мог попасть в кэш во время копирования (из другого запуска)
+            self._invalidate_listing_cache(written_partitions)
+            self._stop_vita_flusher()
+            if not self._shared_backends:
+                self._close_backends()
+            self._export_metrics(status)
         logger.info('Application finished')
@@ -0,0 +1,305 @@
+import posixpath
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class AbsHDFSBackend(ABC):
+
+    supports_distcp: bool = False  # поддерживается ли копирование через distcp
+
+    # Запросы:
+    # предусловие: directory существует
+    # постусловие: получены полные пути всех объектов в directory
+    @abstractmethod
+    def list_dir(self, directory: str) -> List[str]: ...
+
+    # предусловие: path существует
+    # постусловие: получен размер path в байтах (с учётом вложенных объектов)
+    @abstractmethod
+    def du(self, path: str) -> int: ...
+
+    # предусловие: все directories существуют
+    # постусловие: получены файлы каждой директории (рекурсивно) в виде
+    #   {директория: {относительный путь файла: размер в байтах}}
+    @abstractmethod
+    def list_files(self, directories: List[str]) -> Dict[str, Dict[str, int]]: ...
+
+    # предусловие: все paths - существующие файлы
+    # постусловие: получены контрольные суммы HDFS {путь: checksum}
+    @abstractmethod
+    def checksums(self, paths: List[str]) -> Dict[str, str]: ...
+
+    # Команды:
+    # предусловие: target отсутствует
+    # постусловие: source скопирована в target
+    @abstractmethod
+    def copy(self, source: str, target: str) -> None: ...
+
+    # предусловие: sources - файлы
+    # постусловие: sources скопированы в target_dir (с перезаписью)
+    @abstractmethod
+    def copy_files(self, sources: List[str], target_dir: str) -> None: ...
+
+    # предусловие: target отсутствует, supports_distcp is True
+    # постусловие: source скопирована в target задачей distcp из maps мапперов
+    @abstractmethod
+    def distcp(self, source: str, target: str, maps: int) -> None: ...
+
+    # постусловие: path и всё его содержимое удалены
+    @abstractmethod
+    def remove(self, path: str) -> None: ...
+
+    # постусловие: удалены все paths, которые удалось удалить (ошибка по
+    #   одному пути не прерывает удаление остальных); возвращаются
+    #   ошибки по неудалённым путям {путь: текст ошибки}
+    @abstractmethod
+    def remove_many(self, paths: List[str]) -> Dict[str, str]: ...
+
+
+class SubprocessHDFSBackend(AbsHDFSBackend):
+    """
+    Работа с HDFS через cli "hadoop fs".
+
+    Каждая операция - отдельный процесс (и запуск JVM).
+    bash_execute - функция запуска команды (DataFiller._bash_execute).
+    """
+
+    supports_distcp = True
+
+    # ограничение суммарной длины путей в одной команде
+    MAX_COMMAND_CHARS = 100_000
+
+    def __init__(self, bash_execute: Callable[[Any], dict]) -> None:
+        self._bash_execute = bash_execute
+
+    def _hadoop(self, *args: str) -> dict:
+        command = ['hadoop', *[str(arg) for arg in args]]
+        process = self._bash_execute(command)
+        if process['returncode']:
+            raise Exception(process['stderr'])
+        return process
+
+    def _hadoop_fs(self, *args: str) -> dict:
+        return self._hadoop('fs', *args)
+
+    def _split_paths(self, paths: List[str]) -> List[List[str]]:
+        # пути разбиваются на команды с суммарной длиной путей не больше
+        # MAX_COMMAND_CHARS (ограничение ARG_MAX на аргументы процесса)
+        chunks, chunk, chunk_chars = [], [], 0
+        for path in (str(path) for path in paths):
+            if chunk and chunk_chars + len(path) + 1 > self.MAX_COMMAND_CHARS:
+                chunks.append(chunk)
+                chunk, chunk_chars = [], 0
+            chunk.append(path)
+            chunk_chars += len(path) + 1
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def list_dir(self, directory: str) -> List[str]:
+        process = self._hadoop_fs('-ls', '-C', directory)
+        return process['stdout'].decode().splitlines()
+
+    def du(self, path: str) -> int:
+        process = self._hadoop_fs('-du', '-s', path)
+        return int(process['stdout'].decode().split()[0])
+
+    def list_files(self, directories: List[str]) -> Dict[str, Dict[str, int]]:
+        # один процесс на все директории (с разбиением по длине команды)
+        files = {}
+        for chunk in self._split_paths(directories):
+            process = self._hadoop_fs('-ls', '-R', *chunk)
+            roots = [directory.rstrip('/') for directory in chunk]
+            for root in roots:
+                files[root] = {}
+            for line in process['stdout'].decode().splitlines():
+                fields = line.split(None, 7)
+                if len(fields) < 8 or not fields[0].startswith('-'):
+                    continue
+                size, path = int(fields[4]), fields[7]
+                for root in roots:
+                    if path.startswith(root + '/'):
+                        files[root][path[len(root) + 1:]] = size
+                        break
+        return files
+
+    def checksums(self, paths: List[str]) -> Dict[str, str]:
+        checksums = {}
+        for chunk in self._split_paths(paths):
+            process = self._hadoop_fs('-checksum', *chunk)
+            for line in process['stdout'].decode().splitlines():
+                fields = line.split('\t')
+                if len(fields) == 3:
+                    checksums[fields[0]] = fields[1] + ':' + fields[2]
+        return checksums
+
+    def copy(self, source: str, target: str) -> None:
+        self._hadoop_fs('-cp', '-f', source, target)
+
+    def copy_files(self, sources: List[str], target_dir: str) -> None:
+        self._hadoop_fs('-mkdir', '-p', target_dir)
+        for chunk in self._split_paths(sources):
+            self._hadoop_fs('-cp', '-f', *chunk, target_dir)
+
+    def distcp(self, source: str, target: str, maps: int) -> None:
+        self._hadoop('distcp', '-m', maps, source, target)
+
+    def remove(self, path: str) -> None:
+        self._hadoop_fs('-rm', '-R', path)
+
+    def remove_many(self, paths: List[str]) -> Dict[str, str]:
+        # один процесс "hadoop fs -rm -R" на все пути (с разбиением по
+        # длине команды): rm продолжает удаление после ошибки по одному
+        # пути, а неудалённые пути перечисляются в stderr
+        errors = {}
+        for chunk in self._split_paths(paths):
+            process = self._bash_execute(['hadoop', 'fs', '-rm', '-R', *chunk])
+            if not process['returncode']:
+                continue
+            stderr = process['stderr'].decode(errors='replace')
+            error_lines = {path: [line for line in stderr.splitlines()
+                                  if f'`{path}\'' in line or f"'{path}'" in line]
+                           for path in chunk}
+            failed = {path: '\n'.join(lines)
+                      for path, lines in error_lines.items() if lines}
+            # если пути не найдены в stderr, неудачным считается весь chunk
+            errors.update(failed or {path: stderr for path in chunk})
+        return errors
+
+
+class WebHDFSBackend(AbsHDFSBackend):
+    """
+    Работа с HDFS через REST API WebHDFS/HttpFS.
+
+    Все запросы идут через одну requests.Session с пулом keep-alive
+    соединений, поэтому на операцию не тратится запуск JVM.
+    url - адрес namenode или HttpFS (http://host:port)
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, url: str, user: str = None, pool_size: int = 10,
+                 timeout: float = 60) -> None:
+        self.url = url.rstrip('/') + '/webhdfs/v1'
+        self.user = user
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method: str, path: str, op: str,
+                 **kwargs) -> requests.Response:
+        params = {'op': op, **kwargs.pop('params', {})}
+        if self.user:
+            params['user.name'] = self.user
+        response = self.session.request(
+            method, self.url + posixpath.join('/', str(path)),
+            params=params, timeout=self.timeout, **kwargs
+        )
+        if response.status_code >= 400:
+            raise Exception(f'WebHDFS {op} {path} '
+                            f'({response.status_code}): {response.text}')
+        return response
+
+    def _list_status(self, directory: str) -> List[dict]:
+        response = self._request('GET', directory, 'LISTSTATUS')
+        return response.json()['FileStatuses']['FileStatus']
+
+    def list_dir(self, directory: str) -> List[str]:
+        return [posixpath.join(str(directory), status['pathSuffix'])
+                for status in self._list_status(directory)]
+
+    def du(self, path: str) -> int:
+        response = self._request('GET', path, 'GETCONTENTSUMMARY')
+        return response.json()['ContentSummary']['length']
+
+    def list_files(self, directories: List[str]) -> Dict[str, Dict[str, int]]:
+        files = {}
+        for directory in directories:
+            root = str(directory).rstrip('/')
+            files[root] = {}
+            stack = ['']
+            while stack:
+                relative_dir = stack.pop()
+                directory_path = (posixpath.join(root, relative_dir)
+                                  if relative_dir else root)
+                for status in self._list_status(directory_path):
+                    relative_path = posixpath.join(relative_dir, status['pathSuffix'])
+                    if status['type'] == 'DIRECTORY':
+                        stack.append(relative_path)
+                    else:
+                        files[root][relative_path] = status['length']
+        return files
+
+    def checksums(self, paths: List[str]) -> Dict[str, str]:
+        checksums = {}
+        for path in paths:
+            response = self._request('GET', path, 'GETFILECHECKSUM')
+            checksum = response.json()['FileChecksum']
+            checksums[path] = checksum['algorithm'] + ':' + checksum['bytes']
+        return checksums
+
+    def _copy_file(self, source: str, target: str) -> None:
+        source_response = self._request('GET', source, 'OPEN', stream=True)
+        # CREATE в WebHDFS выполняется в два шага: namenode возвращает
+        # редирект на datanode, куда и отправляются данные
+        response = self._request('PUT', target, 'CREATE',
+                                 params={'overwrite': 'true'},
+                                 allow_redirects=False)
+        data = source_response.iter_content(self.CHUNK_SIZE)
+        if response.status_code == 307:
+            upload = self.session.put(response.headers['Location'], data=data,
+                                      timeout=self.timeout)
+            if upload.status_code >= 400:
+                raise Exception(f'WebHDFS CREATE {target} '
+                                f'({upload.status_code}): {upload.text}')
+        else:
+            # HttpFS принимает данные сразу при data=true
+            self._request('PUT', target, 'CREATE', data=data,
+                          params={'overwrite': 'true', 'data': 'true'},
+                          headers={'Content-Type': 'application/octet-stream'})
+
+    def copy(self, source: str, target: str) -> None:
+        self._request('PUT', target, 'MKDIRS')
+        for status in self._list_status(source):
+            name = status['pathSuffix']
+            source_path = posixpath.join(str(source), name)
+            target_path = posixpath.join(str(target), name)
+            if status['type'] == 'DIRECTORY':
+                self.copy(source_path, target_path)
+            else:
+                self._copy_file(source_path, target_path)
+
+    def copy_files(self, sources: List[str], target_dir: str) -> None:
+        self._request('PUT', target_dir, 'MKDIRS')
+        for source in sources:
+            self._copy_file(source,
+                            posixpath.join(str(target_dir), posixpath.basename(source)))
+
+    def distcp(self, source: str, target: str, maps: int) -> None:
+        raise Exception('distcp is not supported by WebHDFS backend')
+
+    def remove(self, path: str) -> None:
+        response = self._request('DELETE', path, 'DELETE',
+                                 params={'recursive': 'true'})
+        if not response.json()['boolean']:
+            raise Exception(f'WebHDFS DELETE {path}: path not deleted')
+
+    def remove_many(self, paths: List[str]) -> Dict[str, str]:
+        def remove(path: str) -> str:
+            try:
+                self.remove(path)
+            except Exception as err:
+                return str(err)
+            return None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.pool_size)) as executor:
+            results = list(executor.map(remove, paths))
+        return {str(path): error for path, error in zip(paths, results) if error}
@@ -0,0 +1,148 @@
+import queue
+from abc import ABC, abstractmethod
+from typing import Any, Callable, List
+
+
+class AbsHiveBackend(ABC):
+
+    # Команды:
+    # предусловие: statements - список запросов HiveQL без ";"
+    # постусловие: запросы выполнены по порядку до первой ошибки;
+    #   возвращается {'completed': число выполненных запросов,
+    #                 'started': число начатых запросов (completed + 1, если
+    #                            ошибка в запросе; completed, если ошибка до
+    #                            начала запроса, например при запуске сессии),
+    #                 'error': текст ошибки или None}
+    @abstractmethod
+    def execute(self, statements: List[str]) -> dict: ...
+
+    # постусловие: освобождены все ресурсы бэкенда (соединения)
+    @abstractmethod
+    def close(self) -> None: ...
+
+
+class CliHiveBackend(AbsHiveBackend):
+    """
+    Выполнение запросов через cli "hive -e".
+
+    Все запросы одного вызова execute выполняются в одной сессии Hive.
+    С ключом "-v" Hive выводит в stdout каждый запрос перед его
+    выполнением, по этому выводу определяется число выполненных запросов.
+    Если запросы не помещаются в один аргумент командной строки
+    (MAX_COMMAND_CHARS), они выполняются в нескольких сессиях по очереди.
+    bash_execute - функция запуска команды (DataFiller._bash_execute).
+    """
+
+    # ограничение длины одного аргумента в Linux (MAX_ARG_STRLEN) - 128 КБ
+    MAX_COMMAND_CHARS = 100_000
+
+    def __init__(self, bash_execute: Callable[[Any, bool], dict]) -> None:
+        self._bash_execute = bash_execute
+
+    def _split_statements(self, statements: List[str]) -> List[List[str]]:
+        chunks, chunk, chunk_chars = [], [], 0
+        for statement in statements:
+            if chunk and chunk_chars + len(statement) + 2 > self.MAX_COMMAND_CHARS:
+                chunks.append(chunk)
+                chunk, chunk_chars = [], 0
+            chunk.append(statement)
+            chunk_chars += len(statement) + 2
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _execute_session(self, statements: List[str]) -> dict:
+        command = 'hive -v -e "' + ' '.join(f'{s};' for s in statements) + '"'
+        process = self._bash_execute(command, is_shell=True)
+        if not process['returncode']:
+            return {'completed': len(statements), 'started': len(statements),
+                    'error': None}
+
+        stdout = process['stdout'].decode(errors='replace')
+        # без выведенных запросов ошибка произошла при запуске сессии
+        # (например, Kerberos), ни один запрос не начат
+        started = [s for s in statements if s in stdout]
+        return {
+            'completed': max(len(started) - 1, 0),
+            'started': len(started),
+            'error': process['stderr'].decode(errors='replace')
+        }
+
+    def execute(self, statements: List[str]) -> dict:
+        completed = 0
+        for chunk in self._split_statements(statements):
+            result = self._execute_session(chunk)
+            if result['error']:
+                return {'completed': completed + result['completed'],
+                        'started': completed + result['started'],
+                        'error': result['error']}
+            completed += result['completed']
+        return {'completed': completed, 'started': completed, 'error': None}
+
+    def close(self) -> None:
+        pass
+
+
+class HiveServer2Backend(AbsHiveBackend):
+    """
+    Выполнение запросов через пул соединений к HiveServer2.
+
+    connect - фабрика DB-API 2.0 соединений (например, pyhive.hive.connect
+    с зафиксированными параметрами). Соединения создаются по требованию
+    (не больше pool_size) и переиспользуются до вызова close.
+    """
+
+    def __init__(self, connect: Callable[[], Any], pool_size: int = 1) -> None:
+        self._connect = connect
+        # слоты пула: открытое соединение или None (соединение не создано),
+        # LIFO - сначала переиспользуются открытые соединения
+        self._slots = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._slots.put(None)
+
+    def _acquire(self) -> Any:
+        connection = self._slots.get()
+        if connection is not None:
+            return connection
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.put(None)
+            raise
+
+    def execute(self, statements: List[str]) -> dict:
+        connection = self._acquire()
+        completed = started = 0
+        try:
+            cursor = connection.cursor()
+            try:
+                for statement in statements:
+                    started += 1
+                    cursor.execute(statement)
+                    completed += 1
+            finally:
+                cursor.close()
+        except Exception as err:
+            # состояние соединения после ошибки неизвестно (оборванный
+            # транспорт, незавершённый запрос) - соединение закрывается,
+            # слот возвращается в пул для нового соединения
+            try:
+                connection.close()
+            except Exception:
+                pass
+            self._slots.put(None)
+            return {'completed': completed, 'started': started, 'error': str(err)}
+        self._slots.put(connection)
+        return {'completed': completed, 'started': started, 'error': None}
+
+    def close(self) -> None:
+        connections = []
+        while True:
+            try:
+                connections.append(self._slots.get_nowait())
+            except queue.Empty:
+                break
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+            self._slots.put(None)
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from typing import List
+
+
+class StepJournal:
+    """
+    Журнал выполненных шагов по партициям.
+
+    При заданном path журнал сохраняется в JSON-файл после каждой
+    отметки (через временный файл и os.replace, поэтому файл не бывает
+    записан частично). Без path журнал хранится только в памяти.
+    job - параметры запуска; журнал другого запуска не загружается.
+    """
+
+    def __init__(self, path: str = None, job: dict = None,
+                 resume: bool = False) -> None:
+        self.path = path
+        self.job = job or {}
+        self._steps = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            raise Exception(f'Journal not found: {self.path}')
+        with open(self.path) as journal_file:
+            data = json.load(journal_file)
+        if data['job'] != self.job:
+            raise Exception(f'Journal {self.path} belongs to another run: '
+                            f'{data["job"]}')
+        self._steps = {partition: set(steps)
+                       for partition, steps in data['steps'].items()}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        data = {'job': self.job,
+                'steps': {partition: sorted(steps)
+                          for partition, steps in self._steps.items()}}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as journal_file:
+            json.dump(data, journal_file, indent=2)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, partition: str, step: str) -> bool:
+        with self._lock:
+            return step in self._steps.get(partition, ())
+
+    def not_done(self, partitions: List[str], step: str) -> List[str]:
+        return [p for p in partitions if not self.is_done(p, step)]
+
+    def mark_done(self, partitions: List[str], step: str) -> None:
+        with self._lock:
+            for partition in partitions:
+                self._steps.setdefault(partition, set()).add(step)
+            self._save()
+
+    def unmark(self, partition: str, step: str) -> None:
+        with self._lock:
+            self._steps.get(partition, set()).discard(step)
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._steps = {}
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
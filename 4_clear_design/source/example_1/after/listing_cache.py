@@ -0,0 +1,55 @@
+import json
+import time
+from typing import List, Optional
+
+from .sqlite_store import SQLiteStore
+
+
+class ListingCache(SQLiteStore):
+    """
+    Кэш листингов директорий HDFS в файле SQLite с ограниченным временем
+    жизни записей (ttl_seconds).
+
+    Используется проверками DataFiller ("партиция уже существует"), которые
+    повторно запускаются для одних и тех же таблиц с разницей в минуты.
+    Записи по директории удаляются (invalidate) при каждой записи
+    DataFiller в эту директорию; изменения, сделанные не через DataFiller,
+    становятся видны не позже чем через ttl_seconds. Поэтому DataFiller
+    доверяет кэшу только наличие партиции, а отсутствие перепроверяет.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 300) -> None:
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as connection:
+            connection.execute(
+                'create table if not exists listing_cache ('
+                ' directory text primary key,'
+                ' entries text not null,'
+                ' cached_at real not null)'
+            )
+
+    def get(self, directory: str) -> Optional[List[str]]:
+        """Листинг directory или None, если его нет в кэше или он устарел."""
+        with self._connect() as connection:
+            row = connection.execute(
+                'select entries from listing_cache'
+                ' where directory = ? and cached_at >= ?',
+                (str(directory), time.time() - self.ttl_seconds)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, directory: str, entries: List[str]) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                'insert or replace into listing_cache'
+                ' (directory, entries, cached_at) values (?, ?, ?)',
+                (str(directory), json.dumps(list(entries)), time.time())
+            )
+
+    def invalidate(self, directories: List[str]) -> None:
+        with self._connect() as connection:
+            connection.executemany(
+                'delete from listing_cache where directory = ?',
+                [(str(directory),) for directory in set(map(str, directories))]
+            )
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+def write_atomic(path: str, content: str) -> None:
+    # node_exporter не должен прочитать файл, записанный наполовину
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as metrics_file:
+        metrics_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{str(value).replace(chr(34), "")}"'
+                          for key, value in labels.items()) + '}'
+
+
+def format_gauges(prefix: str, gauges: dict, labels: dict = None) -> str:
+    """Показатели {имя: значение} в текстовом формате Prometheus."""
+    lines = []
+    for name, value in gauges.items():
+        lines += [f'# TYPE {prefix}_{name} gauge',
+                  f'{prefix}_{name}{format_labels(labels)} {value}']
+    return ''.join(line + '\n' for line in lines)
+
+
+class RunMetrics:
+    """
+    Метрики одного запуска DataFiller:
+        - время и количество выполнений каждого шага (stages);
+        - количество и суммарное время внешних команд по утилитам (commands);
+        - количество скопированных байт и повторных попыток;
+        - произвольные показатели (gauges), например глубина очередей.
+    Экспорт - JSON-сводка и textfile для node_exporter (Prometheus).
+    Методы можно вызывать из разных потоков.
+    """
+
+    PROMETHEUS_PREFIX = 'data_filler'
+
+    def __init__(self, labels: dict = None) -> None:
+        self.labels = labels or {}
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.commands = {}
+        self.bytes_copied = 0
+        self.retries = 0
+        self.gauges = {}
+        self.status = 'running'
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self._add(self.stages, name, time.monotonic() - start, failed=1)
+            raise
+        self._add(self.stages, name, time.monotonic() - start)
+
+    def record_command(self, command: Any, duration: float,
+                       returncode: int) -> None:
+        tool = (command.split() if isinstance(command, str) else command)[0]
+        self._add(self.commands, str(tool), duration,
+                  failed=1 if returncode else 0)
+
+    def add_bytes(self, bytes_copied: int) -> None:
+        with self._lock:
+            self.bytes_copied += bytes_copied
+
+    def add_retry(self, count: int = 1) -> None:
+        with self._lock:
+            self.retries += count
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def _add(self, group: dict, name: str, duration: float,
+             failed: int = 0) -> None:
+        with self._lock:
+            item = group.setdefault(name, {'count': 0, 'seconds': 0.0,
+                                           'failed': 0})
+            item['count'] += 1
+            item['seconds'] += duration
+            item['failed'] += failed
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'labels': self.labels,
+                'status': self.status,
+                'started_at': self.started_at,
+                'wall_seconds': round(time.monotonic() - self._start, 3),
+                'stages': {name: {**item, 'seconds': round(item['seconds'], 3)}
+                           for name, item in self.stages.items()},
+                'commands': {name: {**item, 'seconds': round(item['seconds'], 3)}
+                             for name, item in self.commands.items()},
+                'processes': sum(item['count'] for item in self.commands.values()),
+                'bytes_copied': self.bytes_copied,
+                'retries': self.retries,
+                'gauges': dict(self.gauges),
+            }
+
+    def write_json(self, path: str) -> None:
+        write_atomic(path, json.dumps(self.summary(), indent=2,
+                                       ensure_ascii=False))
+
+    def _format_labels(self, **extra: str) -> str:
+        return format_labels({**self.labels, **extra})
+
+    def to_prometheus(self) -> str:
+        summary = self.summary()
+        prefix = self.PROMETHEUS_PREFIX
+        lines = [
+            f'# TYPE {prefix}_run_seconds gauge',
+            f'{prefix}_run_seconds{self._format_labels()} {summary["wall_seconds"]}',
+            f'# TYPE {prefix}_run_success gauge',
+            f'{prefix}_run_success{self._format_labels()} '
+            f'{int(summary["status"] == "success")}',
+            f'# TYPE {prefix}_bytes_copied gauge',
+            f'{prefix}_bytes_copied{self._format_labels()} {summary["bytes_copied"]}',
+            f'# TYPE {prefix}_retries gauge',
+            f'{prefix}_retries{self._format_labels()} {summary["retries"]}',
+            f'# TYPE {prefix}_processes gauge',
+            f'{prefix}_processes{self._format_labels()} {summary["processes"]}',
+            f'# TYPE {prefix}_stage_seconds gauge',
+        ]
+        for name, item in summary['stages'].items():
+            lines.append(f'{prefix}_stage_seconds{self._format_labels(stage=name)} '
+                         f'{item["seconds"]}')
+        lines.append(f'# TYPE {prefix}_command_seconds gauge')
+        for name, item in summary['commands'].items():
+            lines.append(f'{prefix}_command_seconds{self._format_labels(tool=name)} '
+                         f'{item["seconds"]}')
+        lines.append(f'# TYPE {prefix}_commands gauge')
+        for name, item in summary['commands'].items():
+            lines.append(f'{prefix}_commands{self._format_labels(tool=name)} '
+                         f'{item["count"]}')
+        return ('\n'.join(lines) + '\n'
+                + format_gauges(prefix, summary['gauges'], self.labels))
+
+    def write_prometheus(self, path: str) -> None:
+        write_atomic(path, self.to_prometheus())
@@ -0,0 +1,63 @@
+import calendar
+import re
+from datetime import date, datetime, timedelta
+from typing import Iterator
+
+DATE_FORMAT = '%Y-%m-%d'
+RANGE_PATTERN = re.compile(r'^(?P<start>[^.:]+)\.\.(?P<end>[^.:]+)'
+                           r'(?::(?P<step>\d+)(?P<unit>[dwm]))?$')
+
+
+def _add_months(value: date, months: int) -> date:
+    # день месяца ограничивается длиной месяца (31 января + 1 месяц = 28/29 февраля)
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def iter_date_range(start: str, end: str, step: int = 1,
+                    unit: str = 'd') -> Iterator[str]:
+    """
+    Даты от start до end включительно с шагом step:
+    unit 'd' - дни, 'w' - недели, 'm' - календарные месяцы.
+    """
+    first = datetime.strptime(start, DATE_FORMAT).date()
+    last = datetime.strptime(end, DATE_FORMAT).date()
+    if step < 1 or first > last:
+        raise ValueError(f'Invalid date range: {start}..{end}')
+    current, count = first, 0
+    while current <= last:
+        yield current.strftime(DATE_FORMAT)
+        count += 1
+        if unit == 'm':
+            current = _add_months(first, step * count)
+        else:
+            current = first + timedelta(days=step * count * (7 if unit == 'w' else 1))
+
+
+def iter_partition_values(expression: str) -> Iterator[str]:
+    """
+    Ленивый разбор значений партиций, разделённых пробелами.
+    Каждое значение - либо отдельное значение ('2023-01-01'), либо
+    диапазон дат 'START..END[:STEP]', где STEP - число и единица
+    (d - дни, w - недели, m - месяцы), например:
+        '2023-01-01..2024-12-31'
+        '2023-01-01..2023-12-31:7d'
+        '2023-01-31..2023-12-31:1m'
+    Повторяющиеся значения (в том числе из пересекающихся диапазонов)
+    отдаются один раз, в порядке первого появления.
+    """
+    seen = set()
+    for token in expression.split():
+        match = RANGE_PATTERN.match(token)
+        if match:
+            values = iter_date_range(match['start'], match['end'],
+                                     int(match['step'] or 1), match['unit'] or 'd')
+        elif '..' in token:
+            raise ValueError(f'Invalid date range: {token}')
+        else:
+            values = [token]
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                yield value
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence
+
+
+class SQLiteStore:
+    """
+    Общая основа файловых хранилищ SQLite (кэш листингов, очереди статистики
+    и статусов Vita): соединение в режиме WAL на каждую операцию и аренда
+    записей обработчиком.
+
+    Аренда (_claim_rows) переводит подходящие записи в рабочее состояние
+    с уникальной меткой claim в одной транзакции, поэтому одновременно
+    работающие обработчики (потоки и процессы) не забирают одни и те же
+    записи. Записи упавшего обработчика остаются в рабочем состоянии,
+    и условие where должно забирать их повторно по updated_at.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=60,
+                                     isolation_level=None)
+        try:
+            connection.execute('pragma journal_mode=wal')
+            yield connection
+        finally:
+            connection.close()
+
+    def _claim_rows(self, table: str, state_column: str, claimed_state: str,
+                    where: str, params: Sequence, columns: str,
+                    order_by: str) -> List[tuple]:
+        """
+        Аренда записей table, подходящих под условие where (с параметрами
+        params): state_column = claimed_state, новая метка claim.
+        Возвращает столбцы columns арендованных записей в порядке order_by.
+        """
+        claim = uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute('begin immediate')
+            connection.execute(
+                f'update {table} set {state_column} = ?, claim = ?,'
+                f' updated_at = ? where {where}',
+                (claimed_state, claim, time.time(), *params)
+            )
+            rows = connection.execute(
+                f'select {columns} from {table} where claim = ?'
+                f' order by {order_by}', (claim,)
+            ).fetchall()
+            connection.execute('commit')
+        return rows
@@ -0,0 +1,159 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Tuple
+
+from .sqlite_store import SQLiteStore
+
+if TYPE_CHECKING:
+    from .hive_backend import AbsHiveBackend
+
+logger = logging.getLogger()
+
+
+class StatisticsQueue(SQLiteStore):
+    """
+    Очередь отложенного обновления статистики Hive в файле SQLite.
+
+    DataFiller добавляет партиции в очередь (enqueue) и не ждёт ANALYZE.
+    Обработчик (process) забирает ожидающие партиции, объединяет их по
+    таблицам (повторы одной партиции схлопываются) и выполняет ANALYZE
+    по каждой таблице одним вызовом бэкенда Hive, таблицы - параллельно.
+
+    Статусы записей: pending -> running -> done | failed. Записи в статусе
+    running дольше stale_seconds (упавший обработчик) забираются повторно,
+    записи в статусе failed - после requeue_failed.
+    """
+
+    def __init__(self, path: str, stale_seconds: int = 3600) -> None:
+        super().__init__(path)
+        self.stale_seconds = stale_seconds
+        with self._connect() as connection:
+            connection.execute(
+                'create table if not exists statistics_queue ('
+                ' id integer primary key autoincrement,'
+                ' table_name text not null,'
+                ' partition_key text not null,'
+                ' partition_value text not null,'
+                ' status text not null default \'pending\','
+                ' claim text,'
+                ' error text,'
+                ' updated_at real not null)'
+            )
+
+    def enqueue(self, table_name: str, parts: List[Tuple[str, str]]) -> None:
+        """Добавление партиций [(ключ, значение)] без повторов среди ожидающих."""
+        with self._connect() as connection:
+            connection.execute('begin immediate')
+            for key, value in parts:
+                connection.execute(
+                    'insert into statistics_queue '
+                    '(table_name, partition_key, partition_value, updated_at) '
+                    'select ?, ?, ?, ? where not exists ('
+                    ' select 1 from statistics_queue where table_name = ?'
+                    ' and partition_key = ? and partition_value = ?'
+                    ' and status = \'pending\')',
+                    (table_name, key, value, time.time(), table_name, key, value)
+                )
+            connection.execute('commit')
+
+    def cancel(self, table_name: str, parts: List[Tuple[str, str]]) -> None:
+        """Удаление ещё не обработанных партиций (при откате DataFiller)."""
+        with self._connect() as connection:
+            connection.executemany(
+                'delete from statistics_queue where table_name = ?'
+                ' and partition_key = ? and partition_value = ?'
+                ' and status = \'pending\'',
+                [(table_name, key, value) for key, value in parts]
+            )
+
+    def depth(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                'select count(*) from statistics_queue where status = \'pending\''
+            ).fetchone()[0]
+
+    def requeue_failed(self) -> int:
+        """Возврат в очередь партиций, статистика по которым не обновилась."""
+        with self._connect() as connection:
+            return connection.execute(
+                'update statistics_queue set status = \'pending\', error = null,'
+                ' updated_at = ? where status = \'failed\'', (time.time(),)
+            ).rowcount
+
+    def _claim(self, table_name: str) -> List[Tuple[int, str, str]]:
+        rows = self._claim_rows(
+            'statistics_queue', 'status', 'running',
+            'table_name = ? and (status = \'pending\''
+            ' or (status = \'running\' and updated_at < ?))',
+            (table_name, time.time() - self.stale_seconds),
+            'id, partition_key, partition_value', 'partition_key, partition_value'
+        )
+        # одна и та же партиция анализируется один раз
+        unique_rows = {}
+        for row_id, key, value in rows:
+            unique_rows.setdefault((key, value), []).append(row_id)
+        return [(ids, key, value) for (key, value), ids in unique_rows.items()]
+
+    def _set_status(self, ids: List[int], status: str, error: str = None) -> None:
+        if not ids:
+            return
+        with self._connect() as connection:
+            connection.executemany(
+                'update statistics_queue set status = ?, error = ?, claim = null,'
+                ' updated_at = ? where id = ?',
+                [(status, error, time.time(), row_id) for row_id in ids]
+            )
+
+    def _process_table(self, hive: 'AbsHiveBackend', table_name: str) -> dict:
+        rows = self._claim(table_name)
+        if not rows:
+            return {'table_name': table_name, 'done': 0, 'failed': 0}
+        statements = [f'analyze table {table_name} '
+                      f'partition ({key}=\'{value}\') compute statistics'
+                      for _, key, value in rows]
+        start = time.monotonic()
+        result = hive.execute(statements)
+        completed = result['completed']
+        self._set_status([i for ids, _, _ in rows[:completed] for i in ids], 'done')
+        failed = 0
+        if result['error'] and result['started'] > completed:
+            failed_ids, key, value = rows[completed]
+            failed = 1
+            self._set_status(failed_ids, 'failed', result['error'])
+            # необработанные после ошибки партиции возвращаются в очередь
+            self._set_status([i for ids, _, _ in rows[completed + 1:] for i in ids],
+                             'pending')
+            logger.error(f'Statistics update failed for {table_name} '
+                         f'({key}={value}): {result["error"]}')
+        elif result['error']:
+            # сессия Hive не запустилась: ни одна партиция не виновата,
+            # все необработанные возвращаются в очередь
+            self._set_status([i for ids, _, _ in rows[completed:] for i in ids],
+                             'pending')
+            logger.error(f'Statistics update failed for {table_name} before '
+                         f'any statement started: {result["error"]}')
+            raise Exception(result['error'])
+        logger.info(f'Statistics updated for {table_name}: {completed}/{len(rows)} '
+                    f'partitions in {time.monotonic() - start:.3f}s')
+        return {'table_name': table_name, 'done': completed, 'failed': failed}
+
+    def process(self, hive: 'AbsHiveBackend', workers: int = 1) -> List[dict]:
+        """
+        Обработка всех ожидающих партиций; таблицы - не больше workers
+        одновременно. Ошибка запуска сессии Hive пробрасывается после
+        обработки остальных таблиц, партиции таблицы остаются в очереди.
+        """
+        with self._connect() as connection:
+            tables = [row[0] for row in connection.execute(
+                'select distinct table_name from statistics_queue'
+                ' where status = \'pending\' or (status = \'running\''
+                ' and updated_at < ?)', (time.time() - self.stale_seconds,)
+            )]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(self._process_table, hive, table)
+                       for table in tables]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            raise errors[0]
+        return [future.result() for future in futures]
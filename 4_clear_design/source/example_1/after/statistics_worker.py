@@ -0,0 +1,61 @@
+import logging
+
+from .base import HDFSCommand
+from .data_filler import DataFiller
+from .statistics_queue import StatisticsQueue
+
+logger = logging.getLogger()
+
+
+class HiveStatisticsWorker(HDFSCommand):
+    """
+    Команда обработки очереди отложенной статистики Hive
+    (DataFiller с statistics_mode='deferred').
+
+    Запускается отдельно от DataFiller (по расписанию в rundeck или
+    в цикле), партиции одной таблицы обрабатываются одним запуском ANALYZE,
+    не больше statistics_workers таблиц одновременно.
+    Параметры Hive (hive_backend, hive_host, ...) - как у DataFiller.
+
+    Партиции, на которых ANALYZE упал, остаются в очереди в статусе failed;
+    запуск с requeue_failed возвращает их в обработку. При ошибке запуска
+    сессии Hive партиции остаются ожидающими, а команда завершается ошибкой.
+    """
+
+    statistics_queue_path: str = None  # файл SQLite очереди статистики
+
+    # Необязательные параметры
+    statistics_workers: int = 1  # количество одновременно обрабатываемых таблиц
+    requeue_failed: bool = False  # вернуть в очередь партиции со статусом failed
+    _hive_settings = ('hive_backend', 'hive_host', 'hive_port', 'hive_user',
+                      'max_processes', 'command_timeout')
+
+    def execute(self) -> None:
+        logger.info('Statistics worker started')
+        if not self.statistics_queue_path:
+            raise AttributeError(
+                'Please pass on the argument: "statistics_queue_path".'
+            )
+        # бэкенд Hive создаётся так же, как в DataFiller
+        template = DataFiller()
+        for name in self._hive_settings:
+            if getattr(self, name, None) is not None:
+                setattr(template, name, getattr(self, name))
+        template.copy_workers = int(self.statistics_workers or 1)
+        queue = StatisticsQueue(self.statistics_queue_path)
+        if self.requeue_failed:
+            logger.info(f'Requeued failed partitions: {queue.requeue_failed()}')
+        try:
+            # запускатель команд и бэкенд создаются до запуска потоков
+            template._get_runner()
+            results = queue.process(template._get_hive(),
+                                    int(self.statistics_workers or 1))
+        finally:
+            template._close_backends()
+
+        done = sum(result['done'] for result in results)
+        failed = sum(result['failed'] for result in results)
+        logger.info(f'Statistics worker finished: {done} partitions updated, '
+                    f'{failed} failed, {queue.depth()} left in queue')
+        if failed:
+            raise Exception(f'Statistics update failed for {failed} partitions')
@@ -0,0 +1,159 @@
+"""
+Тесты BulkDataFiller по манифесту JSON с бэкендами в памяти.
+
+Запускаются из пакета команд вместе с остальными тестами
+(см. tests_data_filler):
+    python -m unittest <пакет>.tests_bulk_runner
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from . import bulk_runner as bulk_runner_module
+from . import data_filler as data_filler_module
+from .bulk_runner import BulkDataFiller, RateLimiter
+from .tests_data_filler import FakeHDFS, FakeHive, FakeVita, SlowHDFS
+
+
+class TestBulkDataFiller(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.hdfs = SlowHDFS(['/data/s/t/dt=2023-01-01', '/data/s/u/dt=2023-01-01'])
+        self.webhdfs = FakeHDFS(['/data/s/w/dt=2023-01-01'])
+        self.hive = FakeHive()
+        self.publishers = {}
+
+        def create_publisher(host_api, workers, batch_size):
+            self.publishers[host_api] = FakeVita(host_api)
+            return self.publishers[host_api]
+
+        patches = [
+            mock.patch.object(data_filler_module, 'SubprocessHDFSBackend',
+                              side_effect=lambda bash_execute: self.hdfs),
+            mock.patch.object(data_filler_module, 'WebHDFSBackend',
+                              side_effect=lambda *args: self.webhdfs),
+            mock.patch.object(data_filler_module, 'CliHiveBackend',
+                              side_effect=lambda bash_execute: self.hive),
+            mock.patch.object(bulk_runner_module, 'VitaPublisher',
+                              side_effect=create_publisher),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @staticmethod
+    def job(table: str, values: str, host_api: str = 'h1', **settings) -> dict:
+        return {'source_partition': f'/data/s/{table}/dt=2023-01-01',
+                'target_partition_values': values,
+                'table_name': f's.{table}', 'dlk_ds_code': f'DS_{table}',
+                'host_api': host_api, **settings}
+
+    def run_manifest(self, manifest: dict) -> dict:
+        manifest_path = os.path.join(self.tmp_dir.name, 'manifest.json')
+        with open(manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        bulk = BulkDataFiller()
+        bulk.manifest_path = manifest_path
+        bulk.report_path = os.path.join(self.tmp_dir.name, 'report.json')
+        try:
+            bulk.execute()
+        finally:
+            if os.path.exists(bulk.report_path):
+                with open(bulk.report_path) as report_file:
+                    self.report = json.load(report_file)
+        return self.report
+
+    # постусловие: все задания выполнены, задания одной таблицы - по очереди
+    def test_report_and_table_concurrency(self):
+        report = self.run_manifest({
+            'settings': {'copy_workers': 1},
+            'max_parallel_jobs': 3,
+            'table_concurrency': 1,
+            'jobs': [self.job('t', '2023-01-02..2023-01-03'),
+                     self.job('t', '2023-01-04..2023-01-05'),
+                     self.job('u', '2023-01-02..2023-01-03', host_api='h2')],
+        })
+        self.assertEqual([(job['job'], job['table_name'], job['status'])
+                          for job in report['jobs']],
+                         [(1, 's.t', 'success'), (2, 's.t', 'success'),
+                          (3, 's.u', 'success')])
+        self.assertIn('copy', report['jobs'][0]['stages'])
+        self.assertEqual(self.hdfs.max_in_flight['/data/s/t'], 1)
+        self.assertTrue({f'/data/s/t/dt=2023-01-0{day}' for day in range(2, 6)}
+                        <= self.hdfs.dirs)
+        # отправщик статусов - один на хост
+        self.assertEqual(sorted(self.publishers), ['h1', 'h2'])
+        self.assertEqual(len(self.publishers['h1'].published), 2)
+
+    def test_failed_job(self):
+        self.hdfs.failing = {'/data/s/u/dt=2023-01-02'}
+        with self.assertLogs(level='ERROR'):
+            with self.assertRaisesRegex(Exception, '1 of 2 jobs failed'):
+                self.run_manifest({
+                    'max_parallel_jobs': 2,
+                    'jobs': [self.job('t', '2023-01-02'),
+                             self.job('u', '2023-01-02')],
+                })
+        self.assertEqual([job['status'] for job in self.report['jobs']],
+                         ['success', 'failed'])
+        self.assertIn('copy failed', self.report['jobs'][1]['error'])
+
+    # постусловие: параметры бэкенда в задании не игнорируются
+    def test_job_backend_settings(self):
+        self.run_manifest({
+            'jobs': [self.job('t', '2023-01-02'),
+                     self.job('w', '2023-01-02', hdfs_backend='webhdfs',
+                              webhdfs_url='http://namenode:9870')],
+        })
+        self.assertIn('/data/s/t/dt=2023-01-02', self.hdfs.dirs)
+        self.assertIn('/data/s/w/dt=2023-01-02', self.webhdfs.dirs)
+        self.assertNotIn('/data/s/w/dt=2023-01-02', self.hdfs.dirs)
+
+    def test_shared_settings_in_job(self):
+        with self.assertRaisesRegex(AttributeError, 'max_processes'):
+            self.run_manifest({'jobs': [self.job('t', '2023-01-02',
+                                                 max_processes=50)]})
+        self.assertEqual(self.hdfs.dirs, {'/data/s/t/dt=2023-01-01',
+                                          '/data/s/u/dt=2023-01-01'})
+
+    # постусловие: задания запускаются не чаще max_jobs_per_minute
+    def test_rate_limit(self):
+        self.hdfs.latency = 0
+        start = time.monotonic()
+        self.run_manifest({
+            'max_parallel_jobs': 3,
+            'max_jobs_per_minute': 600,
+            'jobs': [self.job('t', '2023-01-02'), self.job('u', '2023-01-02'),
+                     self.job('t', '2023-01-03')],
+        })
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_interval(self):
+        limiter = RateLimiter(per_minute=1200)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
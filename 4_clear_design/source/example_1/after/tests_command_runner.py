@@ -0,0 +1,48 @@
+import sys
+import time
+import unittest
+
+from .command_runner import AsyncCommandRunner
+
+
+class TestAsyncCommandRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = AsyncCommandRunner(max_processes=4, tail_lines=3)
+
+    def tearDown(self):
+        self.runner.close()
+
+    def test_run(self):
+        process = self.runner.run_sync([sys.executable, '-c', 'print("a"); print("b")'])
+        self.assertEqual(process, {'stdout': b'a\nb\n', 'stderr': b'',
+                                   'returncode': 0})
+        process = self.runner.run_sync('echo c; exit 3', is_shell=True)
+        self.assertEqual(process['stdout'], b'c\n')
+        self.assertEqual(process['returncode'], 3)
+
+    # постусловие: от stderr сохраняются только последние tail_lines строк
+    def test_stderr_tail(self):
+        code = 'import sys\nfor i in range(1000): print(i, file=sys.stderr)'
+        process = self.runner.run_sync([sys.executable, '-c', code])
+        self.assertEqual(process['stderr'], b'997\n998\n999\n')
+
+    def test_timeout(self):
+        start = time.monotonic()
+        process = self.runner.run_sync('sleep 10', is_shell=True, timeout=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertNotEqual(process['returncode'], 0)
+        self.assertIn(b'timed out', process['stderr'])
+
+    # постусловие: команды выполняются одновременно, порядок результатов сохранён
+    def test_run_many(self):
+        start = time.monotonic()
+        processes = self.runner.run_many([(f'sleep 0.5; echo {i}', True)
+                                          for i in range(4)])
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual([p['stdout'] for p in processes],
+                         [b'0\n', b'1\n', b'2\n', b'3\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
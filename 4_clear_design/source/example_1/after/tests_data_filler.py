@@ -0,0 +1,597 @@
+"""
+Тесты DataFiller с бэкендами HDFS, Hive и Vita в памяти.
+
+DataFiller импортируется из пакета команд (HDFSCommand), поэтому все тесты
+пакета используют относительный импорт и запускаются одной командой
+из директории, содержащей пакет:
+    python -m unittest discover -s <пакет> -t . -p 'tests_*.py'
+или по модулю:
+    python -m unittest <пакет>.tests_data_filler
+"""
+import os
+import posixpath
+import re
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+from . import data_filler as data_filler_module
+from .data_filler import DataFiller
+from .hdfs_backend import AbsHDFSBackend
+from .hive_backend import AbsHiveBackend
+from .vita_outbox import VitaOutbox
+
+
+class FakeHDFS(AbsHDFSBackend):
+    """
+    HDFS в памяти: множество директорий партиций и файлы
+    {полный путь файла: содержимое}; контрольная сумма файла - его содержимое.
+    """
+
+    supports_distcp = True
+
+    def __init__(self, dirs: List[str] = (), files: Dict[str, str] = None) -> None:
+        self.dirs = set(dirs)
+        self.files = dict(files or {})
+        self.failing = set()  # партиции, копирование в которые падает
+        self.copies = []  # [(target, 'cp' | 'distcp')]
+        self.copied_files = []
+        self.removed = []
+        self.listed = []
+        self._lock = threading.Lock()
+
+    def list_dir(self, directory: str) -> List[str]:
+        with self._lock:
+            self.listed.append(str(directory))
+            return [path for path in self.dirs
+                    if posixpath.dirname(path) == str(directory)]
+
+    def du(self, path: str) -> int:
+        return 100
+
+    def _files_in(self, directory: str) -> Dict[str, str]:
+        prefix = str(directory).rstrip('/') + '/'
+        return {path[len(prefix):]: content for path, content in self.files.items()
+                if path.startswith(prefix)}
+
+    def list_files(self, directories: List[str]) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {str(directory).rstrip('/'): {
+                name: len(content)
+                for name, content in self._files_in(directory).items()
+            } for directory in directories}
+
+    def checksums(self, paths: List[str]) -> Dict[str, str]:
+        with self._lock:
+            return {path: self.files[path] for path in paths if path in self.files}
+
+    def _copy(self, source: str, target: str, method: str) -> None:
+        target = str(target)
+        if target in self.failing:
+            raise Exception(f'copy failed: {target}')
+        with self._lock:
+            self.dirs.add(target)
+            for name, content in self._files_in(source).items():
+                self.files[f'{target}/{name}'] = content
+            self.copies.append((target, method))
+
+    def copy(self, source: str, target: str) -> None:
+        self._copy(source, target, 'cp')
+
+    def copy_files(self, sources: List[str], target_dir: str) -> None:
+        with self._lock:
+            for source in sources:
+                target = f'{target_dir}/{posixpath.basename(source)}'
+                self.files[target] = self.files[source]
+                self.copied_files.append(target)
+
+    def distcp(self, source: str, target: str, maps: int) -> None:
+        self._copy(source, target, 'distcp')
+
+    def remove(self, path: str) -> None:
+        path = str(path)
+        with self._lock:
+            self.dirs.discard(path)
+            for name in list(self._files_in(path)):
+                del self.files[f'{path}/{name}']
+            self.files.pop(path, None)
+            self.removed.append(path)
+
+    def remove_many(self, paths: List[str]) -> Dict[str, str]:
+        for path in paths:
+            self.remove(path)
+        return {}
+
+
+class SlowHDFS(FakeHDFS):
+    """FakeHDFS с задержкой копирования и счётчиком одновременных копий по таблице."""
+
+    def __init__(self, dirs: list = (), latency: float = 0.05) -> None:
+        super().__init__(dirs)
+        self.latency = latency
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    def copy(self, source: str, target: str) -> None:
+        table_dir = posixpath.dirname(str(target))
+        with self._lock:
+            self.in_flight[table_dir] = self.in_flight.get(table_dir, 0) + 1
+            self.max_in_flight[table_dir] = max(self.max_in_flight.get(table_dir, 0),
+                                                self.in_flight[table_dir])
+        try:
+            time.sleep(self.latency)
+            super().copy(source, target)
+        finally:
+            with self._lock:
+                self.in_flight[table_dir] -= 1
+
+
+class FakeHive(AbsHiveBackend):
+    """
+    Hive в памяти: выполненные запросы записываются в statements,
+    партиции таблиц - в partitions {(таблица, 'ключ=значение'): LOCATION}.
+    Запросы сессии выполняются по порядку до первой ошибки, как в Hive.
+    При заданном hdfs drop партиции удаляет данные по её LOCATION
+    (managed-таблица).
+    """
+
+    def __init__(self, hdfs: FakeHDFS = None) -> None:
+        self.statements = []
+        self.partitions = {}
+        self.hdfs = hdfs
+        self.session_error = None  # ошибка запуска сессии
+        self._lock = threading.Lock()
+
+    def _apply(self, statement: str) -> None:
+        table = re.match(r'(?:alter|analyze) table (\S+)', statement).group(1)
+        specs = [(table, f'{key}={value}', location) for key, value, location
+                 in re.findall(r"partition \((\w+)='([^']*)'\)"
+                               r"(?: location '([^']*)')?", statement)]
+        if statement.startswith('analyze') or ' set location ' in statement:
+            table, spec, _ = specs[0]
+            if (table, spec) not in self.partitions:
+                raise Exception(f'Partition not found: {spec}')
+            if ' set location ' in statement:
+                self.partitions[table, spec] = re.search(
+                    r"set location '([^']*)'", statement
+                ).group(1)
+        elif ' drop ' in statement:
+            for table, spec, _ in specs:
+                location = self.partitions.pop((table, spec), None)
+                if location and self.hdfs is not None:
+                    self.hdfs.remove(location)
+        else:
+            for table, spec, location in specs:
+                if (table, spec) in self.partitions:
+                    if ' if not exists ' in statement:
+                        continue
+                    raise Exception(f'AlreadyExistsException: {spec}')
+                schema, name = table.split('.')
+                self.partitions[table, spec] = (location
+                                                or f'/data/{schema}/{name}/{spec}')
+
+    def execute(self, statements: List[str]) -> dict:
+        if self.session_error:
+            return {'completed': 0, 'started': 0, 'error': self.session_error}
+        with self._lock:
+            for completed, statement in enumerate(statements):
+                self.statements.append(statement)
+                try:
+                    self._apply(statement)
+                except Exception as err:
+                    return {'completed': completed, 'started': completed + 1,
+                            'error': str(err)}
+        return {'completed': len(statements), 'started': len(statements),
+                'error': None}
+
+    def close(self) -> None:
+        pass
+
+
+class FakeVita:
+    """Отправщик статусов Vita в памяти."""
+
+    def __init__(self, host_api: str = 'h1') -> None:
+        self.host_api = host_api
+        self.published = []  # [(dlk_ds_code, parts)]
+
+    def publish(self, dlk_ds_code: str, parts: list, status: str = 'F') -> None:
+        self.published.append((dlk_ds_code, list(parts)))
+
+    def try_publish(self, dlk_ds_code: str, parts: list,
+                    status: str = 'F') -> dict:
+        self.publish(dlk_ds_code, parts, status)
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+def make_data_filler(**settings) -> DataFiller:
+    data_filler = DataFiller()
+    data_filler.source_partition = '/data/s/t/dt=2023-01-01'
+    data_filler.target_partition_values = '2023-01-02..2023-01-04'
+    data_filler.table_name = 's.t'
+    data_filler.dlk_ds_code = 'DS'
+    data_filler.host_api = 'h1'
+    for name, value in settings.items():
+        setattr(data_filler, name, value)
+    return data_filler
+
+
+class DataFillerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hdfs = FakeHDFS(['/data/s/t/dt=2023-01-01'])
+        self.hive = FakeHive()
+        self.vita = FakeVita()
+
+    def make_data_filler(self, **settings) -> DataFiller:
+        data_filler = make_data_filler(**settings)
+        data_filler._hdfs = self.hdfs
+        data_filler._hive = self.hive
+        data_filler._vita_publishers = {'h1': self.vita}
+        return data_filler
+
+
+class TestUpdateHiveStatistics(DataFillerTestCase):
+
+    # постусловие: ошибка запуска сессии Hive не приписывается партиции
+    def test_session_error(self):
+        self.hive.session_error = 'GSS initiate failed'
+        data_filler = self.make_data_filler()
+        partitions = ['/data/s/t/dt=2023-01-02', '/data/s/t/dt=2023-01-03']
+        with self.assertLogs(level='ERROR') as logs:
+            with self.assertRaisesRegex(Exception, 'GSS initiate failed'):
+                data_filler.update_hive_statistics(partitions, 's.t')
+        self.assertIn('before any statement started', logs.output[0])
+        self.assertNotIn('failed for the partition:', logs.output[0])
+
+
+class TestListingCache(DataFillerTestCase):
+
+    TARGETS = ['/data/s/t/dt=2023-01-02', '/data/s/t/dt=2023-01-03']
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = os.path.join(tmp_dir.name, 'listing.db')
+
+    def check(self) -> None:
+        data_filler = self.make_data_filler(listing_cache_path=self.cache_path)
+        data_filler._check_dir_not_exists([Path(target) for target in self.TARGETS])
+
+    # постусловие: партиция, созданная после кэширования листинга,
+    #   не перезаписывается
+    def test_absent_in_cache_is_rechecked(self):
+        self.check()
+        self.hdfs.dirs.add(self.TARGETS[1])
+        with self.assertRaisesRegex(Exception, 'already exists: .*dt=2023-01-03'):
+            self.check()
+        self.assertEqual(self.hdfs.listed, ['/data/s/t', '/data/s/t'])
+
+    # постусловие: существующая по кэшу партиция - отказ без листинга HDFS
+    def test_existing_in_cache(self):
+        self.hdfs.dirs.add(self.TARGETS[0])
+        with self.assertRaises(Exception):
+            self.check()
+        self.hdfs.dirs.discard(self.TARGETS[0])
+        with self.assertRaisesRegex(Exception, 'already exists: .*dt=2023-01-02'):
+            self.check()
+        self.assertEqual(self.hdfs.listed, ['/data/s/t'])
+
+
+class TestVitaOutbox(DataFillerTestCase):
+
+    # постусловие: статусы из очереди отправляются на свои хосты
+    def test_flush_other_host(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        outbox_path = os.path.join(tmp_dir.name, 'outbox.db')
+        VitaOutbox(outbox_path).enqueue('h2', 'DS_OTHER', [('dt', '2022-12-31')])
+        publishers = {'h1': self.vita}
+
+        def create_publisher(host_api, workers, batch_size):
+            return FakeVita(host_api)
+
+        data_filler = self.make_data_filler(vita_outbox_path=outbox_path,
+                                            vita_flush_interval=60)
+        data_filler._vita_publishers = publishers
+        with mock.patch.object(data_filler_module, 'VitaPublisher',
+                               side_effect=create_publisher):
+            data_filler.execute()
+        self.assertEqual(sorted(publishers), ['h1', 'h2'])
+        self.assertEqual(publishers['h2'].published,
+                         [('DS_OTHER', [('dt', '2022-12-31')])])
+        self.assertEqual([code for code, _ in self.vita.published], ['DS'])
+        self.assertEqual(VitaOutbox(outbox_path).depth(), 0)
+
+
+class TestUpdateHiveMetadata(DataFillerTestCase):
+
+    # постусловие: пачки выполняются одновременно через один бэкенд Hive
+    def test_backend_created_once(self):
+        created = []
+
+        def create_backend(bash_execute):
+            time.sleep(0.05)
+            created.append(self.hive)
+            return self.hive
+
+        data_filler = self.make_data_filler(hive_batch_size=1, copy_workers=4)
+        data_filler._hive = None
+        partitions = [f'/data/s/t/dt=2023-01-0{day}' for day in range(2, 6)]
+        with mock.patch.object(data_filler_module, 'CliHiveBackend',
+                               side_effect=create_backend):
+            data_filler.update_hive_metadata(partitions, 's.t')
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(self.hive.statements), 4)
+
+    # постусловие: откат удаляет только добавленные этим запуском
+    #   партиции, а не существовавшую в Hive (AlreadyExists)
+    def test_rollback_keeps_existing_partitions(self):
+        self.hive.partitions[('s.t', 'dt=2023-01-03')] = '/data/other'
+        data_filler = self.make_data_filler(hive_batch_size=1, copy_workers=1)
+        with self.assertLogs(level='INFO'):
+            with self.assertRaisesRegex(Exception, 'AlreadyExists'):
+                data_filler.execute()
+        self.assertEqual(self.hive.partitions,
+                         {('s.t', 'dt=2023-01-03'): '/data/other'})
+        drops = ' '.join(statement for statement in self.hive.statements
+                         if 'drop' in statement)
+        self.assertIn("dt='2023-01-02'", drops)
+        self.assertNotIn("dt='2023-01-03'", drops)
+
+
+class TestBarrier(DataFillerTestCase):
+
+    SOURCE = '/data/s/t/dt=2023-01-01'
+    TARGETS = ['/data/s/t/dt=2023-01-02', '/data/s/t/dt=2023-01-03',
+               '/data/s/t/dt=2023-01-04']
+
+    def setUp(self):
+        super().setUp()
+        self.hdfs = SlowHDFS([self.SOURCE])
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.journal_path = os.path.join(tmp_dir.name, 'journal.json')
+
+    def statements(self, prefix: str) -> List[str]:
+        return [statement for statement in self.hive.statements
+                if statement.startswith(prefix)]
+
+    # постусловие: партиции копируются одновременно (до copy_workers),
+    #   метаданные, статистика и статусы - по всем партициям
+    def test_concurrent_copy(self):
+        self.make_data_filler(copy_workers=3).execute()
+        self.assertEqual(self.hdfs.max_in_flight['/data/s/t'], 3)
+        self.assertEqual(sorted(target for target, _ in self.hdfs.copies),
+                         self.TARGETS)
+        self.assertEqual(len(self.statements('alter table s.t add')), 1)
+        self.assertEqual(len(self.statements('analyze')), 3)
+        # порядок партиций - порядок завершения копирования
+        self.assertEqual([(code, sorted(parts))
+                          for code, parts in self.vita.published],
+                         [('DS', [('dt', '2023-01-02'), ('dt', '2023-01-03'),
+                                  ('dt', '2023-01-04')])])
+
+    # постусловие: при ошибке копирования удаляются ровно скопированные
+    #   партиции, метаданные и статусы не изменяются
+    def test_copy_failure_rolls_back_created(self):
+        self.hdfs.failing = {self.TARGETS[1]}
+        data_filler = self.make_data_filler(copy_workers=3)
+        with self.assertLogs(level='INFO'):
+            with self.assertRaisesRegex(Exception, 'copy failed'):
+                data_filler.execute()
+        self.assertEqual(sorted(self.hdfs.removed),
+                         [self.TARGETS[0], self.TARGETS[2]])
+        self.assertEqual(self.hdfs.dirs, {self.SOURCE})
+        self.assertEqual(self.hive.statements, [])
+        self.assertEqual(self.vita.published, [])
+
+    # постусловие: copy_strategy='auto' выбирает distcp начиная
+    #   с distcp_threshold_bytes (FakeHDFS.du - 100 байт)
+    def test_copy_strategy_auto(self):
+        self.make_data_filler(copy_strategy='auto', distcp_threshold_bytes=100,
+                              target_partition_values='2023-01-02').execute()
+        self.make_data_filler(copy_strategy='auto', distcp_threshold_bytes=101,
+                              target_partition_values='2023-01-03').execute()
+        self.assertEqual(self.hdfs.copies, [(self.TARGETS[0], 'distcp'),
+                                            (self.TARGETS[1], 'cp')])
+
+    # постусловие: dry_run выводит план и ничего не выполняет
+    def test_dry_run(self):
+        data_filler = self.make_data_filler(dry_run=True, copy_strategy='auto',
+                                            distcp_threshold_bytes=50,
+                                            copy_workers=2, distcp_maps=4)
+        with self.assertLogs(level='INFO') as logs:
+            data_filler.execute()
+        self.assertIn('Copy plan: strategy: distcp, partitions: 3, '
+                      'bytes per partition: 100, estimated bytes: 300, '
+                      'parallelism: 8', '\n'.join(logs.output))
+        self.assertEqual(self.hdfs.dirs, {self.SOURCE})
+        self.assertEqual(self.hive.statements, [])
+        self.assertEqual(self.vita.published, [])
+
+    # постусловие: resume продолжает с невыполненных шагов, частичная
+    #   копия удаляется и копируется заново
+    def test_resume(self):
+        self.hdfs.failing = {self.TARGETS[2]}
+        data_filler = self.make_data_filler(journal_path=self.journal_path)
+        with self.assertLogs(level='INFO'):
+            with self.assertRaisesRegex(Exception, 'copy failed'):
+                data_filler.execute()
+        # при заданном журнале откат не выполняется
+        self.assertEqual(self.hdfs.removed, [])
+        # частичная копия упавшей партиции
+        self.hdfs.dirs.add(self.TARGETS[2])
+        self.hdfs.failing = set()
+        self.hdfs.copies = []
+        self.make_data_filler(journal_path=self.journal_path, resume=True).execute()
+        self.assertEqual(self.hdfs.removed, [self.TARGETS[2]])
+        self.assertEqual(self.hdfs.copies, [(self.TARGETS[2], 'cp')])
+        self.assertEqual(len(self.statements('alter table s.t add')), 1)
+        self.assertEqual(len(self.statements('analyze')), 3)
+        self.assertEqual(len(self.vita.published[0][1]), 3)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    # постусловие: dry_run с resume не изменяет HDFS и журнал
+    def test_dry_run_resume(self):
+        self.hdfs.failing = {self.TARGETS[2]}
+        with self.assertLogs(level='INFO'):
+            with self.assertRaisesRegex(Exception, 'copy failed'):
+                self.make_data_filler(journal_path=self.journal_path).execute()
+        # частичная копия упавшей партиции и удалённая скопированная партиция
+        self.hdfs.dirs.add(self.TARGETS[2])
+        self.hdfs.dirs.discard(self.TARGETS[0])
+        with open(self.journal_path) as journal_file:
+            journal = journal_file.read()
+        data_filler = self.make_data_filler(journal_path=self.journal_path,
+                                            resume=True, dry_run=True)
+        with self.assertLogs(level='INFO') as logs:
+            data_filler.execute()
+        output = '\n'.join(logs.output)
+        self.assertIn('would be removed: ' + self.TARGETS[2], output)
+        self.assertIn('Copy plan: strategy: cp, partitions: 2,', output)
+        self.assertEqual(self.hdfs.removed, [])
+        self.assertEqual(self.hdfs.dirs, {self.SOURCE, self.TARGETS[1],
+                                          self.TARGETS[2]})
+        with open(self.journal_path) as journal_file:
+            self.assertEqual(journal_file.read(), journal)
+
+
+class TestLocationMode(DataFillerTestCase):
+
+    SOURCE = '/data/s/t/dt=2023-01-01'
+
+    def setUp(self):
+        super().setUp()
+        # drop партиции managed-таблицы удаляет данные по её LOCATION
+        self.hive = FakeHive(self.hdfs)
+
+    def execute_failed(self, error: str, **settings) -> List[str]:
+        data_filler = self.make_data_filler(clone_mode='location', **settings)
+        with self.assertLogs(level='INFO') as logs:
+            with self.assertRaisesRegex(Exception, error):
+                data_filler.execute()
+        self.assertNotIn(self.SOURCE, self.hdfs.removed)
+        self.assertIn(self.SOURCE, self.hdfs.dirs)
+        return logs.output
+
+    # постусловие: откат зарегистрированных партиций не удаляет общую
+    #   source_partition
+    def test_rollback_keeps_source(self):
+        self.vita.publish = mock.Mock(side_effect=Exception('Vita unavailable'))
+        logs = self.execute_failed('Vita unavailable')
+        self.assertEqual(self.hdfs.copies, [])
+        self.assertEqual(len([statement for statement in self.hive.statements
+                              if ' set location ' in statement]), 3)
+        self.assertEqual(self.hive.partitions, {})
+        self.assertFalse([line for line in logs if 'Rollback is incomplete' in line])
+
+    # постусловие: SET LOCATION выполняется только для добавленных
+    #   этим запуском партиций, откат не завершается ошибкой
+    def test_rollback_after_failed_metadata(self):
+        self.hive.partitions[('s.t', 'dt=2023-01-03')] = '/data/other'
+        logs = self.execute_failed('AlreadyExists', hive_batch_size=1,
+                                   copy_workers=1)
+        set_locations = ' '.join(statement for statement in self.hive.statements
+                                 if ' set location ' in statement)
+        self.assertIn("dt='2023-01-02'", set_locations)
+        self.assertNotIn("dt='2023-01-03'", set_locations)
+        self.assertEqual(self.hive.partitions,
+                         {('s.t', 'dt=2023-01-03'): '/data/other'})
+        self.assertFalse([line for line in logs if 'Rollback is incomplete' in line])
+
+
+class TestSyncMode(DataFillerTestCase):
+
+    SOURCE = '/data/s/t/dt=2023-01-01'
+    TARGETS = ['/data/s/t/dt=2023-01-02', '/data/s/t/dt=2023-01-03']
+
+    def setUp(self):
+        super().setUp()
+        source_files = {'a.parquet': 'aaa', 'b.parquet': 'bbb', 'sub/c.parquet': 'c'}
+        # target существует: a - совпадает, b - другая контрольная сумма,
+        #   sub/c - отсутствует, old - лишний файл
+        target_files = {'a.parquet': 'aaa', 'b.parquet': 'bbX', 'old.parquet': 'o'}
+        self.hdfs = FakeHDFS(
+            [self.SOURCE, self.TARGETS[0]],
+            {**{f'{self.SOURCE}/{name}': content
+                for name, content in source_files.items()},
+             **{f'{self.TARGETS[0]}/{name}': content
+                for name, content in target_files.items()}}
+        )
+        self.hive.partitions[('s.t', 'dt=2023-01-02')] = self.TARGETS[0]
+
+    def make_data_filler(self, **settings) -> DataFiller:
+        return super().make_data_filler(clone_mode='sync',
+                                        target_partition_values='2023-01-02 2023-01-03',
+                                        **settings)
+
+    # постусловие: в существующую партицию копируются только отсутствующие
+    #   и изменённые файлы, лишние удаляются; новая партиция копируется целиком
+    def test_sync(self):
+        self.make_data_filler().execute()
+        self.assertEqual(sorted(self.hdfs.copied_files),
+                         [f'{self.TARGETS[0]}/b.parquet',
+                          f'{self.TARGETS[0]}/sub/c.parquet'])
+        self.assertEqual(self.hdfs.removed, [f'{self.TARGETS[0]}/old.parquet'])
+        self.assertEqual(self.hdfs.copies, [(self.TARGETS[1], 'cp')])
+        for target in self.TARGETS:
+            self.assertEqual(self.hdfs._files_in(target),
+                             self.hdfs._files_in(self.SOURCE))
+        self.assertEqual(sorted(spec for _, spec in self.hive.partitions),
+                         ['dt=2023-01-02', 'dt=2023-01-03'])
+
+    # постусловие: откат удаляет только созданные запуском партиции,
+    #   существовавшие до синхронизации партиции остаются в HDFS и Hive
+    def test_rollback_keeps_existing(self):
+        self.vita.publish = mock.Mock(side_effect=Exception('Vita unavailable'))
+        with self.assertLogs(level='INFO'):
+            with self.assertRaisesRegex(Exception, 'Vita unavailable'):
+                self.make_data_filler().execute()
+        self.assertIn(self.TARGETS[0], self.hdfs.dirs)
+        self.assertNotIn(self.TARGETS[0], self.hdfs.removed)
+        self.assertNotIn(self.TARGETS[1], self.hdfs.dirs)
+        self.assertIn(self.TARGETS[1], self.hdfs.removed)
+        self.assertEqual(list(self.hive.partitions), [('s.t', 'dt=2023-01-02')])
+
+
+class TestPipeline(DataFillerTestCase):
+
+    TARGETS = ['/data/s/t/dt=2023-01-02', '/data/s/t/dt=2023-01-03',
+               '/data/s/t/dt=2023-01-04']
+
+    def test_success(self):
+        self.make_data_filler(stage_mode='pipeline', copy_workers=2).execute()
+        self.assertTrue(set(self.TARGETS) <= self.hdfs.dirs)
+        # статусы всех партиций - одним шагом после обработки
+        self.assertEqual(self.vita.published,
+                         [('DS', [('dt', '2023-01-02'), ('dt', '2023-01-03'),
+                                  ('dt', '2023-01-04')])])
+
+    # постусловие: при ошибке одной партиции статусы не отправлены,
+    #   откачены все обработанные партиции
+    def test_failure_rolls_back_without_statuses(self):
+        self.hdfs.failing = {self.TARGETS[-1]}
+        data_filler = self.make_data_filler(stage_mode='pipeline', copy_workers=1)
+        with self.assertRaisesRegex(Exception, 'copy failed'):
+            data_filler.execute()
+        self.assertEqual(self.vita.published, [])
+        self.assertEqual(sorted(self.hdfs.removed), self.TARGETS[:2])
+        self.assertEqual(self.hdfs.dirs, {'/data/s/t/dt=2023-01-01'})
+        drops = [statement for statement in self.hive.statements
+                 if 'drop' in statement]
+        self.assertEqual(len(drops), 1)
+        self.assertIn("dt='2023-01-02'", drops[0])
+        self.assertIn("dt='2023-01-03'", drops[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,278 @@
+import json
+import posixpath
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .hdfs_backend import SubprocessHDFSBackend, WebHDFSBackend
+
+
+class FakeWebHDFSHandler(BaseHTTPRequestHandler):
+    """
+    Минимальная реализация WebHDFS поверх словаря:
+    files - {путь: байты}, dirs - множество директорий.
+    CREATE выполняется в два шага, как в настоящем namenode.
+    """
+
+    files = {}
+    dirs = set()
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data: dict, code: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parse(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        return url.path[len('/webhdfs/v1'):], params
+
+    def _read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if not size:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_GET(self):
+        path, params = self._parse()
+        if params['op'] == 'LISTSTATUS':
+            if path not in self.dirs:
+                return self._send_json({'RemoteException': {}}, 404)
+            children = {p for p in list(self.files) + list(self.dirs)
+                        if posixpath.dirname(p) == path and p != path}
+            statuses = [{'pathSuffix': posixpath.basename(p),
+                         'type': 'DIRECTORY' if p in self.dirs else 'FILE',
+                         'length': len(self.files.get(p, b''))}
+                        for p in sorted(children)]
+            return self._send_json({'FileStatuses': {'FileStatus': statuses}})
+        if params['op'] == 'GETCONTENTSUMMARY':
+            length = sum(len(data) for p, data in self.files.items()
+                         if p.startswith(path + '/'))
+            return self._send_json({'ContentSummary': {'length': length}})
+        if params['op'] == 'GETFILECHECKSUM':
+            checksum = {'algorithm': 'MD5', 'bytes': self.files[path].hex(),
+                        'length': 28}
+            return self._send_json({'FileChecksum': checksum})
+        if params['op'] == 'OPEN':
+            body = self.files[path]
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_PUT(self):
+        path, params = self._parse()
+        if params['op'] == 'MKDIRS':
+            while path not in ('/', ''):
+                self.dirs.add(path)
+                path = posixpath.dirname(path)
+            return self._send_json({'boolean': True})
+        if params['op'] == 'CREATE':
+            if 'datanode' not in params:
+                self.send_response(307)
+                host, port = self.server.server_address
+                self.send_header('Location', f'http://{host}:{port}'
+                                 f'{self.path}&datanode=true')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.files[path] = self._read_body()
+            self.send_response(201)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def do_DELETE(self):
+        path, _ = self._parse()
+        deleted = [p for p in list(self.files) + list(self.dirs)
+                   if p == path or p.startswith(path + '/')]
+        for p in deleted:
+            self.files.pop(p, None)
+            self.dirs.discard(p)
+        self._send_json({'boolean': bool(deleted)})
+
+
+class TestWebHDFSBackend(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeWebHDFSHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeWebHDFSHandler.files = {
+            '/data/t/dt=2023-01-01/part-0': b'abc',
+            '/data/t/dt=2023-01-01/sub/part-1': b'def',
+        }
+        FakeWebHDFSHandler.dirs = {'/data', '/data/t', '/data/t/dt=2023-01-01',
+                                   '/data/t/dt=2023-01-01/sub'}
+        host, port = self.server.server_address
+        self.backend = WebHDFSBackend(f'http://{host}:{port}', user='hdfs')
+
+    def test_list_dir(self):
+        self.assertEqual(self.backend.list_dir('/data/t'),
+                         ['/data/t/dt=2023-01-01'])
+
+    # предусловие: target отсутствует
+    # постусловие: source скопирована в target
+    def test_copy(self):
+        self.backend.copy('/data/t/dt=2023-01-01', '/data/t/dt=2023-01-02')
+        files = FakeWebHDFSHandler.files
+        self.assertEqual(files['/data/t/dt=2023-01-02/part-0'], b'abc')
+        self.assertEqual(files['/data/t/dt=2023-01-02/sub/part-1'], b'def')
+        self.assertEqual(sorted(self.backend.list_dir('/data/t')),
+                         ['/data/t/dt=2023-01-01', '/data/t/dt=2023-01-02'])
+
+    # постусловие: path и всё его содержимое удалены
+    def test_remove(self):
+        self.backend.remove('/data/t/dt=2023-01-01')
+        self.assertEqual(self.backend.list_dir('/data/t'), [])
+        self.assertEqual(FakeWebHDFSHandler.files, {})
+        with self.assertRaises(Exception):
+            self.backend.remove('/data/t/dt=2023-01-01')
+
+    # постусловие: удалены все пути, кроме возвращённых с ошибкой
+    def test_remove_many(self):
+        self.backend.copy('/data/t/dt=2023-01-01', '/data/t/dt=2023-01-02')
+        errors = self.backend.remove_many(['/data/t/dt=2023-01-01',
+                                           '/data/t/missing',
+                                           '/data/t/dt=2023-01-02'])
+        self.assertEqual(list(errors), ['/data/t/missing'])
+        self.assertEqual(self.backend.list_dir('/data/t'), [])
+
+    def test_du(self):
+        self.assertEqual(self.backend.du('/data/t/dt=2023-01-01'), 6)
+        with self.assertRaises(Exception):
+            self.backend.distcp('/data/t/dt=2023-01-01', '/data/t/dt=2', 10)
+
+    def test_list_files_and_checksums(self):
+        files = self.backend.list_files(['/data/t/dt=2023-01-01'])
+        self.assertEqual(files, {'/data/t/dt=2023-01-01': {'part-0': 3,
+                                                           'sub/part-1': 3}})
+        checksums = self.backend.checksums(['/data/t/dt=2023-01-01/part-0'])
+        self.assertEqual(checksums, {'/data/t/dt=2023-01-01/part-0': 'MD5:616263'})
+
+    def test_copy_files(self):
+        self.backend.copy_files(['/data/t/dt=2023-01-01/part-0'], '/data/t/dt=2/sub')
+        self.assertEqual(FakeWebHDFSHandler.files['/data/t/dt=2/sub/part-0'], b'abc')
+
+    def test_list_missing_dir(self):
+        with self.assertRaises(Exception):
+            self.backend.list_dir('/missing')
+
+
+class TestSubprocessHDFSBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.commands = []
+        self.returncode = 0
+        self.stderr = b'error'
+
+        def bash_execute(command):
+            self.commands.append(command)
+            stdout = {
+                '-du': b'1024  3072  /data/t/dt=1\n',
+                '-checksum': b'/data/t/dt=1/part-0\tMD5-of-0MD5-of-512CRC32C\t0002\n',
+                '-R': (b'drwxr-xr-x   - hdfs hdfs    0 2023-01-01 10:00 /data/t/dt=1/sub\n'
+                       b'-rw-r--r--   3 hdfs hdfs  100 2023-01-01 10:00 /data/t/dt=1/sub/part 1\n'
+                       b'-rw-r--r--   3 hdfs hdfs   10 2023-01-01 10:00 /data/t/dt=2/part-0\n'),
+            }
+            flag = next((flag for flag in stdout if flag in command), None)
+            stdout = stdout.get(flag, b'/data/t/dt=1\n/data/t/dt=2\n')
+            return {'stdout': stdout,
+                    'stderr': self.stderr, 'returncode': self.returncode}
+
+        self.backend = SubprocessHDFSBackend(bash_execute)
+
+    def test_commands(self):
+        self.assertEqual(self.backend.list_dir('/data/t'),
+                         ['/data/t/dt=1', '/data/t/dt=2'])
+        self.assertEqual(self.backend.du('/data/t/dt=1'), 1024)
+        self.backend.copy('/data/t/dt=1', '/data/t/dt=3')
+        self.backend.distcp('/data/t/dt=1', '/data/t/dt=4', 20)
+        self.backend.remove('/data/t/dt=3')
+        self.assertEqual(self.commands, [
+            ['hadoop', 'fs', '-ls', '-C', '/data/t'],
+            ['hadoop', 'fs', '-du', '-s', '/data/t/dt=1'],
+            ['hadoop', 'fs', '-cp', '-f', '/data/t/dt=1', '/data/t/dt=3'],
+            ['hadoop', 'distcp', '-m', '20', '/data/t/dt=1', '/data/t/dt=4'],
+            ['hadoop', 'fs', '-rm', '-R', '/data/t/dt=3'],
+        ])
+
+    def test_list_files_and_checksums(self):
+        files = self.backend.list_files(['/data/t/dt=1', '/data/t/dt=2/'])
+        self.assertEqual(files, {'/data/t/dt=1': {'sub/part 1': 100},
+                                 '/data/t/dt=2': {'part-0': 10}})
+        checksums = self.backend.checksums(['/data/t/dt=1/part-0'])
+        self.assertEqual(checksums,
+                         {'/data/t/dt=1/part-0': 'MD5-of-0MD5-of-512CRC32C:0002'})
+        self.backend.copy_files(['/data/t/dt=1/a', '/data/t/dt=1/b'], '/data/t/dt=3')
+        self.assertEqual(self.commands[-3:], [
+            ['hadoop', 'fs', '-checksum', '/data/t/dt=1/part-0'],
+            ['hadoop', 'fs', '-mkdir', '-p', '/data/t/dt=3'],
+            ['hadoop', 'fs', '-cp', '-f', '/data/t/dt=1/a', '/data/t/dt=1/b',
+             '/data/t/dt=3'],
+        ])
+
+    def test_remove_many(self):
+        self.assertEqual(self.backend.remove_many(['/data/t/dt=1', '/data/t/dt=2']),
+                         {})
+        self.assertEqual(self.commands[-1],
+                         ['hadoop', 'fs', '-rm', '-R', '/data/t/dt=1', '/data/t/dt=2'])
+        self.returncode = 1
+        self.stderr = b"rm: `/data/t/dt=2': Permission denied\n"
+        errors = self.backend.remove_many(['/data/t/dt=1', '/data/t/dt=2'])
+        self.assertEqual(errors, {'/data/t/dt=2': "rm: `/data/t/dt=2': Permission denied"})
+        self.stderr = b'unexpected error'
+        errors = self.backend.remove_many(['/data/t/dt=1', '/data/t/dt=2'])
+        self.assertEqual(sorted(errors), ['/data/t/dt=1', '/data/t/dt=2'])
+
+    def test_remove_many_split(self):
+        self.backend.MAX_COMMAND_CHARS = 30
+        paths = [f'/data/t/dt=2023-01-0{day}' for day in range(1, 5)]
+        self.assertEqual(self.backend.remove_many(paths), {})
+        self.assertEqual([command[4:] for command in self.commands],
+                         [paths[:1], paths[1:2], paths[2:3], paths[3:]])
+
+    # постусловие: пути не помещаются в одну команду - несколько команд
+    def test_split_commands(self):
+        self.backend.MAX_COMMAND_CHARS = 20
+        paths = [f'/data/t/dt=1/part-{i}' for i in range(3)]
+        self.backend.checksums(paths)
+        self.backend.copy_files(paths, '/data/t/dt=3')
+        files = self.backend.list_files(['/data/t/dt=1', '/data/t/dt=2'])
+        self.assertEqual(files, {'/data/t/dt=1': {'sub/part 1': 100},
+                                 '/data/t/dt=2': {'part-0': 10}})
+        self.assertEqual(self.commands, [
+            *[['hadoop', 'fs', '-checksum', path] for path in paths],
+            ['hadoop', 'fs', '-mkdir', '-p', '/data/t/dt=3'],
+            *[['hadoop', 'fs', '-cp', '-f', path, '/data/t/dt=3'] for path in paths],
+            ['hadoop', 'fs', '-ls', '-R', '/data/t/dt=1'],
+            ['hadoop', 'fs', '-ls', '-R', '/data/t/dt=2'],
+        ])
+
+    def test_error(self):
+        self.returncode = 1
+        with self.assertRaises(Exception):
+            self.backend.copy('/data/t/dt=1', '/data/t/dt=3')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import re
+import sqlite3
+import unittest
+
+from .hive_backend import CliHiveBackend, HiveServer2Backend
+
+
+class FakeHiveCursor:
+    """
+    Курсор, переводящий используемые DataFiller запросы HiveQL
+    (add/drop partition, analyze) в запросы к SQLite.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+
+    def execute(self, statement: str) -> None:
+        table = re.match(r'(?:alter|analyze) table (\S+)', statement).group(1)
+        specs = re.findall(r"partition \((\w+)='([^']*)'\)", statement)
+        if statement.startswith('analyze'):
+            updated = self._connection.execute(
+                'update partitions set analyzed = 1 '
+                'where tbl = ? and spec = ?', (table, '='.join(specs[0]))
+            ).rowcount
+            if not updated:
+                raise Exception(f'Partition not found: {specs[0]}')
+        elif ' drop ' in statement:
+            self._connection.executemany(
+                'delete from partitions where tbl = ? and spec = ?',
+                [(table, '='.join(spec)) for spec in specs]
+            )
+        else:
+            self._connection.executemany(
+                'insert into partitions (tbl, spec) values (?, ?)',
+                [(table, '='.join(spec)) for spec in specs]
+            )
+
+    def close(self) -> None:
+        pass
+
+
+class FakeHiveConnection:
+
+    connections = 0
+
+    def __init__(self, db: sqlite3.Connection) -> None:
+        FakeHiveConnection.connections += 1
+        self._db = db
+        self.closed = False
+
+    def cursor(self) -> FakeHiveCursor:
+        return FakeHiveCursor(self._db)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestHiveServer2Backend(unittest.TestCase):
+
+    def setUp(self):
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+        self.db.execute('create table partitions (tbl text, spec text, '
+                        'analyzed int default 0, unique (tbl, spec))')
+        FakeHiveConnection.connections = 0
+        self.backend = HiveServer2Backend(
+            lambda: FakeHiveConnection(self.db), pool_size=2
+        )
+
+    def tearDown(self):
+        self.backend.close()
+
+    def _partitions(self) -> list:
+        return self.db.execute(
+            'select spec, analyzed from partitions order by spec'
+        ).fetchall()
+
+    def test_execute(self):
+        result = self.backend.execute([
+            "alter table s.t add partition (dt='1') partition (dt='2')",
+            "analyze table s.t partition (dt='1') compute statistics",
+            "analyze table s.t partition (dt='2') compute statistics",
+        ])
+        self.assertEqual(result, {'completed': 3, 'started': 3, 'error': None})
+        self.assertEqual(self._partitions(), [('dt=1', 1), ('dt=2', 1)])
+        result = self.backend.execute(
+            ["alter table s.t drop if exists partition (dt='1')"]
+        )
+        self.assertEqual(result['completed'], 1)
+        self.assertEqual(self._partitions(), [('dt=2', 1)])
+        # соединение переиспользуется между вызовами
+        self.assertEqual(FakeHiveConnection.connections, 1)
+
+    # постусловие: запросы выполнены по порядку до первой ошибки
+    def test_execute_error(self):
+        self.backend.execute(["alter table s.t add partition (dt='1')"])
+        result = self.backend.execute([
+            "analyze table s.t partition (dt='1') compute statistics",
+            "analyze table s.t partition (dt='2') compute statistics",
+            "analyze table s.t partition (dt='3') compute statistics",
+        ])
+        self.assertEqual(result['completed'], 1)
+        self.assertEqual(result['started'], 2)
+        self.assertIn('dt', result['error'])
+
+    # постусловие: соединение с ошибкой закрыто и не возвращается в пул,
+    #   его слот свободен для нового соединения
+    def test_connection_discarded_after_error(self):
+        opened = []
+
+        def connect():
+            opened.append(FakeHiveConnection(self.db))
+            return opened[-1]
+
+        backend = HiveServer2Backend(connect, pool_size=1)
+        self.addCleanup(backend.close)
+        result = backend.execute(
+            ["analyze table s.t partition (dt='1') compute statistics"]
+        )
+        self.assertIsNotNone(result['error'])
+        self.assertTrue(opened[0].closed)
+        result = backend.execute(["alter table s.t add partition (dt='1')"])
+        self.assertIsNone(result['error'])
+        self.assertEqual(len(opened), 2)
+        self.assertFalse(opened[1].closed)
+
+
+class TestCliHiveBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.commands = []
+        self.process = {'stdout': b'', 'stderr': b'', 'returncode': 0}
+
+        def bash_execute(command, is_shell=False):
+            self.commands.append(command)
+            return self.process
+
+        self.backend = CliHiveBackend(bash_execute)
+        self.statements = ["analyze table s.t partition (dt='1') compute statistics",
+                           "analyze table s.t partition (dt='2') compute statistics"]
+
+    def test_execute(self):
+        result = self.backend.execute(self.statements)
+        self.assertEqual(result, {'completed': 2, 'started': 2, 'error': None})
+        self.assertEqual(self.commands, [
+            'hive -v -e "' + '; '.join(self.statements) + ';"'
+        ])
+
+    def test_split_sessions(self):
+        self.backend.MAX_COMMAND_CHARS = 100
+        result = self.backend.execute(self.statements * 2)
+        self.assertEqual(result, {'completed': 4, 'started': 4, 'error': None})
+        self.assertEqual(len(self.commands), 4)
+
+    def test_execute_error(self):
+        self.process = {'stdout': (self.statements[0] + '\n' +
+                                   self.statements[1] + '\n').encode(),
+                        'stderr': b'FAILED', 'returncode': 1}
+        result = self.backend.execute(self.statements)
+        self.assertEqual(result, {'completed': 1, 'started': 2, 'error': 'FAILED'})
+
+    # постусловие: ошибка до вывода запросов не относится ни к одному запросу
+    def test_session_error(self):
+        self.process = {'stdout': b'', 'stderr': b'GSS initiate failed',
+                        'returncode': 1}
+        result = self.backend.execute(self.statements)
+        self.assertEqual(result, {'completed': 0, 'started': 0,
+                                  'error': 'GSS initiate failed'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from .journal import StepJournal
+
+
+class TestStepJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'journal.json')
+        self.job = {'source_partition': '/data/t/dt=1', 'table_name': 's.t'}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # постусловие: отмеченные шаги доступны при возобновлении
+    def test_resume(self):
+        journal = StepJournal(self.path, self.job)
+        journal.mark_done(['/data/t/dt=2', '/data/t/dt=3'], 'copy')
+        journal.mark_done(['/data/t/dt=2'], 'metadata')
+
+        resumed = StepJournal(self.path, self.job, resume=True)
+        self.assertTrue(resumed.is_done('/data/t/dt=3', 'copy'))
+        self.assertEqual(resumed.not_done(['/data/t/dt=2', '/data/t/dt=3'],
+                                          'metadata'),
+                         ['/data/t/dt=3'])
+        resumed.unmark('/data/t/dt=3', 'copy')
+        self.assertFalse(StepJournal(self.path, self.job, resume=True)
+                         .is_done('/data/t/dt=3', 'copy'))
+
+    def test_clear(self):
+        journal = StepJournal(self.path, self.job)
+        journal.mark_done(['/data/t/dt=2'], 'copy')
+        journal.clear()
+        self.assertFalse(os.path.exists(self.path))
+        with self.assertRaises(Exception):
+            StepJournal(self.path, self.job, resume=True)
+
+    def test_another_job(self):
+        StepJournal(self.path, self.job).mark_done(['/data/t/dt=2'], 'copy')
+        with self.assertRaises(Exception):
+            StepJournal(self.path, {'source_partition': '/data/other/dt=1',
+                                    'table_name': 's.other'}, resume=True)
+
+    def test_in_memory(self):
+        journal = StepJournal()
+        journal.mark_done(['/data/t/dt=2'], 'copy')
+        self.assertTrue(journal.is_done('/data/t/dt=2', 'copy'))
+        journal.clear()
+        self.assertFalse(journal.is_done('/data/t/dt=2', 'copy'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import time
+import unittest
+
+from .listing_cache import ListingCache
+
+
+class TestListingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cache.db')
+        self.cache = ListingCache(self.path, ttl_seconds=60)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get('/data/t'))
+        self.cache.put('/data/t', ['/data/t/dt=1', '/data/t/dt=2'])
+        self.assertEqual(self.cache.get('/data/t'), ['/data/t/dt=1', '/data/t/dt=2'])
+        # кэш общий для всех запусков, использующих файл
+        self.assertEqual(ListingCache(self.path).get('/data/t'),
+                         ['/data/t/dt=1', '/data/t/dt=2'])
+        self.cache.put('/data/t', [])
+        self.assertEqual(self.cache.get('/data/t'), [])
+
+    # постусловие: устаревшая запись не возвращается
+    def test_ttl(self):
+        cache = ListingCache(self.path, ttl_seconds=0.05)
+        cache.put('/data/t', ['/data/t/dt=1'])
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('/data/t'))
+
+    # постусловие: записи по директориям удалены, остальные сохранены
+    def test_invalidate(self):
+        self.cache.put('/data/a', ['/data/a/dt=1'])
+        self.cache.put('/data/b', ['/data/b/dt=1'])
+        self.cache.invalidate(['/data/a', '/data/a'])
+        self.assertIsNone(self.cache.get('/data/a'))
+        self.assertEqual(self.cache.get('/data/b'), ['/data/b/dt=1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from .metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_stage_accumulates(self):
+        metrics = RunMetrics()
+        for _ in range(3):
+            with metrics.stage('copy'):
+                pass
+        with self.assertRaises(ValueError):
+            with metrics.stage('metadata'):
+                raise ValueError('boom')
+        summary = metrics.summary()
+        self.assertEqual(summary['stages']['copy']['count'], 3)
+        self.assertEqual(summary['stages']['metadata']['count'], 1)
+        self.assertEqual(summary['stages']['metadata']['failed'], 1)
+        self.assertEqual(summary['stages']['copy']['failed'], 0)
+
+    def test_record_command_by_tool(self):
+        metrics = RunMetrics()
+        metrics.record_command(['hadoop', 'fs', '-cp', 'a', 'b'], 0.5, 0)
+        metrics.record_command('hive -v -e "select 1"', 1.0, 1)
+        metrics.record_command(['hadoop', 'fs', '-rm', 'b'], 0.25, 0)
+        summary = metrics.summary()
+        self.assertEqual(summary['processes'], 3)
+        self.assertEqual(summary['commands']['hadoop']['count'], 2)
+        self.assertEqual(summary['commands']['hadoop']['seconds'], 0.75)
+        self.assertEqual(summary['commands']['hive']['failed'], 1)
+
+    def test_concurrent_updates(self):
+        metrics = RunMetrics()
+
+        def work():
+            for _ in range(1000):
+                metrics.add_bytes(10)
+                metrics.add_retry()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(metrics.summary()['bytes_copied'], 40000)
+        self.assertEqual(metrics.summary()['retries'], 4000)
+
+    def test_export(self):
+        metrics = RunMetrics({'table': 'schema.table'})
+        with metrics.stage('copy'):
+            metrics.add_bytes(1024)
+        metrics.record_command(['hadoop', 'fs', '-cp'], 0.1, 0)
+        metrics.set_gauge('vita_outbox_depth', 3)
+        metrics.status = 'success'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, 'metrics.json')
+            prom_path = os.path.join(tmp_dir, 'metrics.prom')
+            metrics.write_json(json_path)
+            metrics.write_prometheus(prom_path)
+            with open(json_path) as json_file:
+                summary = json.load(json_file)
+            with open(prom_path) as prom_file:
+                prom = prom_file.read()
+            self.assertEqual(sorted(os.listdir(tmp_dir)),
+                             ['metrics.json', 'metrics.prom'])
+        self.assertEqual(summary['bytes_copied'], 1024)
+        self.assertEqual(summary['status'], 'success')
+        self.assertIn('data_filler_run_success{table="schema.table"} 1', prom)
+        self.assertIn('data_filler_bytes_copied{table="schema.table"} 1024', prom)
+        self.assertIn('data_filler_stage_seconds{table="schema.table",stage="copy"}',
+                      prom)
+        self.assertIn('data_filler_commands{table="schema.table",tool="hadoop"} 1',
+                      prom)
+        self.assertIn('data_filler_vita_outbox_depth{table="schema.table"} 3', prom)
+        self.assertEqual(summary['gauges'], {'vita_outbox_depth': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import itertools
+import unittest
+
+from .partition_values import iter_partition_values
+
+
+class TestPartitionValues(unittest.TestCase):
+
+    def test_values(self):
+        self.assertEqual(list(iter_partition_values('2023-01-01  2023-01-05')),
+                         ['2023-01-01', '2023-01-05'])
+
+    def test_ranges(self):
+        self.assertEqual(list(iter_partition_values('2023-12-30..2024-01-02')),
+                         ['2023-12-30', '2023-12-31', '2024-01-01', '2024-01-02'])
+        self.assertEqual(list(iter_partition_values('2023-01-01..2023-01-20:1w')),
+                         ['2023-01-01', '2023-01-08', '2023-01-15'])
+        self.assertEqual(list(iter_partition_values('2023-01-01..2023-01-05:2d x')),
+                         ['2023-01-01', '2023-01-03', '2023-01-05', 'x'])
+        # день месяца ограничивается длиной месяца
+        self.assertEqual(list(iter_partition_values('2024-01-31..2024-04-30:1m')),
+                         ['2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30'])
+
+    # постусловие: значения генерируются по мере чтения
+    def test_lazy(self):
+        values = iter_partition_values('2000-01-01..9999-12-31')
+        self.assertEqual(list(itertools.islice(values, 2)),
+                         ['2000-01-01', '2000-01-02'])
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            list(iter_partition_values('2023-02-01..2023-01-01'))
+        with self.assertRaises(ValueError):
+            list(iter_partition_values('2023-02-01..2023-13-01'))
+        for expression in ('2023-01-01..', '..2023-01-01', '2023-01-01...2023-01-02',
+                           '2023-01-01..2023-01-05:2x'):
+            with self.assertRaises(ValueError):
+                list(iter_partition_values(expression))
+
+    # постусловие: повторы отдаются один раз в порядке первого появления
+    def test_duplicates(self):
+        values = iter_partition_values('2023-01-03 2023-01-01..2023-01-04 '
+                                       '2023-01-02..2023-01-05 2023-01-03')
+        self.assertEqual(list(values),
+                         ['2023-01-03', '2023-01-01', '2023-01-02', '2023-01-04',
+                          '2023-01-05'])
+
+
+if __name__ == '__main__':
+    unittest.main()
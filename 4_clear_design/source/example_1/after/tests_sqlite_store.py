@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from .sqlite_store import SQLiteStore
+
+
+class Store(SQLiteStore):
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        with self._connect() as connection:
+            connection.execute(
+                'create table if not exists items (id integer primary key,'
+                ' state text not null default \'pending\', claim text,'
+                ' updated_at real not null default 0)'
+            )
+
+    def claim(self, limit: int, stale_seconds: float = 60) -> list:
+        return [row[0] for row in self._claim_rows(
+            'items', 'state', 'running',
+            'id in (select id from items where state = \'pending\''
+            ' or (state = \'running\' and updated_at < ?) order by id limit ?)',
+            (time.time() - stale_seconds, limit), 'id', 'id'
+        )]
+
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.store = Store(os.path.join(tmp_dir.name, 'store.db'))
+        with self.store._connect() as connection:
+            connection.executemany('insert into items (id) values (?)',
+                                   [(i,) for i in range(100)])
+
+    # постусловие: одновременные обработчики не арендуют одни и те же записи
+    def test_concurrent_claims(self):
+        claimed = []
+
+        def claim():
+            while True:
+                rows = self.store.claim(7)
+                if not rows:
+                    break
+                claimed.extend(rows)
+
+        threads = [threading.Thread(target=claim) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), list(range(100)))
+
+    # постусловие: записи упавшего обработчика арендуются повторно
+    def test_stale_claim(self):
+        self.assertEqual(self.store.claim(2), [0, 1])
+        self.assertEqual(self.store.claim(2, stale_seconds=60), [2, 3])
+        self.assertEqual(self.store.claim(2, stale_seconds=-1), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from .statistics_queue import StatisticsQueue
+
+
+class FakeHiveBackend:
+
+    def __init__(self, fail_on: str = None, session_error: str = None) -> None:
+        self.fail_on = fail_on
+        self.session_error = session_error
+        self.calls = []
+
+    def execute(self, statements: list) -> dict:
+        self.calls.append(statements)
+        if self.session_error:
+            return {'completed': 0, 'started': 0, 'error': self.session_error}
+        for completed, statement in enumerate(statements):
+            if self.fail_on and self.fail_on in statement:
+                return {'completed': completed, 'started': completed + 1,
+                        'error': 'FAILED'}
+        return {'completed': len(statements), 'started': len(statements),
+                'error': None}
+
+
+class TestStatisticsQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = StatisticsQueue(os.path.join(self.tmp_dir.name, 'queue.db'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # постусловие: партиции одной таблицы обрабатываются одним вызовом,
+    #   повторы схлопываются
+    def test_coalesce(self):
+        self.queue.enqueue('s.a', [('dt', '1'), ('dt', '2')])
+        self.queue.enqueue('s.a', [('dt', '2'), ('dt', '3')])
+        self.queue.enqueue('s.b', [('dt', '1')])
+        self.assertEqual(self.queue.depth(), 4)
+        hive = FakeHiveBackend()
+        results = self.queue.process(hive, workers=2)
+        self.assertEqual(sorted(len(call) for call in hive.calls), [1, 3])
+        self.assertEqual(sum(result['done'] for result in results), 4)
+        self.assertEqual(self.queue.depth(), 0)
+        self.assertEqual(self.queue.process(hive), [])
+
+    def test_failure(self):
+        self.queue.enqueue('s.a', [('dt', '1'), ('dt', '2'), ('dt', '3')])
+        with self.assertLogs(level='ERROR'):
+            results = self.queue.process(FakeHiveBackend(fail_on="dt='2'"))
+        self.assertEqual(results, [{'table_name': 's.a', 'done': 1, 'failed': 1}])
+        # партиция после упавшей возвращена в очередь
+        self.assertEqual(self.queue.depth(), 1)
+
+    # постусловие: при ошибке запуска сессии все партиции остаются
+    #   в очереди, ошибка пробрасывается
+    def test_session_error(self):
+        self.queue.enqueue('s.a', [('dt', '1'), ('dt', '2')])
+        with self.assertLogs(level='ERROR'):
+            with self.assertRaisesRegex(Exception, 'GSS'):
+                self.queue.process(FakeHiveBackend(session_error='GSS'))
+        self.assertEqual(self.queue.depth(), 2)
+
+    def test_requeue_failed(self):
+        self.queue.enqueue('s.a', [('dt', '1'), ('dt', '2')])
+        with self.assertLogs(level='ERROR'):
+            self.queue.process(FakeHiveBackend(fail_on="dt='1'"))
+        self.assertEqual(self.queue.depth(), 1)
+        self.assertEqual(self.queue.requeue_failed(), 1)
+        results = self.queue.process(FakeHiveBackend())
+        self.assertEqual(results, [{'table_name': 's.a', 'done': 2, 'failed': 0}])
+
+    def test_cancel(self):
+        self.queue.enqueue('s.a', [('dt', '1'), ('dt', '2')])
+        self.queue.cancel('s.a', [('dt', '1')])
+        hive = FakeHiveBackend()
+        self.queue.process(hive)
+        self.assertEqual(hive.calls, [
+            ["analyze table s.a partition (dt='2') compute statistics"]
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
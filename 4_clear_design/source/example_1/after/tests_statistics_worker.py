@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from . import data_filler as data_filler_module
+from .statistics_queue import StatisticsQueue
+from .statistics_worker import HiveStatisticsWorker
+from .tests_data_filler import FakeHive
+
+
+class TestHiveStatisticsWorker(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.queue_path = os.path.join(tmp_dir.name, 'queue.db')
+        self.queue = StatisticsQueue(self.queue_path)
+        self.queue.enqueue('s.t', [('dt', '1'), ('dt', '2')])
+        self.hive = FakeHive()
+        self.hive.partitions = {('s.t', 'dt=1'): '/data/s/t/dt=1'}
+        self.runners = []
+
+        def create_backend(bash_execute):
+            # запускатель команд создан до запуска потоков очереди
+            self.runners.append(bash_execute.__self__._runner)
+            return self.hive
+
+        patch = mock.patch.object(data_filler_module, 'CliHiveBackend',
+                                  side_effect=create_backend)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def execute(self, **settings) -> None:
+        worker = HiveStatisticsWorker()
+        worker.statistics_queue_path = self.queue_path
+        for name, value in settings.items():
+            setattr(worker, name, value)
+        with self.assertLogs(level='INFO'):
+            worker.execute()
+
+    # постусловие: партиция с ошибкой ANALYZE обрабатывается повторно
+    #   только после requeue_failed
+    def test_requeue_failed(self):
+        with self.assertRaisesRegex(Exception, 'failed for 1 partitions'):
+            self.execute()
+        self.assertIsNotNone(self.runners[0])
+        self.hive.partitions[('s.t', 'dt=2')] = '/data/s/t/dt=2'
+        self.execute()
+        self.assertEqual(len(self.hive.statements), 2)
+        self.execute(requeue_failed=True)
+        self.assertEqual(self.hive.statements[-1],
+                         "analyze table s.t partition (dt='2') compute statistics")
+        self.assertEqual(self.queue.depth(), 0)
+
+    # постусловие: ошибка запуска сессии - ошибка команды, партиции в очереди
+    def test_session_error(self):
+        self.hive.session_error = 'GSS initiate failed'
+        with self.assertRaisesRegex(Exception, 'GSS initiate failed'):
+            self.execute()
+        self.assertEqual(self.queue.depth(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .vita import VitaPublisher
+
+
+class FakeVitaHandler(BaseHTTPRequestHandler):
+    """/v2/add_status в памяти; статусы партиций со значением из failing - 500."""
+
+    protocol_version = 'HTTP/1.1'
+    requests = []
+    failing = set()
+    latency = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cls = FakeVitaHandler
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(cls.latency)
+            with cls.lock:
+                cls.requests.append(body)
+            values = {part['value'] for part in body['dlk_parts']}
+            code = 500 if values & cls.failing else 200
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+        data = b'{}'
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestVitaPublisher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeVitaHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeVitaHandler.requests = []
+        FakeVitaHandler.failing = set()
+        FakeVitaHandler.latency = 0
+        FakeVitaHandler.in_flight = 0
+        FakeVitaHandler.max_in_flight = 0
+
+    def make_publisher(self, workers: int = 1, batch_size: int = 1) -> VitaPublisher:
+        publisher = VitaPublisher('127.0.0.1', workers, batch_size)
+        # порт 8002 зашит в VitaPublisher, в тестах - порт локального сервера
+        host, port = self.server.server_address
+        publisher.url = f'http://{host}:{port}/v2/add_status'
+        self.addCleanup(publisher.close)
+        return publisher
+
+    @staticmethod
+    def parts(count: int, start: int = 0) -> list:
+        return [('dt', str(i)) for i in range(start, start + count)]
+
+    # постусловие: в одном запросе не больше batch_size партиций
+    def test_batching(self):
+        publisher = self.make_publisher(workers=2, batch_size=2)
+        publisher.publish('DS', self.parts(5))
+        batches = sorted([part['value'] for part in request['dlk_parts']]
+                         for request in FakeVitaHandler.requests)
+        self.assertEqual(batches, [['0', '1'], ['2', '3'], ['4']])
+        self.assertTrue(all(request['dlk_ds_code'] == 'DS'
+                            and request['status'] == 'F'
+                            for request in FakeVitaHandler.requests))
+
+    # постусловие: лимит workers общий для одновременных вызовов publish
+    def test_workers_limit(self):
+        FakeVitaHandler.latency = 0.05
+        publisher = self.make_publisher(workers=2)
+        threads = [threading.Thread(target=publisher.publish,
+                                    args=('DS', self.parts(4, start)))
+                   for start in (0, 10, 20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(FakeVitaHandler.requests), 12)
+        self.assertEqual(FakeVitaHandler.max_in_flight, 2)
+
+    # постусловие: ошибка пробрасывается после отправки всех запросов
+    def test_error_after_all_requests(self):
+        FakeVitaHandler.failing = {'1'}
+        publisher = self.make_publisher(workers=2)
+        with self.assertRaisesRegex(Exception, '500'):
+            publisher.publish('DS', self.parts(6))
+        self.assertEqual(len(FakeVitaHandler.requests), 6)
+
+    def test_try_publish(self):
+        FakeVitaHandler.failing = {'2'}
+        publisher = self.make_publisher(batch_size=2)
+        errors = publisher.try_publish('DS', self.parts(4))
+        # ошибка запроса относится ко всем партициям его пачки
+        self.assertEqual(sorted(errors), [('dt', '2'), ('dt', '3')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+import unittest
+
+from .vita_outbox import VitaOutbox, VitaOutboxFlusher, to_prometheus
+
+
+class FakePublisher:
+
+    def __init__(self, fail_on: set = None) -> None:
+        self.fail_on = fail_on or set()
+        self.calls = []
+
+    def try_publish(self, dlk_ds_code: str, parts: list, status: str = 'F') -> dict:
+        self.calls.append((dlk_ds_code, parts, status))
+        return {part: 'Error: (500)' for part in parts if part in self.fail_on}
+
+
+class TestVitaOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'outbox.db')
+        self.outbox = VitaOutbox(self.path, max_attempts=2, backoff_seconds=0.05)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # постусловие: статусы одного набора данных отправлены одним вызовом
+    #   и удалены из очереди
+    def test_flush(self):
+        self.outbox.enqueue('vita', 'ds_a', [('dt', '1'), ('dt', '2')])
+        self.outbox.enqueue('vita', 'ds_b', [('dt', '1')])
+        self.assertEqual(self.outbox.depth(), 3)
+        publisher = FakePublisher()
+        result = self.outbox.flush(lambda host_api: publisher)
+        self.assertEqual(result['sent'], 3)
+        self.assertEqual(sorted(publisher.calls), [
+            ('ds_a', [('dt', '1'), ('dt', '2')], 'F'),
+            ('ds_b', [('dt', '1')], 'F'),
+        ])
+        self.assertEqual(self.outbox.depth(), 0)
+
+    # постусловие: неотправленный статус повторяется после backoff,
+    #   после max_attempts попыток переходит в failed
+    def test_retry_and_fail(self):
+        self.outbox.enqueue('vita', 'ds', [('dt', '1'), ('dt', '2')])
+        publisher = FakePublisher(fail_on={('dt', '2')})
+        result = self.outbox.flush(lambda host_api: publisher)
+        self.assertEqual((result['sent'], result['retried']), (1, 1))
+        # backoff ещё не истёк
+        self.assertEqual(self.outbox.flush(lambda host_api: publisher)['retried'], 0)
+        time.sleep(0.1)
+        result = self.outbox.flush(lambda host_api: publisher)
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(self.outbox.stats()['failed'], 1)
+        self.assertEqual(self.outbox.list('failed')[0]['error'], 'Error: (500)')
+        self.assertEqual(self.outbox.depth(), 0)
+
+        self.assertEqual(self.outbox.requeue_failed(), 1)
+        result = self.outbox.flush(lambda host_api: FakePublisher())
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(self.outbox.stats()['failed'], 0)
+
+    def test_publisher_error(self):
+        self.outbox.enqueue('vita', 'ds', [('dt', '1')])
+
+        def publisher_for(host_api):
+            raise ConnectionError('vita is unavailable')
+
+        result = self.outbox.flush(publisher_for)
+        self.assertEqual(result['retried'], 1)
+        self.assertEqual(self.outbox.list()[0]['error'], 'vita is unavailable')
+
+    def test_cancel(self):
+        self.outbox.enqueue('vita', 'ds', [('dt', '1'), ('dt', '2')])
+        self.outbox.cancel('vita', 'ds', [('dt', '1')])
+        self.assertEqual([row['partition_value'] for row in self.outbox.list()], ['2'])
+
+    # постусловие: запись, забранная упавшим отправителем, отправляется
+    #   повторно после stale_seconds
+    def test_stale_claim(self):
+        self.outbox.enqueue('vita', 'ds', [('dt', '1')])
+        self.assertEqual(len(self.outbox._claim(10)), 1)
+        self.assertEqual(self.outbox.flush(lambda host_api: FakePublisher())['sent'], 0)
+        outbox = VitaOutbox(self.path, stale_seconds=0)
+        self.assertEqual(outbox.flush(lambda host_api: FakePublisher())['sent'], 1)
+
+    def test_drain(self):
+        self.outbox.enqueue('vita', 'ds', [('dt', '1'), ('dt', '2')])
+        publisher = FakePublisher(fail_on={('dt', '2')})
+        result = self.outbox.drain(lambda host_api: publisher, timeout=5)
+        self.assertEqual((result['sent'], result['retried'], result['failed']),
+                         (1, 1, 1))
+        self.assertEqual(self.outbox.depth(), 0)
+        prom = to_prometheus(self.outbox.stats(), result)
+        self.assertIn('vita_outbox_failed 1', prom)
+        self.assertIn('vita_outbox_flush_sent 1', prom)
+
+    def test_flusher(self):
+        publisher = FakePublisher()
+        flusher = VitaOutboxFlusher(
+            lambda: self.outbox.flush(lambda host_api: publisher), interval=0.01
+        )
+        flusher.start()
+        self.outbox.enqueue('vita', 'ds', [('dt', '1')])
+        deadline = time.monotonic() + 5
+        while not publisher.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(publisher.calls), 1)
+        self.outbox.enqueue('vita', 'ds', [('dt', '2')])
+        flusher.stop(flush=False)
+        self.outbox.flush(lambda host_api: publisher)
+        self.assertEqual(flusher.stop()['sent'], 0)
+        self.assertEqual(self.outbox.depth(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger()
+
+
+class VitaPublisher:
+    """
+    Отправка статусов в Vita (/v2/add_status).
+
+    Запросы идут через одну requests.Session с пулом keep-alive
+    соединений, не больше workers запросов одновременно (в том числе
+    при одновременных вызовах publish из разных потоков).
+    batch_size - сколько партиций упаковывается в "dlk_parts" одного
+    запроса; значение больше 1 допустимо только если API Vita принимает
+    несколько партиций в одном статусе.
+    """
+
+    def __init__(self, host_api: str, workers: int = 1, batch_size: int = 1,
+                 timeout: float = 60) -> None:
+        self.url = f'http://{host_api}:8002' + '/v2/add_status'
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+
+    def _send(self, dlk_ds_code: str, parts: List[Tuple[str, str]],
+              status: str) -> None:
+        execution_date = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        json_data = {
+            "dlk_ds_code": dlk_ds_code,
+            "dlk_parts": [{"name": key, "value": value} for key, value in parts],
+            "status": status,
+            "execution_date": execution_date,
+        }
+        parts_str = ', '.join(f'{key}={value}' for key, value in parts)
+        logger.info(f'Sending "{status}" status for {dlk_ds_code} ({parts_str})')
+        with self._slots:
+            start = time.monotonic()
+            response = self.session.post(
+                url=self.url,
+                json=json_data,
+                headers={
+                    "accept": "application/json",
+                    "Content-Type": "application/json",
+                },
+                timeout=self.timeout
+            )
+        latency = time.monotonic() - start
+        if response.status_code != 200:
+            raise Exception(f'Error: ({response.status_code}): {response.text}')
+
+        logger.info(
+            f'Status "{status}" has been sent for {dlk_ds_code} ({parts_str}), '
+            f'latency: {latency:.3f}s'
+        )
+        logger.info(
+            f'Response from Vita ({response.status_code}): {response.text}'
+        )
+
+    def _publish(self, dlk_ds_code: str, parts: List[Tuple[str, str]],
+                 status: str) -> List[Tuple[List[Tuple[str, str]], Exception]]:
+        batches = [parts[i:i + self.batch_size]
+                   for i in range(0, len(parts), self.batch_size)]
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._send, dlk_ds_code, batch, status)
+                       for batch in batches]
+        results = [(batch, future.exception())
+                   for batch, future in zip(batches, futures)]
+        sent = sum(len(batch) for batch, error in results if not error)
+        elapsed = time.monotonic() - start
+        logger.info(
+            f'Vita: sent {sent}/{len(parts)} '
+            f'statuses in {len(batches)} requests, {elapsed:.3f}s '
+            f'({len(parts) / elapsed if elapsed else 0:.1f} statuses/s)'
+        )
+        return results
+
+    def publish(self, dlk_ds_code: str, parts: List[Tuple[str, str]],
+                status: str = 'F') -> None:
+        """
+        Отправка статуса status по всем партициям parts ([(ключ, значение)]).
+        Ошибка любого запроса пробрасывается после завершения остальных.
+        """
+        errors = [error for _, error in self._publish(dlk_ds_code, parts, status)
+                  if error]
+        if errors:
+            raise errors[0]
+
+    def try_publish(self, dlk_ds_code: str, parts: List[Tuple[str, str]],
+                    status: str = 'F') -> Dict[Tuple[str, str], str]:
+        """Как publish, но без исключения: возвращаются ошибки {партиция: текст}."""
+        return {part: str(error)
+                for batch, error in self._publish(dlk_ds_code, parts, status)
+                if error for part in batch}
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,321 @@
+"""
+Очередь исходящих статусов Vita в файле SQLite.
+
+Просмотр и отправка накопившихся статусов из командной строки:
+    python -m <пакет>.vita_outbox --path outbox.db stats [--prom outbox.prom]
+    python -m <пакет>.vita_outbox --path outbox.db list [--state failed]
+    python -m <пакет>.vita_outbox --path outbox.db drain [--timeout 600]
+    python -m <пакет>.vita_outbox --path outbox.db requeue
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+from .metrics import format_gauges, write_atomic
+from .sqlite_store import SQLiteStore
+
+if TYPE_CHECKING:
+    from .vita import VitaPublisher
+
+logger = logging.getLogger()
+
+
+class VitaOutbox(SQLiteStore):
+    """
+    Надёжная очередь статусов Vita: DataFiller записывает статус в очередь
+    (enqueue) и не ждёт ответа Vita, отправка выполняется отдельно (flush).
+
+    flush забирает готовые к отправке записи, группирует их по
+    (host_api, dlk_ds_code, статус) и отправляет через VitaPublisher.
+    Отправленные записи удаляются. Неотправленные возвращаются в очередь
+    с экспоненциальной задержкой (backoff_seconds * 2 ** (попытка - 1), не
+    больше max_backoff_seconds); после max_attempts попыток запись
+    переходит в состояние failed и ждёт ручного requeue.
+
+    Состояния записей: pending -> sending -> (удалена) | pending | failed.
+    Записи в sending дольше stale_seconds (упавший отправитель) забираются
+    повторно.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 10,
+                 backoff_seconds: float = 5, max_backoff_seconds: float = 600,
+                 stale_seconds: int = 600) -> None:
+        super().__init__(path)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stale_seconds = stale_seconds
+        with self._connect() as connection:
+            connection.execute(
+                'create table if not exists vita_outbox ('
+                ' id integer primary key autoincrement,'
+                ' host_api text not null,'
+                ' dlk_ds_code text not null,'
+                ' partition_key text not null,'
+                ' partition_value text not null,'
+                ' vita_status text not null,'
+                ' state text not null default \'pending\','
+                ' attempts integer not null default 0,'
+                ' next_attempt_at real not null,'
+                ' claim text,'
+                ' error text,'
+                ' created_at real not null,'
+                ' updated_at real not null)'
+            )
+
+    def enqueue(self, host_api: str, dlk_ds_code: str,
+                parts: List[Tuple[str, str]], status: str = 'F') -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                'insert into vita_outbox (host_api, dlk_ds_code, partition_key,'
+                ' partition_value, vita_status, next_attempt_at, created_at,'
+                ' updated_at) values (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(host_api, dlk_ds_code, key, value, status, now, now, now)
+                 for key, value in parts]
+            )
+
+    def cancel(self, host_api: str, dlk_ds_code: str,
+               parts: List[Tuple[str, str]]) -> None:
+        """Удаление ещё не отправленных статусов (при откате DataFiller)."""
+        with self._connect() as connection:
+            connection.executemany(
+                'delete from vita_outbox where host_api = ? and dlk_ds_code = ?'
+                ' and partition_key = ? and partition_value = ?'
+                ' and state in (\'pending\', \'failed\')',
+                [(host_api, dlk_ds_code, key, value) for key, value in parts]
+            )
+
+    def stats(self) -> dict:
+        """Глубина очереди по состояниям и возраст самой старой записи."""
+        with self._connect() as connection:
+            counts = dict(connection.execute(
+                'select state, count(*) from vita_outbox group by state'
+            ).fetchall())
+            oldest = connection.execute(
+                'select min(created_at) from vita_outbox where state != \'failed\''
+            ).fetchone()[0]
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_age_seconds': round(time.time() - oldest, 3) if oldest else 0,
+        }
+
+    def depth(self) -> int:
+        stats = self.stats()
+        return stats['pending'] + stats['sending']
+
+    def list(self, state: str = None, limit: int = 100) -> List[dict]:
+        query = ('select id, host_api, dlk_ds_code, partition_key, partition_value,'
+                 ' vita_status, state, attempts, next_attempt_at, error'
+                 ' from vita_outbox')
+        params = []
+        if state:
+            query += ' where state = ?'
+            params.append(state)
+        query += ' order by id limit ?'
+        params.append(limit)
+        columns = ['id', 'host_api', 'dlk_ds_code', 'partition_key',
+                   'partition_value', 'vita_status', 'state', 'attempts',
+                   'next_attempt_at', 'error']
+        with self._connect() as connection:
+            return [dict(zip(columns, row))
+                    for row in connection.execute(query, params).fetchall()]
+
+    def requeue_failed(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                'update vita_outbox set state = \'pending\', attempts = 0,'
+                ' next_attempt_at = ?, updated_at = ? where state = \'failed\'',
+                (time.time(), time.time())
+            ).rowcount
+
+    def _claim(self, limit: int) -> List[tuple]:
+        now = time.time()
+        return self._claim_rows(
+            'vita_outbox', 'state', 'sending',
+            'id in (select id from vita_outbox'
+            ' where (state = \'pending\' and next_attempt_at <= ?)'
+            ' or (state = \'sending\' and updated_at < ?)'
+            ' order by id limit ?)',
+            (now, now - self.stale_seconds, limit),
+            'id, host_api, dlk_ds_code, partition_key, partition_value,'
+            ' vita_status, attempts', 'id'
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_backoff_seconds,
+                   self.backoff_seconds * 2 ** (attempts - 1))
+
+    def flush(self, publisher_for: Callable[[str], 'VitaPublisher'],
+              limit: int = 1000) -> dict:
+        """
+        Отправка не больше limit готовых записей.
+        publisher_for(host_api) возвращает VitaPublisher для хоста.
+        Возвращает {'sent', 'retried', 'failed', 'seconds'}.
+        """
+        start = time.monotonic()
+        rows = self._claim(limit)
+        groups = {}
+        for row in rows:
+            row_id, host_api, dlk_ds_code, key, value, status, attempts = row
+            groups.setdefault((host_api, dlk_ds_code, status), []).append(
+                (row_id, (key, value), attempts)
+            )
+
+        sent_ids, retries, failures = [], [], []
+        now = time.time()
+        for (host_api, dlk_ds_code, status), items in groups.items():
+            try:
+                errors = publisher_for(host_api).try_publish(
+                    dlk_ds_code, [part for _, part, _ in items], status
+                )
+            except Exception as err:
+                errors = {part: str(err) for _, part, _ in items}
+            for row_id, part, attempts in items:
+                if part not in errors:
+                    sent_ids.append(row_id)
+                elif attempts + 1 >= self.max_attempts:
+                    failures.append(('failed', now, errors[part], now, row_id))
+                else:
+                    retries.append(('pending', now + self._backoff(attempts + 1),
+                                    errors[part], now, row_id))
+
+        with self._connect() as connection:
+            connection.execute('begin immediate')
+            connection.executemany('delete from vita_outbox where id = ?',
+                                   [(row_id,) for row_id in sent_ids])
+            connection.executemany(
+                'update vita_outbox set state = ?, attempts = attempts + 1,'
+                ' next_attempt_at = ?, error = ?, claim = null,'
+                ' updated_at = ? where id = ?',
+                retries + failures
+            )
+            connection.execute('commit')
+
+        result = {'sent': len(sent_ids), 'retried': len(retries),
+                  'failed': len(failures),
+                  'seconds': round(time.monotonic() - start, 3)}
+        if rows:
+            logger.info(f'Vita outbox flushed: sent {result["sent"]}, '
+                        f'retried {result["retried"]}, failed {result["failed"]} '
+                        f'in {result["seconds"]}s')
+        return result
+
+    def drain(self, publisher_for: Callable[[str], 'VitaPublisher'],
+              timeout: float = None, limit: int = 1000) -> dict:
+        """
+        Отправка, пока в очереди есть pending-записи (с ожиданием backoff),
+        но не дольше timeout секунд. Возвращает суммарный результат flush.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        total = {'sent': 0, 'retried': 0, 'failed': 0, 'seconds': 0.0}
+        while True:
+            result = self.flush(publisher_for, limit)
+            for name in total:
+                total[name] += result[name]
+            if self.depth() == 0:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if not (result['sent'] or result['retried'] or result['failed']):
+                # всё оставшееся ждёт backoff
+                time.sleep(min(1.0, self.backoff_seconds))
+        total['seconds'] = round(total['seconds'], 3)
+        return total
+
+
+class VitaOutboxFlusher:
+    """
+    Фоновая отправка: flush вызывается каждые interval секунд в отдельном
+    потоке, пока не вызван stop; stop выполняет последний flush
+    (stop(flush=False) - только останавливает поток).
+    """
+
+    def __init__(self, flush: Callable[[], dict], interval: float = 1) -> None:
+        self._flush = flush
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self._flush()
+            except Exception as err:
+                # ошибки отправки не должны останавливать поток
+                logger.error(f'Vita outbox flush failed: {err}')
+
+    def stop(self, flush: bool = True) -> dict:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self._flush() if flush else None
+
+
+def to_prometheus(stats: dict, flush_result: dict = None) -> str:
+    gauges = {name: stats[name] for name in ('pending', 'sending', 'failed',
+                                             'oldest_age_seconds')}
+    if flush_result:
+        gauges.update(flush_seconds=flush_result['seconds'],
+                      flush_sent=flush_result['sent'])
+    return format_gauges('vita_outbox', gauges)
+
+
+def main(argv: List[str] = None) -> None:
+    from .vita import VitaPublisher
+
+    parser = argparse.ArgumentParser(description='Vita statuses outbox')
+    parser.add_argument('--path', required=True, help='файл SQLite очереди')
+    parser.add_argument('--prom', help='файл метрик для textfile collector')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats')
+    list_parser = subparsers.add_parser('list')
+    list_parser.add_argument('--state', choices=['pending', 'sending', 'failed'])
+    list_parser.add_argument('--limit', type=int, default=100)
+    drain_parser = subparsers.add_parser('drain')
+    drain_parser.add_argument('--timeout', type=float, default=None)
+    drain_parser.add_argument('--workers', type=int, default=1)
+    drain_parser.add_argument('--batch-size', type=int, default=1)
+    subparsers.add_parser('requeue')
+    args = parser.parse_args(argv)
+
+    outbox = VitaOutbox(args.path)
+    flush_result = None
+    if args.command == 'list':
+        for row in outbox.list(args.state, args.limit):
+            print(json.dumps(row, ensure_ascii=False))
+    elif args.command == 'requeue':
+        print(f'Requeued: {outbox.requeue_failed()}')
+    elif args.command == 'drain':
+        publishers: Dict[str, VitaPublisher] = {}
+
+        def publisher_for(host_api: str) -> VitaPublisher:
+            if host_api not in publishers:
+                publishers[host_api] = VitaPublisher(host_api, args.workers,
+                                                     args.batch_size)
+            return publishers[host_api]
+
+        try:
+            flush_result = outbox.drain(publisher_for, args.timeout)
+        finally:
+            for publisher in publishers.values():
+                publisher.close()
+        print(json.dumps(flush_result))
+    stats = outbox.stats()
+    if args.command == 'stats':
+        print(json.dumps(stats))
+    if args.prom:
+        write_atomic(args.prom, to_prometheus(stats, flush_result))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,130 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, List
+
+
+class AbsSink(ABC):
+
+    # Команды:
+    # постусловие: record добавлена в буфер; при заполнении буфера
+    #   (chunk_size записей) буфер записан в файл и очищен
+    @abstractmethod
+    def write(self, record: dict) -> None: ...
+
+    # постусловие: остаток буфера записан, файл закрыт
+    @abstractmethod
+    def close(self) -> None: ...
+
+    # постусловие: все records записаны по одной, без накопления в памяти;
+    #   возвращается число записей
+    def write_all(self, records: Iterable[dict]) -> int:
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+    def __enter__(self) -> 'AbsSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class NdjsonSink(AbsSink):
+    """
+    Запись в файл NDJSON (одна запись - одна строка JSON).
+    В памяти не больше chunk_size записей, в файл они пишутся одним write.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1000) -> None:
+        self.path = path
+        self.chunk_size = max(1, chunk_size)
+        self.records_written = 0
+        self._buffer: List[str] = []
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._file.flush()
+            self.records_written += len(self._buffer)
+            self._buffer = []
+
+    def write(self, record: dict) -> None:
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        try:
+            self._flush()
+        finally:
+            self._file.close()
+
+
+class ParquetSink(AbsSink):
+    """
+    Запись в файл Parquet, каждые chunk_size записей - отдельная row group.
+    Требуется pyarrow.
+
+    Схема файла - schema (pyarrow.Schema), если она передана, иначе
+    определяется по первому chunk; столбцы, во всём первом chunk равные
+    None, записываются как строки, а не как тип null, иначе последующие
+    chunk со значениями в этих столбцах не записать. Поля записей,
+    отсутствующие в схеме, не записываются.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 10_000,
+                 schema: Any = None) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as err:
+            raise Exception('ParquetSink requires pyarrow '
+                            '(pip install pyarrow)') from err
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.chunk_size = max(1, chunk_size)
+        self.schema = schema
+        self.records_written = 0
+        self._buffer: List[dict] = []
+        self._writer = None
+        self._closed = False
+
+    def _infer_schema(self, records: List[dict]) -> Any:
+        schema = self._pa.Table.from_pylist(records).schema
+        return self._pa.schema([
+            field.with_type(self._pa.string())
+            if self._pa.types.is_null(field.type) else field
+            for field in schema
+        ])
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._writer is None:
+            schema = self.schema or self._infer_schema(self._buffer)
+            self._writer = self._pq.ParquetWriter(self.path, schema)
+        table = self._pa.Table.from_pylist(self._buffer, schema=self._writer.schema)
+        self._writer.write_table(table)
+        self.records_written += len(self._buffer)
+        self._buffer = []
+
+    def write(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._flush()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
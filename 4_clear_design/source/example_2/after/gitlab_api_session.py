@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
 
 import json
-from typing import List
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 
@@ -10,19 +15,33 @@ from urllib3.exceptions import InsecureRequestWarning
 class AbsGitlabSession(ABC):
 
     # Конструктор
-    # постусловие: создан endpoint к API /api/v4
+    # постусловие: создан endpoint к API /api/v4 и пул соединений к нему
     def __init__(self, host: str, access_token: str) -> None: ...
 
+    # Команды:
+    # постусловие: соединения пула закрыты
+    @abstractmethod
+    def close(self) -> None: ...
+
     # Запросы:
     # Получены данные по проектам gitlab из группы group_id
     @abstractmethod
     def get_projects(self, group_id: int) -> list: ...
 
+    # Те же проекты, что и get_projects, по мере их получения
+    @abstractmethod
+    def iter_projects(self, group_id: int) -> Iterator[dict]: ...
+
     # Получены все коммиты из project_id за период start_date и end_date
     @abstractmethod
     def get_commits(self, project_id: int,
                     start_date: str, end_date: str) -> List[dict]: ...
 
+    # Те же коммиты, что и get_commits, по мере их получения
+    @abstractmethod
+    def iter_commits(self, project_id: int,
+                     start_date: str, end_date: str) -> Iterator[dict]: ...
+
 
 class Parser(ABC):
 
@@ -36,86 +55,276 @@ class Parser(ABC):
     def get_data(self, group_id: int,
                  start_date: str, end_date: str) -> List[dict]: ...
 
+    # Тот же набор данных, что и get_data, по одной записи по мере
+    # получения (без накопления всего набора в памяти)
+    @abstractmethod
+    def iter_data(self, group_id: int,
+                  start_date: str, end_date: str) -> Iterator[dict]: ...
+
 
 class GitlabSession(AbsGitlabSession):
+    """
+    Все запросы идут через одну requests.Session с пулом keep-alive
+    соединений (pool_size), поэтому TCP+TLS соединение устанавливается
+    один раз на соединение пула, а не на каждый запрос.
+    timeout - (подключение, чтение) в секундах для каждого запроса.
+    Число запросов и установленных соединений доступно в stats().
+
+    Подгруппы обходятся в ширину, до group_workers групп одновременно,
+    проекты отдаются в порядке обхода независимо от времени ответов;
+    при include_subgroups=True проекты всех подгрупп получаются одним
+    списком /projects?include_subgroups=true без обхода дерева.
+
+    Все списки получаются постранично (_api_get_all): если известно число
+    страниц (X-Total-Pages), остальные страницы запрашиваются одновременно,
+    до page_workers запросов.
+    """
+
+    PER_PAGE = 100
 
-    def __init__(self, host, access_token):
+    def __init__(self, host, access_token, pool_size: int = 10,
+                 timeout: Union[float, Tuple[float, float]] = (10, 60),
+                 keep_alive: bool = True, include_subgroups: bool = False,
+                 group_workers: int = 4, page_workers: int = 4):
         self.access_token = access_token
         self.url = f'{host}/api/v4'
+        self.timeout = timeout
+        self.include_subgroups = include_subgroups
+        self.group_workers = max(1, group_workers)
+        self.page_workers = max(1, page_workers)
         # Отключение предупреждений
         disable_warnings(InsecureRequestWarning)
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive" if keep_alive else "close",
+        })
+        # каждому одновременному запросу - своё соединение пула
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(pool_size, self._max_concurrent_requests())
+        )
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._seconds = 0.0
 
-    def _api_get(self, endpoint: str, params={}):
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        response = requests.get(endpoint, headers=headers,
-                                params=params, verify=False)
+    def _max_concurrent_requests(self) -> int:
+        return self.group_workers * self.page_workers
+
+    def _api_get_response(self, endpoint: str, params={}) -> requests.Response:
+        start = time.monotonic()
+        response = self.session.get(endpoint, params=params,
+                                    timeout=self.timeout)
+        with self._lock:
+            self._requests += 1
+            self._seconds += time.monotonic() - start
         response.raise_for_status()
-        return response.json()
+        return response
+
+    def _api_get(self, endpoint: str, params={}):
+        return self._api_get_response(endpoint, params).json()
+
+    def _iter_concurrently(self, func: Callable[[Any], Any], items: Iterable[Any],
+                           workers: int) -> Iterator[Any]:
+        """
+        Результаты func по items в порядке items; в работе не больше
+        2 * workers элементов, готовые результаты отдаются, не дожидаясь
+        остальных. При ошибке не начатые вызовы отменяются.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            try:
+                for item in items:
+                    pending.append(executor.submit(func, item))
+                    if len(pending) >= 2 * workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _api_get_all(self, endpoint: str, params={}) -> Iterator[dict]:
+        """
+        Все элементы списка endpoint по порядку страниц.
+        Следующая страница определяется по заголовкам ответа:
+            - X-Total-Pages - остальные страницы запрашиваются одновременно;
+            - Link rel="next" (в том числе keyset-пагинация) или X-Next-Page -
+              по одной (GitLab не отдаёт X-Total-Pages для больших списков);
+            - без заголовков пагинации (их срезал прокси) - до первой
+              неполной страницы.
+        """
+        params = {**params, 'per_page': self.PER_PAGE}
+        response = self._api_get_response(endpoint, {**params, 'page': 1})
+        items = response.json()
+        yield from items
+
+        total_pages = response.headers.get('X-Total-Pages')
+        if total_pages:
+            yield from (item for page_items in self._iter_concurrently(
+                lambda page: self._api_get(endpoint, {**params, 'page': page}),
+                range(2, int(total_pages) + 1), self.page_workers
+            ) for item in page_items)
+            return
+
+        page = 1
+        # заголовков пагинации нет уже в первом ответе
+        without_headers = ('X-Next-Page' not in response.headers
+                           and 'Link' not in response.headers)
+        while items:
+            next_url = response.links.get('next', {}).get('url')
+            next_page = response.headers.get('X-Next-Page')
+            if next_url:
+                response = self._api_get_response(next_url)
+            elif next_page:
+                page = int(next_page)
+                response = self._api_get_response(endpoint, {**params, 'page': page})
+            elif without_headers and len(items) >= self.PER_PAGE:
+                page += 1
+                response = self._api_get_response(endpoint, {**params, 'page': page})
+            else:
+                break
+            items = response.json()
+            yield from items
+
+    def stats(self) -> dict:
+        """Количество запросов, новых соединений (handshake) и переиспользований."""
+        pools = self._adapter.poolmanager.pools
+        connections = sum(pools[key].num_connections for key in pools.keys())
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'connections': connections,
+                'reused': max(self._requests - connections, 0),
+                'seconds': round(self._seconds, 3),
+            }
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> 'GitlabSession':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def iter_projects(self, group_id: int) -> Iterator[dict]:
+        """
+        Проекты группы group_id и всех её подгрупп по мере получения.
+        Обход выполняется в фоновых потоках и продолжается, пока
+        вызывающий код обрабатывает уже полученные проекты.
+        """
+        if self.include_subgroups:
+            yield from self._api_get_all(f'{self.url}/groups/{group_id}/projects',
+                                         {'include_subgroups': 'true'})
+            return
+
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.group_workers)
+
+        def visit(group_id: int) -> Tuple[list, list]:
+            group_endpoint = f'{self.url}/groups/{group_id}'
+            try:
+                # сначала подгруппы, чтобы их обход начался как можно раньше
+                subgroups = list(self._api_get_all(group_endpoint + '/subgroups'))
+                children = [executor.submit(visit, subgroup['id'])
+                            for subgroup in subgroups if not stopped.is_set()]
+                projects = list(self._api_get_all(group_endpoint + '/projects'))
+            except Exception as err:
+                raise Exception(f'Failed to get projects of group '
+                                f'{group_id}: {err}') from err
+            return projects, children
+
+        # результаты групп забираются в порядке обхода в ширину, а не в
+        # порядке завершения запросов, поэтому порядок проектов не зависит
+        # от group_workers
+        pending = deque([executor.submit(visit, group_id)])
+        try:
+            while pending:
+                projects, children = pending.popleft().result()
+                pending.extend(children)
+                yield from projects
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True, cancel_futures=True)
 
     def get_projects(self, group_id: int) -> list:
-        group_endpoint = f'{self.url}/groups/{group_id}'
-        projects_endpoint = group_endpoint + '/projects'
-        # получаем данные о проектах в группе
-        response = self._api_get(projects_endpoint)
-        projects = []
-        projects.extend(response)
-        # рекурсивно проходим по сабгруппам и получаем данные о проектах
-        endpoint = group_endpoint + "/subgroups"
-        response = self._api_get(endpoint)
-
-        for subgroup in response:
-            subgroup_id = subgroup['id']
-            projects.extend(self.get_projects(subgroup_id))
-        return projects
+        return list(self.iter_projects(group_id))
+
+    def iter_commits(self, project_id: int,
+                     start_date: str, end_date: str) -> Iterator[dict]:
+        endpoint = f'{self.url}/projects/{project_id}/repository/commits'
+        params = {'since': start_date, "until": end_date}
+        return self._api_get_all(endpoint, params)
 
     def get_commits(self, project_id: int,
                     start_date: str, end_date: str) -> list:
-        endpoint = f'{self.url}/projects/{project_id}/repository/commits'
-        all_commits = []
-        num_page = 1
-        while True:
-            params = {'since': start_date, "until": end_date,
-                      "per_page": 100, "page": num_page}
-            response = self._api_get(endpoint, params)
-            if not response:
-                break
-            all_commits += response
-            num_page += 1
-        return all_commits
+        return list(self.iter_commits(project_id, start_date, end_date))
 
 
 class ParserAuthorsCommits(GitlabSession, Parser):
+    """
+    Diff коммитов запрашиваются одновременно, не больше diff_workers
+    запросов; порядок записей совпадает с порядком коммитов.
+    """
 
-    def parse_data(self, commits: list, project: dict) -> List[dict]:
-        data = []
-        for commit in commits:
-            commit_id = commit['id']
-            endpoint = f'{self.url}/projects/{project["id"]}/repository/commits/{commit_id}/diff'
+    def __init__(self, host, access_token, diff_workers: int = 8, **kwargs):
+        self.diff_workers = max(1, diff_workers)
+        super().__init__(host, access_token, **kwargs)
+
+    def _max_concurrent_requests(self) -> int:
+        # обход групп идёт одновременно с получением коммитов и diff
+        return (super()._max_concurrent_requests() + self.page_workers
+                + self.diff_workers)
+
+    def _get_commit_data(self, commit: dict, project: dict) -> dict:
+        commit_id = commit['id']
+        endpoint = f'{self.url}/projects/{project["id"]}/repository/commits/{commit_id}/diff'
+        try:
             response = self._api_get(endpoint)
-            data_commit = {
-                "project_id": project['id'],
-                "project_name": project['name'],
-                "short_id": commit['short_id'],
-                "created_at": commit['created_at'],
-                "author_name": commit['author_name'],
-                "author_email": commit['author_email'],
-                "committer_name": commit['committer_name'],
-                "committer_email": commit['committer_email'],
-                "diffs": json.dumps(response)
-            }
-            data.append(data_commit)
-        return data
+        except Exception as err:
+            raise Exception(f'Failed to get diff: project {project["id"]} '
+                            f'({project["name"]}), commit {commit_id}: {err}') from err
+        return {
+            "project_id": project['id'],
+            "project_name": project['name'],
+            "short_id": commit['short_id'],
+            "created_at": commit['created_at'],
+            "author_name": commit['author_name'],
+            "author_email": commit['author_email'],
+            "committer_name": commit['committer_name'],
+            "committer_email": commit['committer_email'],
+            "diffs": json.dumps(response)
+        }
+
+    def _iter_commits_data(self, commits: Iterable[dict],
+                           project: dict) -> Iterator[dict]:
+        return self._iter_concurrently(
+            lambda commit: self._get_commit_data(commit, project),
+            commits, self.diff_workers
+        )
+
+    def parse_data(self, commits: list, project: dict) -> List[dict]:
+        return list(self._iter_commits_data(commits, project))
+
+    def iter_data(self, group_id: int,
+                  start_date: str, end_date: str) -> Iterator[dict]:
+        # проекты обрабатываются по мере обхода групп, коммиты - по мере
+        # получения страниц, в памяти только записи в работе
+        for i, project in enumerate(self.iter_projects(group_id)):
+            print(i, project['id'], '-', project['name'])
+            commits = self.iter_commits(project['id'], start_date, end_date)
+            count = 0
+            for data_commit in self._iter_commits_data(commits, project):
+                count += 1
+                yield data_commit
+            if count:
+                print("Получено коммитов:", count)
 
     def get_data(self, group_id: int,
                  start_date: str, end_date: str) -> List[dict]:
-        projects = self.get_projects(group_id)
-        data = []
-        for i, project in enumerate(projects):
-            print(i, project['id'], '-', project['name'])
-            commits = self.get_commits(project['id'], start_date, end_date)
-            data_project = self.parse_data(commits, project)
-            if not data_project:
-                continue
-            print("Получено коммитов:", len(data_project))
-            data += data_project
-        return data
+        return list(self.iter_data(group_id, start_date, end_date))
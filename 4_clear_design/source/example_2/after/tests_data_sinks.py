@@ -0,0 +1,106 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+from data_sinks import NdjsonSink, ParquetSink
+from gitlab_api_session import ParserAuthorsCommits
+from tests_gitlab_api_session import FakeGitlabHandler, GitlabTestCase
+
+
+class TestNdjsonSink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.ndjson')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _lines(self) -> list:
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    # постусловие: в файл записываются полные chunk, остаток - при close
+    def test_chunks(self):
+        sink = NdjsonSink(self.path, chunk_size=3)
+        for i in range(4):
+            sink.write({'i': i, 'name': 'проект'})
+        self.assertEqual(sink.records_written, 3)
+        self.assertEqual(len(self._lines()), 3)
+        sink.close()
+        self.assertEqual(self._lines(),
+                         [{'i': i, 'name': 'проект'} for i in range(4)])
+
+    def test_write_all(self):
+        with NdjsonSink(self.path, chunk_size=10) as sink:
+            count = sink.write_all({'i': i} for i in range(25))
+        self.assertEqual(count, 25)
+        self.assertEqual([record['i'] for record in self._lines()],
+                         list(range(25)))
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow not installed')
+class TestParquetSink(unittest.TestCase):
+
+    def test_row_groups(self):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.parquet')
+            with ParquetSink(path, chunk_size=4) as sink:
+                sink.write_all({'i': i, 'name': f'p{i}'} for i in range(10))
+            parquet_file = pq.ParquetFile(path)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+            self.assertEqual(parquet_file.read().column('i').to_pylist(),
+                             list(range(10)))
+
+    # постусловие: столбец без значений в первом chunk не получает тип null
+    def test_null_column_in_first_chunk(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.parquet')
+            with ParquetSink(path, chunk_size=2) as sink:
+                sink.write_all({'i': i, 'email': None if i < 2 else f'a{i}@x'}
+                               for i in range(4))
+            table = pq.read_table(path)
+        self.assertEqual(table.schema.field('email').type, pa.string())
+        self.assertEqual(table.column('email').to_pylist(),
+                         [None, None, 'a2@x', 'a3@x'])
+
+    def test_explicit_schema(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([('i', pa.int32()), ('name', pa.string())])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.parquet')
+            with ParquetSink(path, chunk_size=2, schema=schema) as sink:
+                sink.write_all({'i': i, 'name': None} for i in range(3))
+            self.assertEqual(pq.read_schema(path), schema)
+
+
+class TestIterData(GitlabTestCase):
+
+    # постусловие: записи отдаются по мере получения, в файле - все записи
+    def test_iter_data_to_sink(self):
+        with ParserAuthorsCommits(self.host, 'token') as parser:
+            records = parser.iter_data(1, '2023-01-01', '2023-02-01')
+            first = next(records)
+            # до первой записи получены не все diff
+            self.assertLess(len([path for path, _ in FakeGitlabHandler.requests
+                                 if path.endswith('/diff')]), 151)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'data.ndjson')
+                with NdjsonSink(path, chunk_size=50) as sink:
+                    sink.write(first)
+                    count = 1 + sink.write_all(records)
+                with open(path, encoding='utf-8') as file:
+                    lines = [json.loads(line) for line in file]
+        self.assertEqual(count, 151)
+        self.assertEqual(len(lines), 151)
+        self.assertEqual({record['project_id'] for record in lines}, {10, 20})
+
+
+if __name__ == '__main__':
+    unittest.main()
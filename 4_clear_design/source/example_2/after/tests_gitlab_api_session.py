@@ -0,0 +1,279 @@
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from gitlab_api_session import GitlabSession, ParserAuthorsCommits
+
+
+class FakeGitlabHandler(BaseHTTPRequestHandler):
+    """
+    GitLab API v4 в памяти: группы {id: {'projects': [...], 'subgroups': [...]}},
+    коммиты {project_id: [...]}, ответы постраничные с заголовками X-*.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    groups = {}
+    commits = {}
+    requests = []
+    failing_paths = set()
+    delays = {}  # {путь: задержка ответа в секундах}
+    # 'total' - все заголовки X-*, 'next' - без X-Total-Pages (большие
+    # списки), 'link' - только Link rel="next", 'none' - без заголовков
+    pagination = 'total'
+
+    def setup(self):
+        super().setup()
+        # без задержки отправки маленьких ответов на keep-alive соединении
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data, code: int = 200, headers: dict = None) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_page(self, items: list, query: dict) -> None:
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['1'])[0])
+        total_pages = max(1, -(-len(items) // per_page))
+        headers = {'X-Page': str(page), 'X-Per-Page': str(per_page),
+                   'X-Total-Pages': str(total_pages), 'X-Total': str(len(items)),
+                   'X-Next-Page': str(page + 1) if page < total_pages else ''}
+        if self.pagination == 'next':
+            del headers['X-Total-Pages'], headers['X-Total']
+        elif self.pagination == 'link':
+            host, port = self.server.server_address
+            headers = {}
+            if page < total_pages:
+                query = {**{k: v[0] for k, v in query.items()}, 'page': page + 1}
+                next_url = (f'http://{host}:{port}{urlparse(self.path).path}?'
+                            + '&'.join(f'{k}={v}' for k, v in query.items()))
+                headers['Link'] = f'<{next_url}>; rel="next"'
+        elif self.pagination == 'none':
+            headers = {}
+        self._send_json(items[(page - 1) * per_page:page * per_page],
+                        headers=headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path[len('/api/v4'):]
+        query = parse_qs(url.query)
+        FakeGitlabHandler.requests.append((path, query))
+        if self.headers.get('Authorization') != 'Bearer token':
+            return self._send_json({'message': '401 Unauthorized'}, 401)
+        time.sleep(self.delays.get(path, 0))
+        if path in self.failing_paths:
+            return self._send_json({'message': '500 Internal Server Error'}, 500)
+        parts = path.strip('/').split('/')
+        if parts[0] == 'groups' and int(parts[1]) in self.groups:
+            if query.get('include_subgroups') == ['true']:
+                return self._send_page(self._all_projects(int(parts[1])), query)
+            group = self.groups[int(parts[1])]
+            return self._send_page(group[parts[2]], query)
+        if parts[0] == 'projects' and parts[-1] == 'commits':
+            return self._send_page(self.commits.get(int(parts[1]), []), query)
+        if parts[0] == 'projects' and parts[-1] == 'diff':
+            return self._send_json([{'diff': f'diff of {parts[-2]}'}])
+        self._send_json({'message': '404 Not Found'}, 404)
+
+    def _all_projects(self, group_id: int) -> list:
+        group = self.groups[group_id]
+        projects = list(group['projects'])
+        for subgroup in group['subgroups']:
+            projects += self._all_projects(subgroup['id'])
+        return projects
+
+
+def make_commit(commit_id: str) -> dict:
+    return {'id': commit_id, 'short_id': commit_id[:8],
+            'created_at': '2023-01-01T00:00:00Z', 'author_name': 'author',
+            'author_email': 'author@example.com', 'committer_name': 'committer',
+            'committer_email': 'committer@example.com'}
+
+
+class GitlabTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitlabHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address
+        cls.host = f'http://{host}:{port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeGitlabHandler.groups = {
+            1: {'projects': [{'id': 10, 'name': 'p10'}],
+                'subgroups': [{'id': 2}, {'id': 3}]},
+            2: {'projects': [{'id': 20, 'name': 'p20'}], 'subgroups': []},
+            3: {'projects': [], 'subgroups': [{'id': 4}]},
+            4: {'projects': [{'id': 40, 'name': 'p40'}], 'subgroups': []},
+        }
+        FakeGitlabHandler.commits = {
+            10: [make_commit(f'c10-{i:04}') for i in range(150)],
+            20: [make_commit('c20-0001')],
+        }
+        FakeGitlabHandler.requests = []
+        FakeGitlabHandler.failing_paths = set()
+        FakeGitlabHandler.delays = {}
+        FakeGitlabHandler.pagination = 'total'
+
+
+class TestGitlabSession(GitlabTestCase):
+
+    def test_get_projects(self):
+        with GitlabSession(self.host, 'token') as session:
+            projects = session.get_projects(1)
+        self.assertEqual(sorted(project['id'] for project in projects),
+                         [10, 20, 40])
+
+    # постусловие: дерево подгрупп не обходится, проекты - одним списком
+    def test_get_projects_include_subgroups(self):
+        with GitlabSession(self.host, 'token', include_subgroups=True) as session:
+            projects = session.get_projects(1)
+        self.assertEqual(sorted(project['id'] for project in projects),
+                         [10, 20, 40])
+        self.assertEqual([path for path, _ in FakeGitlabHandler.requests],
+                         ['/groups/1/projects'])
+
+    # постусловие: группы обходятся в ширину
+    def test_iter_projects_breadth_first(self):
+        FakeGitlabHandler.groups[2]['subgroups'] = [{'id': 5}]
+        FakeGitlabHandler.groups[5] = {'projects': [{'id': 50, 'name': 'p50'}],
+                                       'subgroups': []}
+        with GitlabSession(self.host, 'token', group_workers=1) as session:
+            projects = [project['id'] for project in session.iter_projects(1)]
+        self.assertEqual(projects, [10, 20, 50, 40])
+
+    # постусловие: порядок проектов не зависит от времени ответов
+    def test_iter_projects_order(self):
+        FakeGitlabHandler.groups[2]['subgroups'] = [{'id': 5}]
+        FakeGitlabHandler.groups[5] = {'projects': [{'id': 50, 'name': 'p50'}],
+                                       'subgroups': []}
+        FakeGitlabHandler.groups[3]['projects'] = [{'id': 30, 'name': 'p30'}]
+        FakeGitlabHandler.delays = {'/groups/1/projects': 0.1,
+                                    '/groups/2/projects': 0.05}
+        with GitlabSession(self.host, 'token', group_workers=4) as session:
+            projects = [project['id'] for project in session.iter_projects(1)]
+        self.assertEqual(projects, [10, 20, 30, 50, 40])
+
+    def test_iter_projects_error(self):
+        FakeGitlabHandler.failing_paths = {'/groups/4/subgroups'}
+        with GitlabSession(self.host, 'token') as session:
+            with self.assertRaisesRegex(Exception, 'group 4'):
+                session.get_projects(1)
+
+    def test_get_commits(self):
+        with GitlabSession(self.host, 'token') as session:
+            commits = session.get_commits(10, '2023-01-01', '2023-02-01')
+        self.assertEqual([commit['id'] for commit in commits],
+                         [f'c10-{i:04}' for i in range(150)])
+        self.assertTrue(all(query['since'] == ['2023-01-01']
+                            for _, query in FakeGitlabHandler.requests))
+
+    # постусловие: все страницы получены по порядку, без лишних запросов
+    def test_pagination(self):
+        FakeGitlabHandler.commits[10] = [make_commit(f'c10-{i:04}')
+                                         for i in range(1000)]
+        expected = [f'c10-{i:04}' for i in range(1000)]
+        for pagination in ('total', 'next', 'link'):
+            FakeGitlabHandler.pagination = pagination
+            FakeGitlabHandler.requests = []
+            with GitlabSession(self.host, 'token', page_workers=3) as session:
+                commits = session.get_commits(10, '2023-01-01', '2023-02-01')
+            self.assertEqual([commit['id'] for commit in commits], expected)
+            self.assertEqual(len(FakeGitlabHandler.requests), 10, pagination)
+        # без заголовков - до первой неполной страницы
+        FakeGitlabHandler.pagination = 'none'
+        FakeGitlabHandler.requests = []
+        with GitlabSession(self.host, 'token') as session:
+            commits = session.get_commits(10, '2023-01-01', '2023-02-01')
+        self.assertEqual([commit['id'] for commit in commits], expected)
+        self.assertEqual(len(FakeGitlabHandler.requests), 11)
+
+    # постусловие: списки групп и подгрупп не обрезаются первой страницей
+    def test_get_projects_pagination(self):
+        FakeGitlabHandler.groups[4]['projects'] = [
+            {'id': 1000 + i, 'name': f'p{i}'} for i in range(250)
+        ]
+        FakeGitlabHandler.groups[1]['subgroups'] += [{'id': 100 + i}
+                                                      for i in range(120)]
+        for i in range(120):
+            FakeGitlabHandler.groups[100 + i] = {'projects': [], 'subgroups': []}
+        with GitlabSession(self.host, 'token') as session:
+            projects = session.get_projects(1)
+        with GitlabSession(self.host, 'token', include_subgroups=True) as session:
+            all_projects = session.get_projects(1)
+        self.assertEqual(len(projects), 252)
+        self.assertEqual(len(all_projects), 252)
+        # подгруппы - 2 страницы, проекты группы - 1, все проекты - 3
+        self.assertEqual(len([path for path, _ in FakeGitlabHandler.requests
+                              if path in ('/groups/1/subgroups',
+                                          '/groups/1/projects')]), 2 + 1 + 3)
+
+    # постусловие: запросы идут через одно keep-alive соединение
+    def test_connection_reuse(self):
+        with GitlabSession(self.host, 'token', pool_size=2,
+                           group_workers=1) as session:
+            session.get_projects(1)
+            session.get_commits(10, '2023-01-01', '2023-02-01')
+            stats = session.stats()
+        self.assertEqual(stats['requests'], len(FakeGitlabHandler.requests))
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['reused'], stats['requests'] - 1)
+
+    def test_error(self):
+        with GitlabSession(self.host, 'wrong') as session:
+            with self.assertRaises(Exception):
+                session.get_projects(1)
+
+
+class TestParserAuthorsCommits(GitlabTestCase):
+
+    def test_get_data(self):
+        with ParserAuthorsCommits(self.host, 'token') as parser:
+            data = parser.get_data(1, '2023-01-01', '2023-02-01')
+        self.assertEqual(len(data), 151)
+        record = next(record for record in data if record['project_id'] == 20)
+        self.assertEqual(record['short_id'], 'c20-0001')
+        self.assertEqual(json.loads(record['diffs']), [{'diff': 'diff of c20-0001'}])
+
+    # постусловие: порядок записей совпадает с порядком коммитов
+    def test_parse_data_order(self):
+        commits = FakeGitlabHandler.commits[10]
+        with ParserAuthorsCommits(self.host, 'token', diff_workers=4) as parser:
+            data = parser.parse_data(commits, {'id': 10, 'name': 'p10'})
+            stats = parser.stats()
+        self.assertEqual([record['short_id'] for record in data],
+                         [commit['short_id'] for commit in commits])
+        self.assertLessEqual(stats['connections'], 4)
+
+    def test_parse_data_error(self):
+        commits = FakeGitlabHandler.commits[10]
+        FakeGitlabHandler.failing_paths = {
+            '/projects/10/repository/commits/c10-0042/diff'
+        }
+        with ParserAuthorsCommits(self.host, 'token', diff_workers=4) as parser:
+            with self.assertRaisesRegex(Exception, 'project 10 .p10., commit c10-0042'):
+                parser.parse_data(commits, {'id': 10, 'name': 'p10'})
+        # после ошибки новые запросы не отправляются
+        self.assertLess(len(FakeGitlabHandler.requests), len(commits))
+
+
+if __name__ == '__main__':
+    unittest.main()